@@ -1,5 +1,6 @@
 import logging
 import multiprocessing
+import threading
 from functools import wraps
 from typing import Any, Callable
 
@@ -11,13 +12,19 @@ from telebot.types import (
     InaccessibleMessage,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
     Message,
 )
-from telebot.util import extract_command, is_command
+from telebot.util import extract_arguments, extract_command, is_command
 
 import checker
 import gorzdrav.models as api_models
 from config import Config
+from core.catalog import CatalogSync
+from db.sqlite_db import SqliteDb
+from depends import catalog
 from depends import sqlite_db as DB
 from gorzdrav.api import Gorzdrav
 from gorzdrav.exceptions import GorzdravExceptionBase
@@ -92,12 +99,15 @@ def handle_gorzdrav_exceptions(func):
             return func(message_or_callback, *args, **kwargs)
         except GorzdravExceptionBase as e:
             if isinstance(message_or_callback, Message):
-                message = message_or_callback
+                chat_id = message_or_callback.chat.id
+            elif message_or_callback.message is not None:
+                chat_id = message_or_callback.message.chat.id
             else:
-                message = message_or_callback.message
+                # кнопка под сообщением из inline-режима
+                chat_id = message_or_callback.from_user.id
             logger.error(f"Ошибка в API Gorzdrav: {e.message}")
             bot.send_message(
-                chat_id=message.chat.id,
+                chat_id=chat_id,
                 text="Произошла ошибка при обращении к API Gorzdrav.\n"
                 + str(e.message),
             )
@@ -285,7 +295,8 @@ def get_help(message: Message):
         + "/0 - искать свободные места в любое время\n"
         + "/delete - удалить профиль пользователя\n"
         + "/state - узнать текущее состояние бота\n\n"
-        + "/set_doctor - выбрать врача и медицинское учреждение"
+        + "/set_doctor - выбрать врача и медицинское учреждение\n"
+        + "/find - найти врача по фамилии или специальности"
     )
     bot.reply_to(message, text)  # type: ignore
 
@@ -314,7 +325,7 @@ def test_district_buttons(message: Message):
     message_id = message.message_id
     chat_id = message.chat.id
 
-    districts = Gorzdrav.get_districts()
+    districts = catalog.get_districts()
 
     message_hash = keyboard_service.get_short_message_hash(
         message_id=message.message_id,
@@ -425,7 +436,7 @@ def set_district(call: CallbackQuery):
         payload={"district_id": district_id},
     )
 
-    lpus = Gorzdrav.get_lpus(districtId=district_id)
+    lpus = catalog.get_lpus(districtId=district_id)
 
     buttons = keyboard_service.get_lpus_buttons(lpus)
 
@@ -486,7 +497,7 @@ def set_lpu(call: CallbackQuery):
         return
 
     lpu_id = command
-    lpu = Gorzdrav.get_lpu(lpuId=int(lpu_id))
+    lpu = catalog.get_lpu(lpuId=int(lpu_id))
 
     # установка состояния
     state_payload["lpu"] = lpu
@@ -496,7 +507,7 @@ def set_lpu(call: CallbackQuery):
         payload=state_payload,
     )
 
-    specialties = Gorzdrav.get_specialties(lpuId=int(lpu_id))
+    specialties = catalog.get_specialties(lpuId=int(lpu_id))
     buttons: list[ButtonSchema] = keyboard_service.get_specialties_buttons(
         specialties=specialties
     )
@@ -560,9 +571,10 @@ def set_specialty(call: CallbackQuery):
     specialty_id = command
 
     lpu = state_payload["lpu"]
-    doctors = Gorzdrav.get_doctors(lpuId=lpu.id, specialtyId=specialty_id)
+    # количество мест у врачей запрашивается у горздрава, а не из копии
+    doctors, is_live = catalog.get_live_doctors(lpuId=lpu.id, specialtyId=specialty_id)
 
-    buttons = keyboard_service.get_doctor_buttons(doctors)
+    buttons = keyboard_service.get_doctor_buttons(doctors, show_counts=is_live)
 
     keyboard_service.save_buttons(
         user_id=call.from_user.id,
@@ -586,7 +598,8 @@ def set_specialty(call: CallbackQuery):
 
     bot.send_message(
         chat_id=call.message.chat.id,
-        text=f"Выберите врача в медучреждении {lpu.lpuFullName}:",
+        text=f"Выберите врача в медучреждении {lpu.lpuFullName}:"
+        + ("" if is_live else "\nГорздрав не ответил, количество мест не показано."),
         reply_markup=kb,
     )
 
@@ -623,30 +636,38 @@ def set_doctor(call: CallbackQuery):
         )
         return
 
-    doctor_id = command
-
     district_id: str = state_payload["district_id"]
     lpu: api_models.ApiLPU = state_payload["lpu"]
     specialty_id = state_payload["specialty_id"]
 
-    doctor: checker.Doctor | None = Gorzdrav.get_doctor(
+    db_doctor = pydantic_models.DbDoctorToCreate(
+        districtId=district_id,
         lpuId=lpu.id,
         specialtyId=specialty_id,
-        doctorId=doctor_id,
+        doctorId=command,
+    )
+    save_user_doctor(chat_id=call.message.chat.id, user_id=user_id, db_doctor=db_doctor)
+
+
+def save_user_doctor(
+    chat_id: int, user_id: int, db_doctor: pydantic_models.DbDoctorToCreate
+) -> None:
+    """
+    Проверяет врача в горздраве, назначает его пользователю
+    и отправляет пользователю информацию о враче
+    """
+    doctor: api_models.ApiDoctor | None = Gorzdrav.get_doctor(
+        lpuId=db_doctor.lpuId,
+        specialtyId=db_doctor.specialtyId,
+        doctorId=db_doctor.doctorId,
     )
     if doctor is None:
         bot.send_message(
-            chat_id=call.message.chat.id,
+            chat_id=chat_id,
             text="Не удалось получить информацию о враче. Попробуйте еще раз.",
         )
         return
 
-    db_doctor = pydantic_models.DbDoctorToCreate(
-        districtId=district_id,
-        lpuId=lpu.id,
-        specialtyId=specialty_id,
-        doctorId=doctor_id,
-    )
     doctor_id = DB.add_doctor(doctor=db_doctor)
     DB.add_user_doctor(user_id=user_id, doctor_id=doctor_id)
 
@@ -657,9 +678,9 @@ def set_doctor(call: CallbackQuery):
         return
 
     link: str = Gorzdrav.generate_link(
-        districtId=district_id,
-        lpuId=lpu.id,
-        specialtyId=specialty_id,
+        districtId=db_doctor.districtId,
+        lpuId=db_doctor.lpuId,
+        specialtyId=db_doctor.specialtyId,
         scheduleId=doctor_id,
     )
     text: str = TgMessageComposer.get_doc_selected_message_md(
@@ -671,13 +692,118 @@ def set_doctor(call: CallbackQuery):
     )
 
     bot.send_message(
-        chat_id=call.message.chat.id,
+        chat_id=chat_id,
         text=text,
         parse_mode="markdown",
         disable_web_page_preview=True,
     )
 
 
+@bot.message_handler(commands=["find"])  # type: ignore
+@is_user_profile
+def find_doctor(message: Message):
+    """
+    Поиск врача по фамилии, специальности или медучреждению
+    в локальной копии справочников
+    """
+    if message.from_user is None:
+        return
+    user_id = message.from_user.id
+    query = extract_arguments(message.text or "") or ""
+    doctors = catalog.search_doctors(query, limit=Config.CATALOG_SEARCH_LIMIT)
+    if not doctors:
+        bot.reply_to(
+            message,
+            "Врачи не найдены.\n"
+            + "Напишите фамилию врача, специальность или медучреждение, "
+            + "например /find иванов терапевт",
+        )
+        return
+
+    buttons = keyboard_service.get_found_doctors_buttons(doctors)
+    keyboard_service.save_buttons(
+        message_id=message.message_id,
+        chat_id=message.chat.id,
+        user_id=user_id,
+        buttons=buttons,
+    )
+    message_hash = keyboard_service.get_short_message_hash(
+        message_id=message.message_id,
+        chat_id=message.chat.id,
+        user_id=user_id,
+    )
+    kb = keyboard_service.get_keyboard_markup(
+        message_hash=message_hash,
+        page_number=0,
+    )
+    bot.send_message(
+        chat_id=message.chat.id,
+        text="Выберите врача",
+        reply_markup=kb,
+    )
+
+
+@bot.inline_handler(func=lambda query: True)  # type: ignore
+def find_doctor_inline(query: InlineQuery):
+    """
+    Поиск врача в inline-режиме. Кнопка под найденным врачом
+    назначает его пользователю в личном чате с ботом
+    """
+    doctors = catalog.search_doctors(query.query, limit=Config.CATALOG_SEARCH_LIMIT)
+    results = []
+    for doctor in doctors:
+        description = keyboard_service.get_found_doctor_description(doctor)
+        kb = InlineKeyboardMarkup()
+        kb.add(
+            InlineKeyboardButton(
+                text="Выбрать врача",
+                callback_data=keyboard_service.get_found_doctor_callback(doctor),
+            )
+        )
+        results.append(
+            InlineQueryResultArticle(
+                id=keyboard_service.get_found_doctor_id(doctor),
+                title=doctor.doctorName,
+                description=description,
+                input_message_content=InputTextMessageContent(
+                    f"{doctor.doctorName}\n{description}"
+                ),
+                reply_markup=kb,
+            )
+        )
+    bot.answer_inline_query(query.id, results)
+
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith("find/"))  # type: ignore
+@handle_gorzdrav_exceptions
+def set_found_doctor(call: CallbackQuery):
+    """Назначает пользователю врача из результатов поиска"""
+    if call.data is None:
+        return
+    parts = call.data.split("/")
+    if len(parts) != 3:
+        logger.error(f"{call.data} have not 3 parts")
+        return
+    _, lpu_id, doctor_hash = parts
+    user_id = call.from_user.id
+    if DB.get_user(user_id=user_id) is None:
+        bot.answer_callback_query(
+            call.id, text="Используйте команду /start для создания профиля."
+        )
+        return
+    db_doctor = catalog.get_found_doctor(lpuId=int(lpu_id), doctor_hash=doctor_hash)
+    if db_doctor is None:
+        bot.answer_callback_query(
+            call.id, text="Врач не найден в справочнике, повторите поиск."
+        )
+        return
+    bot.answer_callback_query(call.id)
+
+    # у сообщения из inline-режима нет чата, отвечаем в личный чат с ботом
+    chat_id = call.message.chat.id if call.message else user_id
+    save_user_doctor(chat_id=chat_id, user_id=user_id, db_doctor=db_doctor)
+
+
 @bot.message_handler(commands=["id"])  # type: ignore
 def id_message(message: Message):
     """
@@ -806,12 +932,34 @@ if __name__ == "__main__":
     )
     logger.info("Bot started")
 
-    # запускаем процесс с отправкой уведомлений
-    old_scheduler = multiprocessing.Process(
-        target=checker.old_scheduler,
-        name="gorzdrav_checker",
-        kwargs={"timeout_secs": Config.CHECKER_TIMEOUT_SECS},
-        daemon=True,
-    )
-    old_scheduler.start()
+    # запускаем процессы с отправкой уведомлений,
+    # врачи делятся между ними через аренду шардов в БД
+    for worker_index in range(Config.CHECKER_WORKERS):
+        checker_worker = multiprocessing.Process(
+            target=checker.run_worker,
+            name=f"gorzdrav_checker_{worker_index}",
+            kwargs={
+                "mode": Config.CHECKER_MODE,
+                "timeout_secs": Config.CHECKER_TIMEOUT_SECS,
+                "worker_index": worker_index,
+            },
+            daemon=True,
+        )
+        checker_worker.start()
+    if Config.CATALOG_SYNC:
+        # у синхронизации своё соединение с БД, пишет в него только её поток
+        catalog_sync = CatalogSync(
+            db=SqliteDb(db_path=Config.DB_FILE),
+            concurrency=Config.CATALOG_SYNC_CONCURRENCY,
+            refresh_secs=Config.CATALOG_SYNC_INTERVAL_SECS,
+        )
+        threading.Thread(
+            target=catalog_sync.run_forever,
+            name="gorzdrav_catalog_sync",
+            kwargs={
+                "interval_secs": Config.CATALOG_SYNC_INTERVAL_SECS,
+                "stop": threading.Event(),
+            },
+            daemon=True,
+        ).start()
     bot.polling(none_stop=True)
@@ -0,0 +1,337 @@
+"""
+Задержка обработчиков бота на синтетических или записанных апдейтах телеграма.
+Апдейты подаются прямо в диспетчер telebot.TeleBot, запросы к Bot API
+перехватываются FakeTelegramApi, api горздрава - заглушка benchmarks.gorzdrav_stub.
+Каждый синтетический пользователь проходит сценарий
+/start, /set_doctor, листание, район, медучреждение, специальность, врач, /status, /on.
+Выводятся перцентили задержки по обработчикам и пропускная способность.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_bot --users 200 --concurrency 16
+    python -m benchmarks.bench_bot --replay updates.jsonl
+
+В файле для --replay каждая строка - json апдейта из getUpdates.
+--concurrency - число потоков, подающих апдейты, как потоки telebot в проде.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable
+
+import telebot
+from telebot import apihelper
+from telebot.types import Update
+
+from benchmarks.bench_checker import UNLIMITED_ENV
+from benchmarks.gorzdrav_stub import GorzdravStub, StubData
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+
+
+def get_percentile(values: list[float], percent: float) -> float:
+    """Значение, в которое уложились percent% измерений"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+class FakeResponse:
+    """Ответ Bot API в том виде, в котором его читает telebot.apihelper"""
+
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self.text = json.dumps(body, ensure_ascii=False)
+        self.__body = body
+
+    def json(self) -> dict:
+        return self.__body
+
+
+class FakeTelegramApi:
+    """
+    Транспорт Bot API для apihelper.CUSTOM_REQUEST_SENDER.
+    Отвечает на запросы бота как телеграм, запоминает последнее
+    сообщение бота в каждом чате, чтобы сценарий мог нажимать его кнопки.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: dict[str, int] = {}
+        self.__last_messages: dict[int, dict] = {}
+        self.__message_id = 0
+        self.__lock = threading.Lock()
+
+    def install(self) -> None:
+        apihelper.CUSTOM_REQUEST_SENDER = self
+
+    def uninstall(self) -> None:
+        apihelper.CUSTOM_REQUEST_SENDER = None
+
+    def get_last_message(self, chat_id: int) -> dict | None:
+        with self.__lock:
+            return self.__last_messages.get(chat_id)
+
+    def __call__(
+        self, method: str, url: str, params: dict | None = None, **kwargs: Any
+    ) -> FakeResponse:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        method_name = url.rsplit("/", 1)[-1]
+        params = params or {}
+        with self.__lock:
+            self.calls[method_name] = self.calls.get(method_name, 0) + 1
+        if method_name == "getMe":
+            return FakeResponse({"ok": True, "result": BOT_USER})
+        if method_name in ("sendMessage", "editMessageText"):
+            return FakeResponse({"ok": True, "result": self.__save_message(params)})
+        return FakeResponse({"ok": True, "result": True})
+
+    def __save_message(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        with self.__lock:
+            if "message_id" in params:
+                message_id = int(params["message_id"])
+            else:
+                self.__message_id += 1
+                message_id = self.__message_id
+            message = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+            if params.get("reply_markup"):
+                message["reply_markup"] = json.loads(params["reply_markup"])
+            self.__last_messages[chat_id] = message
+        return message
+
+
+class HandlerTimings:
+    """Длительности и ошибки вызовов по имени обработчика"""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, name: str, duration: float, failed: bool = False) -> None:
+        with self.__lock:
+            self.durations.setdefault(name, []).append(duration)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def get_report(self) -> list[str]:
+        lines = []
+        with self.__lock:
+            items = sorted(self.durations.items())
+        for name, durations in items:
+            p50, p90, p99, p100 = (
+                get_percentile(durations, percent) * 1000
+                for percent in (50, 90, 99, 100)
+            )
+            lines.append(
+                f"{name:<24} {len(durations):>6} calls, "
+                f"p50 {p50:7.1f} ms, p90 {p90:7.1f} ms, p99 {p99:7.1f} ms, "
+                f"max {p100:7.1f} ms, errors {self.errors.get(name, 0)}"
+            )
+        return lines
+
+
+class BotReplayHarness:
+    """
+    Подаёт апдейты в диспетчер бота и замеряет время каждого обработчика.
+    Бот переводится в однопоточный режим: обработчик выполняется в потоке,
+    подавшем апдейт, поэтому параллельность задаётся числом потоков вызывающего.
+    """
+
+    def __init__(self, bot: telebot.TeleBot, api: FakeTelegramApi):
+        self.bot = bot
+        self.api = api
+        self.timings = HandlerTimings()
+        self.__update_id = 0
+        self.__lock = threading.Lock()
+        bot.threaded = False
+        for handler in bot.message_handlers + bot.callback_query_handlers:
+            handler["function"] = self.__timed(handler["function"])
+
+    def __timed(self, function: Callable) -> Callable:
+        # wraps сохраняет сигнатуру, по которой telebot выбирает аргументы
+        @wraps(function)
+        def wrapper(message):
+            start_time = time.perf_counter()
+            failed = False
+            try:
+                return function(message)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self.timings.record(
+                    function.__name__, time.perf_counter() - start_time, failed
+                )
+
+        return wrapper
+
+    def __next_update_id(self) -> int:
+        with self.__lock:
+            self.__update_id += 1
+            return self.__update_id
+
+    @staticmethod
+    def get_user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    def make_message_update(self, user_id: int, text: str) -> dict:
+        return {
+            "update_id": self.__next_update_id(),
+            "message": {
+                "message_id": self.__next_update_id(),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self.get_user(user_id),
+                "text": text,
+            },
+        }
+
+    def make_callback_update(self, user_id: int, data: str, message: dict) -> dict:
+        return {
+            "update_id": self.__next_update_id(),
+            "callback_query": {
+                "id": str(self.__next_update_id()),
+                "from": self.get_user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": message,
+            },
+        }
+
+    def process(self, update: dict) -> None:
+        """Обрабатывает апдейт синхронно, время всего апдейта пишется как update"""
+        start_time = time.perf_counter()
+        failed = False
+        try:
+            self.bot.process_new_updates([Update.de_json(update)])
+        except Exception:
+            failed = True
+        self.timings.record("update", time.perf_counter() - start_time, failed)
+
+    def replay(self, updates: Iterable[dict], concurrency: int = 1) -> None:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(self.process, updates))
+
+    def click(self, user_id: int, pattern: str, rnd: random.Random) -> bool:
+        """
+        Нажимает случайную кнопку, в callback_data которой есть pattern,
+        в последнем сообщении бота пользователю
+        Returns:
+            bool: нашлась ли кнопка
+        """
+        message = self.api.get_last_message(user_id)
+        if message is None:
+            return False
+        callbacks = [
+            button["callback_data"]
+            for row in message.get("reply_markup", {}).get("inline_keyboard", [])
+            for button in row
+            if pattern in button.get("callback_data", "")
+            and not button["callback_data"].endswith("/back")
+        ]
+        if not callbacks:
+            return False
+        self.process(self.make_callback_update(user_id, rnd.choice(callbacks), message))
+        return True
+
+    def run_user_scenario(self, user_id: int, seed: int = 0) -> None:
+        """Сценарий пользователя: профиль, выбор врача по кнопкам, статус"""
+        rnd = random.Random(f"{seed}:{user_id}")
+        self.process(self.make_message_update(user_id, "/start"))
+        self.process(self.make_message_update(user_id, "/set_doctor"))
+        # листание районов, если они не помещаются на одну страницу
+        self.click(user_id, "/page/", rnd)
+        for pattern in ("district/", "lpu/", "specialty/", "doctor/"):
+            if not self.click(user_id, pattern, rnd):
+                return
+        self.process(self.make_message_update(user_id, "/status"))
+        self.process(self.make_message_update(user_id, "/on"))
+
+
+def read_updates(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--replay", help="jsonl файл с записанными апдейтами")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tg-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-limits", action="store_true")
+    args = parser.parse_args()
+
+    stub = GorzdravStub(
+        data=StubData(seed=args.seed),
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+    ).start()
+    tmp_dir = tempfile.TemporaryDirectory()
+    # конфиг читается при импорте, поэтому окружение задаётся до импорта бота
+    if not args.keep_limits:
+        os.environ.update(UNLIMITED_ENV)
+    os.environ.update(
+        {
+            "BOT_TOKEN": "123456:bench",
+            "DB_FILE": os.path.join(tmp_dir.name, "bench_bot.db"),
+            "GORZDRAV_API": stub.api_url,
+            "GORZDRAV_CACHE_FILE": "",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        }
+    )
+    import app
+
+    api = FakeTelegramApi(latency_ms=args.tg_latency_ms)
+    api.install()
+    harness = BotReplayHarness(bot=app.bot, api=api)
+    start_time = time.perf_counter()
+    try:
+        if args.replay:
+            harness.replay(read_updates(args.replay), concurrency=args.concurrency)
+        else:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(
+                    executor.map(
+                        lambda user_id: harness.run_user_scenario(user_id, args.seed),
+                        range(1, args.users + 1),
+                    )
+                )
+    finally:
+        duration = time.perf_counter() - start_time
+        api.uninstall()
+        stub.stop()
+        tmp_dir.cleanup()
+
+    updates = len(harness.timings.durations.get("update", []))
+    print(
+        f"{updates} updates in {duration:.2f} s ({updates / duration:.0f}/s), "
+        f"concurrency {args.concurrency}, gorzdrav requests {sum(stub.requests.values())}"
+    )
+    for line in harness.timings.get_report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
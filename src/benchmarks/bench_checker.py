@@ -0,0 +1,200 @@
+"""
+Пропускная способность чекера на заглушке горздрава без сети.
+Для каждого размера создаётся временная БД с N отслеживаемыми врачами
+(по одному пользователю на врача), затем в отдельном процессе
+выполняется один цикл проверки. Выводятся длительность цикла,
+запросов в секунду к api, отправленные сообщения и пиковый RSS процесса чекера.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_checker
+    python -m benchmarks.bench_checker --sizes 100 1000 --mode async --latency-ms 50
+
+Лимиты частоты запросов и рассылки по умолчанию сняты, чтобы мерить сам чекер,
+с --keep-limits используются значения из окружения.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.gorzdrav_stub import GorzdravStub, StubData
+
+SIZES = (100, 1_000, 10_000)
+# переменные окружения процесса чекера без лимитов частоты
+UNLIMITED_ENV = {
+    "GORZDRAV_RATE_PER_SEC": "100000",
+    "GORZDRAV_RATE_MAX_PER_SEC": "100000",
+    "GORZDRAV_RATE_BURST": "100000",
+    "GORZDRAV_RATE_GLOBAL_PER_SEC": "100000",
+    "TG_RATE_PER_SEC": "100000",
+    "TG_CHAT_RATE_PER_SEC": "100000",
+    "CHECKER_MAX_CONCURRENCY_PER_LPU": "4",
+}
+
+
+def create_db(db_path: str, size: int, data: StubData) -> None:
+    """БД с size врачами из данных заглушки и пингующим пользователем на каждого"""
+    from db.sqlite_db import SqliteDb
+    from models.pydantic_models import DbDoctorToCreate, DbUser
+
+    db = SqliteDb(db_path=db_path)
+    # ускоряет наполнение, на сам цикл не влияет
+    db.cursor.execute("PRAGMA synchronous = OFF")
+    now = datetime.datetime.now(datetime.UTC)
+    specialties_count = data.lpus * data.specialties_per_lpu
+    if size > specialties_count * data.doctors_per_specialty:
+        raise ValueError(f"stub has less than {size} doctors")
+    for i in range(size):
+        lpuId = i % data.lpus + 1
+        specialty = i // data.lpus % data.specialties_per_lpu
+        doctor = i // specialties_count
+        lpu = data.get_lpu(lpuId)
+        assert lpu is not None
+        doctor_id = db.add_doctor(
+            DbDoctorToCreate(
+                districtId=lpu["districtId"],
+                lpuId=lpuId,
+                specialtyId=str(specialty),
+                doctorId=data.get_doctors(lpuId, specialty)[doctor]["id"],
+            )
+        )
+        db.add_user(
+            DbUser(id=i + 1, ping_status=True, doctor_id=doctor_id, last_seen=now)
+        )
+    db.connection.close()
+
+
+def run_cycle(mode: str) -> dict:
+    """Один цикл проверки в текущем процессе, окружение уже настроено"""
+    import aiohttp
+
+    import checker
+    from config import Config
+    from core.profiling import phase_timer
+    from gorzdrav.async_api import AsyncGorzdrav
+
+    async def run_async_cycle():
+        timeout = aiohttp.ClientTimeout(total=Config.GORZDRAV_TIMEOUT_SECS)
+        connector = aiohttp.TCPConnector(limit=Config.CHECKER_MAX_CONCURRENCY)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
+            await checker.async_sql_checker(client=AsyncGorzdrav(session=session))
+
+    checker.start_cycle()
+    start_time = time.perf_counter()
+    if mode == "async":
+        asyncio.run(run_async_cycle())
+    else:
+        checker.raw_sql_checker()
+    duration = time.perf_counter() - start_time
+    return {
+        "cycle_secs": duration,
+        # на linux ru_maxrss в килобайтах
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "phases": phase_timer.pop_totals(),
+    }
+
+
+def run_size(
+    stub: GorzdravStub, size: int, mode: str, keep_limits: bool, tmp_dir: str
+) -> dict:
+    db_path = os.path.join(tmp_dir, f"bench_{size}.db")
+    create_db(db_path=db_path, size=size, data=stub.data)
+    result = run_child(stub=stub, db_path=db_path, mode=mode, keep_limits=keep_limits)
+    result["size"] = size
+    return result
+
+
+def run_child(stub: GorzdravStub, db_path: str, mode: str, keep_limits: bool) -> dict:
+    """Один цикл проверки БД db_path в отдельном процессе чекера на заглушке"""
+    env = dict(os.environ)
+    if not keep_limits:
+        env.update(UNLIMITED_ENV)
+    env.update(
+        {
+            "DB_FILE": db_path,
+            "BOT_TOKEN": env.get("BOT_TOKEN", "bench"),
+            "GORZDRAV_API": stub.api_url,
+            "TG_API_URL": stub.url,
+            "GORZDRAV_CACHE_FILE": "",
+            "LOG_LEVEL": "WARNING",
+        }
+    )
+    stub.reset_counters()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_checker", "--child", "--mode", mode],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["requests"] = stub.get_requests_count()
+    result["tg_messages"] = stub.tg_messages
+    return result
+
+
+def print_result(result: dict) -> None:
+    requests_per_sec = result["requests"] / result["cycle_secs"]
+    phases = ", ".join(
+        f"{name} {secs:.2f}s" for name, secs in sorted(result["phases"].items())
+    )
+    print(
+        f"{result['size']:>6} doctors: cycle {result['cycle_secs']:.2f} s, "
+        f"{result['requests']} requests ({requests_per_sec:.0f}/s), "
+        f"{result['tg_messages']} messages, peak RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    print(f"        phases: {phases}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест чекера")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--free-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-limits", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_cycle(mode=args.mode)))
+        return
+
+    stub = GorzdravStub(
+        data=StubData(seed=args.seed, free_ratio=args.free_ratio),
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+    ).start()
+    print(
+        f"mode {args.mode}, latency {args.latency_ms} ms, "
+        f"error rate {args.error_rate}, free ratio {args.free_ratio}"
+    )
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for size in args.sizes:
+                print_result(
+                    run_size(
+                        stub=stub,
+                        size=size,
+                        mode=args.mode,
+                        keep_limits=args.keep_limits,
+                        tmp_dir=tmp_dir,
+                    )
+                )
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Сравнение проверки лимита дней пользователей одного врача:
+check_appointments_in_user_limit_days на каждого пользователя
+против ближайшего назначения, посчитанного один раз на врача.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_limit_days
+"""
+
+import datetime
+import random
+import timeit
+
+from core.checker_app import CheckerApp
+from gorzdrav.models import ApiAppointment
+from models.pydantic_models import DbUser
+
+USERS = 1_000
+APPOINTMENTS = 500
+REPEATS = 3
+
+
+def make_appointments(count: int) -> list[ApiAppointment]:
+    now = datetime.datetime.now()
+    appointments = []
+    for i in range(count):
+        visit = now + datetime.timedelta(days=random.randint(-3, 60), minutes=i)
+        appointments.append(
+            ApiAppointment(
+                id=str(i),
+                visitStart=visit,
+                visitEnd=visit + datetime.timedelta(minutes=15),
+                number=i,
+                room=None,
+            )
+        )
+    return appointments
+
+
+def check_reference(appointments: list[ApiAppointment], users: list[DbUser]) -> int:
+    return sum(
+        CheckerApp.check_appointments_in_user_limit_days(
+            appointments=appointments, user=user
+        )
+        for user in users
+    )
+
+
+def check_offset(appointments: list[ApiAppointment], users: list[DbUser]) -> int:
+    nearest_offset = CheckerApp.get_nearest_appointment_offset(appointments)
+    return sum(
+        CheckerApp.is_offset_in_user_limit_days(
+            nearest_offset=nearest_offset, user=user
+        )
+        for user in users
+    )
+
+
+def main():
+    random.seed(0)
+    appointments = make_appointments(APPOINTMENTS)
+    users = [DbUser(id=i, limit_days=random.randint(1, 30)) for i in range(USERS)]
+    assert check_reference(appointments, users) == check_offset(appointments, users)
+
+    reference = min(
+        timeit.repeat(
+            lambda: check_reference(appointments, users), number=1, repeat=REPEATS
+        )
+    )
+    offset = min(
+        timeit.repeat(
+            lambda: check_offset(appointments, users), number=1, repeat=REPEATS
+        )
+    )
+    print(f"{USERS} users x {APPOINTMENTS} appointments")
+    print(f"check_appointments_in_user_limit_days: {reference * 1000:.1f} ms")
+    print(f"nearest appointment offset:            {offset * 1000:.3f} ms")
+    print(f"speedup: x{reference / offset:.0f}")
+
+
+if __name__ == "__main__":
+    main()
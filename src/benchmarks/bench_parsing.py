@@ -0,0 +1,71 @@
+"""
+Сравнение разбора ответа горздрава со списком назначений:
+response.json() + ApiResponse(**json) + model(**item) на каждый элемент
+против ResponseParser, который разбирает байты сразу в типизированный результат.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_parsing
+"""
+
+import datetime
+import json
+import timeit
+from typing import Any
+
+from gorzdrav.models import ApiAppointment, ApiResponse
+from gorzdrav.parsing import ResponseParser, orjson
+
+SIZES = (100, 1_000, 10_000)
+REPEATS = 5
+
+
+def make_body(count: int) -> bytes:
+    now = datetime.datetime.now().replace(microsecond=0)
+    appointments = []
+    for i in range(count):
+        visit = now + datetime.timedelta(minutes=15 * i)
+        appointments.append(
+            {
+                "id": f"{i:08d}-appointment",
+                "visitStart": visit.isoformat(),
+                "visitEnd": (visit + datetime.timedelta(minutes=15)).isoformat(),
+                "address": "ул. Тестовая, д. 1",
+                "number": i,
+                "room": str(i % 300),
+            }
+        )
+    response = {"success": True, "errorCode": 0, "result": appointments}
+    return json.dumps(response, ensure_ascii=False).encode()
+
+
+def parse_reference(body: bytes) -> list[ApiAppointment]:
+    api_response = ApiResponse(**json.loads(body))
+    return [ApiAppointment(**item) for item in api_response.result]
+
+
+def parse_direct(body: bytes, backend: str) -> list[ApiAppointment]:
+    return ResponseParser.parse(body, list[ApiAppointment], backend=backend).result
+
+
+def measure(function: Any) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def main():
+    backends = ["pydantic"] + (["orjson"] if orjson is not None else [])
+    print(
+        f"json backends: {', '.join(backends)}, default {ResponseParser.default_backend}"
+    )
+    for size in SIZES:
+        body = make_body(size)
+        assert parse_reference(body) == parse_direct(body, "pydantic")
+        reference = measure(lambda: parse_reference(body))
+        line = f"{size:>6} appointments: json + models {reference * 1000:8.2f} ms"
+        for backend in backends:
+            direct = measure(lambda: parse_direct(body, backend))
+            line += f", {backend} {direct * 1000:8.2f} ms (x{reference / direct:.1f})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
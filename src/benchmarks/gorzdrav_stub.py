@@ -0,0 +1,382 @@
+"""
+Локальная заглушка API горздрава и Bot API телеграма для нагрузочных тестов.
+Данные генерируются из seed, задержка и доля ошибок настраиваются.
+
+Запуск из каталога src:
+    python -m benchmarks.gorzdrav_stub --port 8080 --lpus 50 --latency-ms 50
+
+Чекер направляется на заглушку переменными окружения:
+    GORZDRAV_API=http://127.0.0.1:8080/_api/api TG_API_URL=http://127.0.0.1:8080
+"""
+
+import argparse
+import datetime
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+API_PREFIX = "/_api/api/v2"
+# id врача = номер специальности * DOCTORS_ID_BASE + номер врача
+DOCTORS_ID_BASE = 1000
+
+
+class StubData:
+    """
+    Справочники и расписание, полностью определяемые seed.
+    Медучреждения нумеруются с 1, специальности и врачи внутри них с 0.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        districts: int = 18,
+        lpus: int = 100,
+        specialties_per_lpu: int = 20,
+        doctors_per_specialty: int = 10,
+        free_ratio: float = 0.1,
+    ):
+        self.seed = seed
+        self.districts = districts
+        self.lpus = lpus
+        self.specialties_per_lpu = specialties_per_lpu
+        self.doctors_per_specialty = doctors_per_specialty
+        self.free_ratio = free_ratio
+        self.today = datetime.date.today()
+
+    def __random(self, *key: Any) -> random.Random:
+        return random.Random(":".join(map(str, (self.seed,) + key)))
+
+    def get_districts(self) -> list[dict]:
+        return [
+            {"id": str(i), "name": f"Район {i}"} for i in range(1, self.districts + 1)
+        ]
+
+    def get_lpu(self, lpuId: int) -> dict | None:
+        if not 1 <= lpuId <= self.lpus:
+            return None
+        return {
+            "id": lpuId,
+            "districtId": str(lpuId % self.districts + 1),
+            "lpuFullName": f"Поликлиника №{lpuId}",
+            "address": f"ул. Тестовая, д. {lpuId}",
+        }
+
+    def get_lpus(self, districtId: str | None = None) -> list[dict]:
+        lpus = [self.get_lpu(lpuId) for lpuId in range(1, self.lpus + 1)]
+        return [
+            lpu
+            for lpu in lpus
+            if lpu is not None
+            and (districtId is None or lpu["districtId"] == districtId)
+        ]
+
+    def get_free_places(self, lpuId: int, specialty: int, doctor: int) -> int:
+        rnd = self.__random("free", lpuId, specialty, doctor)
+        if rnd.random() >= self.free_ratio:
+            return 0
+        return rnd.randint(1, 5)
+
+    def __get_visit(self, rnd: random.Random) -> datetime.datetime:
+        day = self.today + datetime.timedelta(days=rnd.randint(0, 14))
+        return datetime.datetime.combine(day, datetime.time(hour=rnd.randint(8, 19)))
+
+    def get_doctors(self, lpuId: int, specialty: int) -> list[dict]:
+        doctors = []
+        for doctor in range(self.doctors_per_specialty):
+            free = self.get_free_places(lpuId, specialty, doctor)
+            rnd = self.__random("doctor", lpuId, specialty, doctor)
+            nearest = self.__get_visit(rnd) if free else None
+            doctors.append(
+                {
+                    "id": str(specialty * DOCTORS_ID_BASE + doctor),
+                    "name": f"Врач {lpuId}-{specialty}-{doctor}",
+                    "freeParticipantCount": free,
+                    "freeTicketCount": free,
+                    "nearestDate": nearest.isoformat() if nearest else None,
+                    "lastDate": nearest.isoformat() if nearest else None,
+                }
+            )
+        return doctors
+
+    def get_specialties(self, lpuId: int) -> list[dict]:
+        specialties = []
+        for specialty in range(self.specialties_per_lpu):
+            free = sum(
+                self.get_free_places(lpuId, specialty, doctor)
+                for doctor in range(self.doctors_per_specialty)
+            )
+            specialties.append(
+                {
+                    "id": str(specialty),
+                    "name": f"Специальность {specialty}",
+                    "countFreeParticipant": free,
+                    "countFreeTicket": free,
+                }
+            )
+        return specialties
+
+    def get_appointments(self, lpuId: int, doctorId: str) -> list[dict]:
+        specialty, doctor = divmod(int(doctorId), DOCTORS_ID_BASE)
+        free = self.get_free_places(lpuId, specialty, doctor)
+        rnd = self.__random("appointments", lpuId, specialty, doctor)
+        appointments = []
+        for number in range(free):
+            visit = self.__get_visit(rnd)
+            appointments.append(
+                {
+                    "id": f"{lpuId}-{doctorId}-{number}",
+                    "visitStart": visit.isoformat(),
+                    "visitEnd": (visit + datetime.timedelta(minutes=15)).isoformat(),
+                    "number": number,
+                    "room": str(rnd.randint(1, 300)),
+                }
+            )
+        return appointments
+
+    def get_timetable(self, lpuId: int, doctorId: str) -> list[dict]:
+        appointments = self.get_appointments(lpuId, doctorId)
+        return [
+            {
+                "appointments": [appointment],
+                "denyCause": None,
+                "recordableDay": True,
+                "visitStart": appointment["visitStart"],
+                "visitEnd": appointment["visitEnd"],
+            }
+            for appointment in appointments
+        ]
+
+
+class GorzdravStub:
+    """
+    http сервер с эндпоинтами GorzdravEndpoint и sendMessage телеграма.
+    Считает запросы по эндпоинтам и запоминает отправленные сообщения.
+    """
+
+    routes: list[tuple[str, re.Pattern]] = [
+        ("districts", re.compile(r"/shared/districts")),
+        ("lpus", re.compile(r"/shared/lpus")),
+        ("district_lpus", re.compile(r"/shared/district/(?P<districtId>[^/]+)/lpus")),
+        ("lpu", re.compile(r"/shared/lpu/(?P<lpuId>-?\d+)")),
+        ("specialties", re.compile(r"/schedule/lpu/(?P<lpuId>-?\d+)/specialties")),
+        (
+            "doctors",
+            re.compile(
+                r"/schedule/lpu/(?P<lpuId>-?\d+)/speciality/(?P<specialtyId>\d+)/doctors"
+            ),
+        ),
+        (
+            "timetable",
+            re.compile(
+                r"/schedule/lpu/(?P<lpuId>-?\d+)/doctor/(?P<doctorId>\d+)/timetable"
+            ),
+        ),
+        (
+            "appointments",
+            re.compile(
+                r"/schedule/lpu/(?P<lpuId>-?\d+)/doctor/(?P<doctorId>\d+)/appointments"
+            ),
+        ),
+    ]
+
+    def __init__(
+        self,
+        data: StubData,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_code: int = 602,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.data = data
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.requests: dict[str, int] = {}
+        self.tg_messages = 0
+        # (chat_id, text) отправленных сообщений
+        self.tg_sent: list[tuple[str, str]] = []
+        self.__lock = threading.Lock()
+        self.__random = random.Random(data.seed)
+        self.server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.server.daemon_threads = True
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        """Значение для GORZDRAV_API"""
+        return f"{self.url}/_api/api"
+
+    def start(self) -> "GorzdravStub":
+        self.__thread = threading.Thread(
+            target=self.server.serve_forever, name="gorzdrav_stub", daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_requests_count(self) -> int:
+        with self.__lock:
+            return sum(self.requests.values())
+
+    def reset_counters(self) -> None:
+        with self.__lock:
+            self.requests = {}
+            self.tg_messages = 0
+            self.tg_sent = []
+
+    def __count(self, name: str) -> None:
+        with self.__lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def __should_fail(self) -> bool:
+        with self.__lock:
+            return self.__random.random() < self.error_rate
+
+    def handle_api(self, path: str) -> tuple[int, dict]:
+        """Ответ на запрос к api горздрава: http код и json"""
+        if not path.startswith(API_PREFIX):
+            return 404, {}
+        path = path.removeprefix(API_PREFIX)
+        for name, pattern in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            self.__count(name)
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            if self.__should_fail():
+                return 200, {
+                    "success": False,
+                    "errorCode": self.error_code,
+                    "message": "Медорганизация не отвечает",
+                    "result": None,
+                }
+            result = self.get_result(name, match.groupdict())
+            if result is None:
+                return 200, {
+                    "success": False,
+                    "errorCode": 404,
+                    "message": "Не найдено",
+                    "result": None,
+                }
+            return 200, {"success": True, "errorCode": 0, "result": result}
+        return 404, {}
+
+    def get_result(self, name: str, params: dict[str, str]) -> Any:
+        data = self.data
+        if name == "districts":
+            return data.get_districts()
+        if name == "lpus":
+            return data.get_lpus()
+        if name == "district_lpus":
+            return data.get_lpus(districtId=params["districtId"])
+        lpuId = int(params["lpuId"])
+        if data.get_lpu(lpuId) is None:
+            return None
+        if name == "lpu":
+            return data.get_lpu(lpuId)
+        if name == "specialties":
+            return data.get_specialties(lpuId)
+        if name == "doctors":
+            return data.get_doctors(lpuId, int(params["specialtyId"]))
+        if name == "timetable":
+            return data.get_timetable(lpuId, params["doctorId"])
+        return data.get_appointments(lpuId, params["doctorId"])
+
+    def handle_telegram(self, message: dict[str, Any]) -> tuple[int, dict]:
+        """Ответ на sendMessage"""
+        with self.__lock:
+            self.tg_sent.append((str(message.get("chat_id")), message.get("text", "")))
+            self.tg_messages += 1
+            message_id = self.tg_messages
+        return 200, {"ok": True, "result": {"message_id": message_id}}
+
+    def __make_handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # заголовки и тело уходят одним пакетом, иначе keep-alive
+            # соединение ждёт delayed ACK по 40 мс на запрос
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def __reply(self, status: int, body: dict):
+                payload = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.__reply(*stub.handle_api(self.path.split("?")[0]))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode()
+                if self.path.endswith("/sendMessage"):
+                    if self.headers.get("Content-Type") == "application/json":
+                        message = json.loads(body)
+                    else:
+                        message = dict(urllib.parse.parse_qsl(body))
+                    self.__reply(*stub.handle_telegram(message))
+                else:
+                    self.__reply(404, {"ok": False})
+
+            def log_message(self, format, *args):
+                pass
+
+        return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка API горздрава")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lpus", type=int, default=100)
+    parser.add_argument("--specialties", type=int, default=20)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--free-ratio", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-code", type=int, default=602)
+    args = parser.parse_args()
+    stub = GorzdravStub(
+        data=StubData(
+            seed=args.seed,
+            lpus=args.lpus,
+            specialties_per_lpu=args.specialties,
+            doctors_per_specialty=args.doctors,
+            free_ratio=args.free_ratio,
+        ),
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        error_code=args.error_code,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"GORZDRAV_API={stub.api_url} TG_API_URL={stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
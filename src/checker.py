@@ -1,14 +1,32 @@
+import argparse
+import asyncio
 import logging
+import signal
+import sys
 import time
 import traceback
+from collections.abc import Iterable, Iterator
+from typing import Callable
+from urllib.parse import urlparse
+
+import aiohttp
 
 from config import Config, LoggerConfig
+from core.appointment_snapshots import AppointmentSnapshots
 from core.checker_app import CheckerApp
+from core.metrics import registry, start_metrics_server
+from core.profiling import CycleProfiler, phase_timer
+from core.scheduler import PriorityScheduler
+from core.shard_leases import ShardLeases
+from db.sqlite_db import SqliteDb
 from depends import sqlite_db as DB
 from gorzdrav.api import Gorzdrav
-from gorzdrav.exceptions import GorzdravExceptionBase
-from gorzdrav.models import ApiAppointment, Doctor
-from queries.orm import SyncOrm
+from gorzdrav.async_api import AsyncGorzdrav
+from gorzdrav.exceptions import CircuitOpenException, GorzdravExceptionBase
+from gorzdrav.models import ApiAppointmentRecord, ApiDoctorRecord, ApiSpecialty
+from gorzdrav.session import DnsCache
+from models.records import DbDoctorRecord, DbUserRecord
+from telegram.dispatcher import TgDispatcher
 from telegram.message_composer import TgMessageComposer
 from telegram.types import TGParseMode
 
@@ -19,7 +37,57 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-SyncOrm.create_tables()
+tg_dispatcher = TgDispatcher(
+    api_token=Config.BOT_TOKEN,
+    max_workers=Config.TG_SEND_WORKERS,
+    global_rate=Config.TG_RATE_PER_SEC,
+    chat_rate=Config.TG_CHAT_RATE_PER_SEC,
+    max_retries=Config.TG_SEND_RETRIES,
+    api_url=Config.TG_API_URL,
+)
+# последние назначения врачей, чтобы не проверять пользователей без изменений
+appointment_snapshots = AppointmentSnapshots()
+# метрики процесса чекера, отдаются на METRICS_PORT
+cycle_duration = registry.gauge(
+    "checker_cycle_duration_seconds", "Длительность последнего цикла проверки"
+)
+last_cycle_timestamp = registry.gauge(
+    "checker_last_cycle_timestamp_seconds", "Время окончания последнего цикла"
+)
+seconds_since_last_cycle = registry.gauge(
+    "checker_seconds_since_last_cycle", "Сколько секунд прошло с конца последнего цикла"
+)
+seconds_since_last_cycle.set_function(lambda: time.time() - last_cycle_timestamp.get())
+last_cycle_timestamp.set(time.time())
+active_doctors = registry.gauge(
+    "checker_active_doctors", "Отслеживаемые врачи этого воркера"
+)
+active_watchers = registry.gauge(
+    "checker_active_watchers", "Пользователи, ждущие талон у врачей этого воркера"
+)
+notifications_total = registry.counter(
+    "checker_notifications_total", "Оповещения пользователей", labels=("status",)
+)
+doctors_lists_total = registry.counter(
+    "checker_doctors_lists_total",
+    "Списки врачей: fetched - запрошены, pruned - пропущены по счётчикам специальностей",
+    labels=("result",),
+)
+appointment_changes_total = registry.counter(
+    "checker_appointment_changes_total",
+    "Изменения назначений врачей с прошлой проверки",
+    labels=("change",),
+)
+phase_seconds_total = registry.counter(
+    "checker_phase_seconds_total",
+    "Время по фазам цикла проверки",
+    labels=("phase",),
+)
+
+# аренда шардов врачей, задаётся при запуске воркера
+shard_leases: ShardLeases | None = None
+# профилирование циклов, задаётся при запуске воркера с --profile
+cycle_profiler: CycleProfiler | None = None
 
 
 def old_scheduler(timeout_secs: int):
@@ -27,60 +95,694 @@ def old_scheduler(timeout_secs: int):
     time.sleep(2)
     logger.info("old scheduler started")
     while True:
-        DB.inactivate_ping_for_old_users(inactive_months=2)
-        raw_sql_checker()
+        start_time = time.monotonic()
+        start_cycle()
+        try:
+            inactivate_old_users()
+            raw_sql_checker()
+        except Exception as e:
+            # упавший цикл не должен останавливать проверку
+            logger.exception("checker cycle failed: %s", e)
+        finish_cycle(duration=time.monotonic() - start_time)
+        log_rate_limits()
         time.sleep(timeout_secs)
 
 
+def async_scheduler(timeout_secs: int):
+    """Бесконечный цикл периодической проверки в режиме asyncio"""
+    time.sleep(2)
+    logger.info("async scheduler started")
+    asyncio.run(_async_scheduler_loop(timeout_secs=timeout_secs))
+
+
+async def _async_scheduler_loop(timeout_secs: int):
+    timeout = aiohttp.ClientTimeout(total=Config.GORZDRAV_TIMEOUT_SECS)
+    # соединения переиспользуются, адреса кэшируются на всё время работы процесса
+    connector = aiohttp.TCPConnector(
+        limit=Config.CHECKER_MAX_CONCURRENCY,
+        ttl_dns_cache=None if Config.GORZDRAV_DNS_CACHE else 0,
+        use_dns_cache=Config.GORZDRAV_DNS_CACHE,
+    )
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers={"Accept-Encoding": "gzip, deflate"},
+    ) as session:
+        client = AsyncGorzdrav(session=session)
+        while True:
+            start_time = time.monotonic()
+            start_cycle()
+            try:
+                await asyncio.to_thread(inactivate_old_users)
+                await async_sql_checker(client=client)
+            except Exception as e:
+                # упавший цикл не должен останавливать проверку
+                logger.exception("checker cycle failed: %s", e)
+            duration = time.monotonic() - start_time
+            finish_cycle(duration=duration)
+            logger.info("async cycle done in %.2f s", duration)
+            log_rate_limits()
+            await asyncio.sleep(timeout_secs)
+
+
+def inactivate_old_users():
+    """Отключает проверку у давно не заходивших пользователей"""
+    with phase_timer.phase("db_write"):
+        DB.inactivate_ping_for_old_users(inactive_months=2)
+
+
+def start_cycle():
+    """Начинает цикл проверки: включает профилирование, если оно задано"""
+    phase_timer.pop_totals()
+    if cycle_profiler is not None:
+        cycle_profiler.start()
+
+
+def finish_cycle(duration: float):
+    """
+    Заканчивает цикл проверки: сохраняет профиль,
+    записывает длительность и время по фазам в метрики и лог
+    """
+    if cycle_profiler is not None:
+        cycle_profiler.stop()
+    cycle_duration.set(duration)
+    last_cycle_timestamp.set(time.time())
+    phases = phase_timer.pop_totals()
+    for phase, secs in phases.items():
+        phase_seconds_total.inc(secs, phase=phase)
+    logger.log(
+        logging.INFO if cycle_profiler is not None else logging.DEBUG,
+        "cycle %.2f s, phases: %s",
+        duration,
+        ", ".join(
+            f"{phase} {secs:.3f} s"
+            for phase, secs in sorted(phases.items(), key=lambda item: -item[1])
+        ),
+    )
+
+
+def log_gorzdrav_exception(e: Exception):
+    """Пишет в лог ошибку запроса к горздраву"""
+    if isinstance(e, CircuitOpenException):
+        # о смене состояния предохранителя пишет сам предохранитель
+        logger.debug("lpu %s skipped: circuit is open", e.lpuId)
+        return
+    logger.info("Gorzdrav exception: %s", str(e))
+    logger.debug("Exception traceback: %s", traceback.format_exc())
+
+
+def log_rate_limits():
+    """Пишет в лог замедленные и пропускаемые медучреждения"""
+    slowed_down = Gorzdrav.rate_limiter.get_slowed_down()
+    if slowed_down:
+        logger.info(
+            "gorzdrav rate limits slowed down for %s keys: %s",
+            len(slowed_down),
+            {key: round(rate, 3) for key, rate in slowed_down.items()},
+        )
+    open_circuits = Gorzdrav.circuit_breaker.get_states()
+    if open_circuits:
+        logger.info(
+            "gorzdrav circuits are not closed for %s lpus: %s",
+            len(open_circuits),
+            {lpuId: str(state) for lpuId, state in open_circuits.items()},
+        )
+
+
+def priority_scheduler(timeout_secs: int):
+    """
+    Бесконечный цикл проверки врачей по приоритету.
+    Популярных и часто освобождающихся врачей проверяет чаще,
+    список врачей перечитывает из БД раз в timeout_secs секунд.
+    """
+    time.sleep(2)
+    logger.info("priority scheduler started")
+    scheduler = PriorityScheduler(
+        requests_per_minute=Config.CHECKER_REQUESTS_PER_MINUTE,
+        min_interval_secs=Config.CHECKER_MIN_INTERVAL_SECS,
+        max_interval_secs=Config.CHECKER_MAX_INTERVAL_SECS,
+    )
+    active_docs_with_users: dict[str, DbDoctorRecord] = {}
+    refresh_at = 0.0
+    refreshed_at: float | None = None
+    while True:
+        try:
+            if time.monotonic() >= refresh_at:
+                # циклом считаем промежуток между обновлениями списка врачей
+                if refreshed_at is not None:
+                    finish_cycle(duration=time.monotonic() - refreshed_at)
+                refreshed_at = time.monotonic()
+                start_cycle()
+                # при ошибке БД список врачей перечитывается через timeout_secs
+                refresh_at = time.monotonic() + timeout_secs
+                inactivate_old_users()
+                active_docs_with_users = get_own_active_doctors()
+                scheduler.update_doctors(
+                    {
+                        doctor_id: len(doc_with_users.pinging_users)
+                        for doctor_id, doc_with_users in active_docs_with_users.items()
+                    }
+                )
+                logger.info(
+                    "got %s pinging doctors, budget scale %.2f",
+                    len(scheduler),
+                    scheduler.budget_scale,
+                )
+                log_rate_limits()
+                log_appointments_diff()
+
+            due_ids = scheduler.pop_due()
+            if not due_ids:
+                time.sleep(
+                    min(
+                        scheduler.next_due_in(), max(0.0, refresh_at - time.monotonic())
+                    )
+                )
+                continue
+
+            due_docs = [
+                active_docs_with_users[doctor_id]
+                for doctor_id in due_ids
+                if doctor_id in active_docs_with_users
+            ]
+            doctors_groups = CheckerApp.group_doctors_by_specialty(due_docs)
+            pruned_groups = prune_doctors_groups(doctors_groups)
+            for key, group_docs in doctors_groups.items():
+                if key in pruned_groups:
+                    continue
+                # у специальности нет свободных мест, врачи проверены без запроса
+                for doc_with_users in group_docs:
+                    scheduler.report(doctor_id=doc_with_users.id, had_free_places=False)
+            for (lpuId, specialtyId), group_docs in pruned_groups.items():
+                have_free_places = check_doctors_group(
+                    lpuId=lpuId,
+                    specialtyId=specialtyId,
+                    group_docs=group_docs,
+                    reload_users=True,
+                )
+                for doc_with_users in group_docs:
+                    scheduler.report(
+                        doctor_id=doc_with_users.id,
+                        had_free_places=(
+                            None
+                            if have_free_places is None
+                            else have_free_places.get(doc_with_users.id, False)
+                        ),
+                    )
+        except Exception as e:
+            # упавшая проверка не должна останавливать цикл
+            logger.exception("priority checker iteration failed: %s", e)
+            # не повторяем сразу, если ошибка не проходит
+            time.sleep(1)
+
+
+def iter_own_active_doctors() -> Iterator[DbDoctorRecord]:
+    """
+    Отдаёт пингуемых врачей, которых проверяет этот воркер, по одному
+    по мере чтения из БД, заодно продлевая аренду его шардов.
+    Когда врачи закончились, обновляет метрики
+    и забывает назначения врачей, которых больше не отслеживают
+    """
+    if shard_leases is not None:
+        shard_leases.refresh()
+    doctor_ids: set[str] = set()
+    watchers_count = 0
+    for doctor in DB.iter_active_doctors_joined_users():
+        if shard_leases is not None and not shard_leases.is_own(doctor.lpuId):
+            continue
+        doctor_ids.add(doctor.id)
+        watchers_count += len(doctor.pinging_users)
+        yield doctor
+    appointment_snapshots.retain(doctor_ids)
+    active_doctors.set(len(doctor_ids))
+    active_watchers.set(watchers_count)
+
+
+def is_own_lpu(lpuId: int) -> bool:
+    """
+    Медучреждение всё ещё проверяет этот воркер: аренда его шарда продлевается
+    по ходу цикла, а шард, который забрал другой воркер, пропускается,
+    чтобы пользователи не получили оповещение дважды
+    """
+    if shard_leases is None:
+        return True
+    if shard_leases.owns(lpuId):
+        return True
+    logger.info("lpu %s shard is not owned anymore, skipped", lpuId)
+    return False
+
+
+def get_own_active_doctors() -> dict[str, DbDoctorRecord]:
+    """
+    Возвращает пингуемых врачей, которых проверяет этот воркер,
+    заодно продлевая аренду его шардов
+    """
+    with phase_timer.phase("db_load"):
+        return {doctor.id: doctor for doctor in iter_own_active_doctors()}
+
+
+def run_worker(
+    mode: str,
+    timeout_secs: int,
+    worker_index: int = 0,
+    profile: bool = Config.CHECKER_PROFILE,
+):
+    """
+    Точка входа процесса чекера.
+    Открывает своё соединение с БД и проверяет только врачей
+    арендованных шардов, поэтому воркеров может быть несколько.
+    Метрики воркера отдаются на порту METRICS_PORT + worker_index.
+    С profile каждый цикл профилируется в CHECKER_PROFILE_DIR.
+    """
+    global DB, shard_leases, cycle_profiler
+    if profile:
+        cycle_profiler = CycleProfiler(
+            directory=Config.CHECKER_PROFILE_DIR,
+            keep=Config.CHECKER_PROFILE_KEEP,
+            max_cycles=Config.CHECKER_PROFILE_CYCLES,
+        )
+    if Config.METRICS_PORT:
+        start_metrics_server(
+            port=Config.METRICS_PORT + worker_index, host=Config.METRICS_HOST
+        )
+    if Config.GORZDRAV_DNS_CACHE:
+        # только в процессе чекера, бот резолвит адреса как обычно
+        DnsCache.install(hosts=[urlparse(Config.GORZDRAV_API).hostname or ""])
+    # соединение sqlite нельзя использовать после fork
+    DB = SqliteDb(db_path=Config.DB_FILE)
+    shard_leases = ShardLeases(
+        db=DB,
+        shards_count=Config.CHECKER_SHARDS,
+        lease_secs=Config.CHECKER_LEASE_SECS,
+        renew_secs=Config.CHECKER_LEASE_RENEW_SECS,
+        worker_index=worker_index,
+    )
+    # процесс воркера завершается через os._exit, atexit не вызывается,
+    # а terminate() присылает SIGTERM: превращаем его в SystemExit,
+    # чтобы отпустить шарды в finally
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        get_scheduler(mode=mode)(timeout_secs)
+    finally:
+        release_shards()
+
+
+def release_shards():
+    """Отпускает шарды воркера при остановке, чтобы их сразу забрали другие"""
+    if shard_leases is None:
+        return
+    try:
+        shard_leases.release()
+        logger.info("worker %s released its shards", shard_leases.worker_id)
+    except Exception as e:
+        logger.warning("worker %s shards not released: %s", shard_leases.worker_id, e)
+
+
+def get_scheduler(mode: str) -> Callable[[int], None]:
+    """Возвращает функцию цикла проверки для режима чекера из конфига"""
+    schedulers: dict[str, Callable[[int], None]] = {
+        "sync": old_scheduler,
+        "async": async_scheduler,
+        "priority": priority_scheduler,
+    }
+    if mode not in schedulers:
+        raise ValueError(f"unknown checker mode: {mode}")
+    return schedulers[mode]
+
+
 def raw_sql_checker():
     """Проверяет нужных докторов и отправляет всем желающим пользователям сообщение о наличи талончика"""
-    active_docs_with_users = DB.get_active_doctors_joined_users()
-    logger.info("got %s pinging doctors", len(active_docs_with_users))
-    logger.debug("active_docs_with_users: %s", active_docs_with_users)
-    for doc_with_users in active_docs_with_users.values():
-        # запрашиваем информацию о враче у горздрава
-        try:
-            api_doctor: Doctor | None = Gorzdrav.get_doctor(
-                lpuId=doc_with_users.lpuId,
-                specialtyId=doc_with_users.specialtyId,
-                doctorId=doc_with_users.doctorId,
+    doctors_count = groups_count = pruned_count = specialties_calls = 0
+    # врачи приходят из БД по медучреждениям: проверка начинается с первого
+    # медучреждения, в памяти врачи только одного из них.
+    # Врачи одной специальности в одном медучреждении приходят одним списком,
+    # поэтому запрашиваем каждый список один раз на группу
+    lpus_groups = CheckerApp.iter_lpu_doctors_groups(iter_own_active_doctors())
+    while True:
+        with phase_timer.phase("db_load"):
+            lpu_groups = next(lpus_groups, None)
+        if lpu_groups is None:
+            break
+        lpuId, doctors_groups = lpu_groups
+        groups_count += len(doctors_groups)
+        doctors_count += sum(len(group_docs) for group_docs in doctors_groups.values())
+        pruned_groups = doctors_groups
+        if Config.CHECKER_PRUNE_BY_SPECIALTIES:
+            specialties_by_lpu = get_specialties_by_lpu([lpuId])
+            specialties_calls += len(specialties_by_lpu)
+            pruned_groups = CheckerApp.prune_doctors_groups(
+                doctors_groups=doctors_groups, specialties_by_lpu=specialties_by_lpu
             )
-            logger.debug(
-                "api_doctor: %s",
-                api_doctor.model_dump_json(indent=2) if api_doctor else None,
+            pruned_count += len(doctors_groups) - len(pruned_groups)
+        for (lpuId, specialtyId), group_docs in pruned_groups.items():
+            check_doctors_group(
+                lpuId=lpuId,
+                specialtyId=specialtyId,
+                group_docs=group_docs,
+            )
+    logger.info("got %s pinging doctors", doctors_count)
+    logger.info(
+        "got %s doctors lists to fetch, saved %s api calls",
+        groups_count,
+        doctors_count - groups_count,
+    )
+    if Config.CHECKER_PRUNE_BY_SPECIALTIES:
+        log_pruning(
+            groups_count=groups_count,
+            pruned_count=pruned_count,
+            specialties_calls=specialties_calls,
+        )
+    log_appointments_diff()
+
+
+def get_specialties_by_lpu(lpu_ids: Iterable[int]) -> dict[int, list[ApiSpecialty]]:
+    """
+    Запрашивает специальности медучреждений со счётчиками свободных мест
+    Args:
+        lpu_ids: Iterable[int]: id медучреждений
+    Returns:
+        dict[int, list[ApiSpecialty]]: специальности ответивших медучреждений
+    """
+    specialties_by_lpu: dict[int, list[ApiSpecialty]] = {}
+    for lpuId in lpu_ids:
+        try:
+            specialties_by_lpu[lpuId] = Gorzdrav.get_specialties(
+                lpuId=lpuId, use_cache=False
             )
         except Exception as e:
-            # когда медучреждение не отвечает
-            logger.info("Gorzdrav exception: %s", str(e))
-            logger.debug("Exception traceback: %s", traceback.format_exc())
+            log_gorzdrav_exception(e)
+    return specialties_by_lpu
+
+
+def prune_doctors_groups(
+    doctors_groups: dict[tuple[int, str], list[DbDoctorRecord]],
+) -> dict[tuple[int, str], list[DbDoctorRecord]]:
+    """
+    Запрашивает специальности каждого медучреждения один раз
+    и убирает группы врачей специальностей без свободных мест
+    Args:
+        doctors_groups: dict[tuple[int, str], list[DbDoctorRecord]]: врачи по группам
+    Returns:
+        dict[tuple[int, str], list[DbDoctorRecord]]: группы, которые нужно запросить
+    """
+    if not Config.CHECKER_PRUNE_BY_SPECIALTIES:
+        return doctors_groups
+    specialties_by_lpu = get_specialties_by_lpu({lpuId for lpuId, _ in doctors_groups})
+    pruned_groups = CheckerApp.prune_doctors_groups(
+        doctors_groups=doctors_groups, specialties_by_lpu=specialties_by_lpu
+    )
+    log_pruning(
+        groups_count=len(doctors_groups),
+        pruned_count=len(doctors_groups) - len(pruned_groups),
+        specialties_calls=len(specialties_by_lpu),
+    )
+    return pruned_groups
+
+
+def log_pruning(groups_count: int, pruned_count: int, specialties_calls: int):
+    """Пишет в лог и метрики, сколько списков врачей не пришлось запрашивать"""
+    doctors_lists_total.inc(groups_count - pruned_count, result="fetched")
+    doctors_lists_total.inc(pruned_count, result="pruned")
+    logger.info(
+        "pruned %s of %s doctors lists by specialties counters (%.0f%%), "
+        "%s specialties lists fetched",
+        pruned_count,
+        groups_count,
+        100 * pruned_count / groups_count if groups_count else 0,
+        specialties_calls,
+    )
+
+
+def check_doctors_group(
+    lpuId: int,
+    specialtyId: str,
+    group_docs: list[DbDoctorRecord],
+    reload_users: bool = False,
+) -> dict[str, bool] | None:
+    """
+    Проверяет врачей одной специальности в медучреждении одним запросом
+    и оповещает их пользователей о свободных местах
+    Args:
+        lpuId: int: id медучреждения
+        specialtyId: str: id специальности
+        group_docs: list[DbDoctorRecord]: врачи с пингующими пользователями
+        reload_users: bool: перечитать пользователей врача из БД перед оповещением
+    Returns:
+        dict[str, bool] | None: {id врача в БД: есть ли свободные места},
+            None если горздрав не ответил
+    """
+    if not is_own_lpu(lpuId):
+        return None
+    # запрашиваем список врачей специальности у горздрава
+    try:
+        api_doctors: dict[str, ApiDoctorRecord] = Gorzdrav.get_doctor_records_index(
+            lpuId=lpuId,
+            specialtyId=specialtyId,
+        )
+    except Exception as e:
+        # когда медучреждение не отвечает
+        log_gorzdrav_exception(e)
+        return None
+
+    have_free_places: dict[str, bool] = {}
+    for doc_with_users in group_docs:
+        doctor = get_free_doctor(doc_with_users=doc_with_users, api_doctors=api_doctors)
+        have_free_places[doc_with_users.id] = doctor is not None
+        if doctor is None:
             continue
-        if api_doctor is None:
+        if reload_users:
+            # пользователи могли отключить отслеживание с момента загрузки врачей
+            with phase_timer.phase("db_load"):
+                doc_with_users.pinging_users = [
+                    DbUserRecord(id=user.id, limit_days=user.limit_days)
+                    for user in DB.get_users_by_doctor(doctor_id=doc_with_users.id)
+                    if user.ping_status
+                ]
+            if not doc_with_users.pinging_users:
+                continue
+        try:
+            appointments: list[ApiAppointmentRecord] = []
+            if CheckerApp.is_any_user_have_day_limit(doc_with_users.pinging_users):
+                # получаем назначения у доктора
+                appointments = Gorzdrav.get_appointment_records(
+                    lpuId=doc_with_users.lpuId,
+                    doctorId=doc_with_users.doctorId,
+                )
+                logger.debug("doctor appointments: %s", appointments)
+                if not filter_users_by_appointments(doc_with_users, appointments):
+                    continue
+        except Exception as e:
+            log_gorzdrav_exception(e)
             continue
+        notify_doctor_users(
+            doc_with_users=doc_with_users,
+            api_doctor=doctor,
+            appointments=appointments,
+        )
+    return have_free_places
 
-        if not api_doctor.have_free_places:
-            continue
 
-        link: str = Gorzdrav.generate_link(
-            districtId=doc_with_users.districtId,
-            lpuId=doc_with_users.lpuId,
-            specialtyId=doc_with_users.specialtyId,
-            scheduleId=doc_with_users.doctorId,
-        )
-
-        # проверяем надо ли получать назначения отдельно у доктора (если есть пользователи с лимитером)
-        doctor_users = doc_with_users.pinging_users
-        is_any_user_have_day_limit = [
-            user for user in doctor_users if user.limit_days
-        ].__len__() > 0
-        appointments: list[ApiAppointment] = []
-        if is_any_user_have_day_limit:
-            # получаем назначения у доктора
-            appointments = Gorzdrav.get_appointments(
-                lpuId=doc_with_users.lpuId,
-                doctorId=doc_with_users.doctorId,
+async def async_sql_checker(client: AsyncGorzdrav):
+    """
+    Асинхронный вариант raw_sql_checker.
+    Списки врачей разных медучреждений запрашиваются параллельно,
+    ограничение параллельности задаётся в клиенте.
+    """
+    active_docs_with_users = await asyncio.to_thread(get_own_active_doctors)
+    logger.info("got %s pinging doctors", len(active_docs_with_users))
+    doctors_groups = CheckerApp.group_doctors_by_specialty(
+        active_docs_with_users.values()
+    )
+    logger.info(
+        "got %s doctors lists to fetch, saved %s api calls",
+        len(doctors_groups),
+        len(active_docs_with_users) - len(doctors_groups),
+    )
+    doctors_groups = await async_prune_doctors_groups(
+        client=client, doctors_groups=doctors_groups
+    )
+    await asyncio.gather(
+        *(
+            _async_check_doctors_group(
+                client=client,
+                lpuId=lpuId,
+                specialtyId=specialtyId,
+                group_docs=group_docs,
             )
-            logger.debug("doctor appointments: %s", appointments)
+            for (lpuId, specialtyId), group_docs in doctors_groups.items()
+        )
+    )
+    log_appointments_diff()
+
+
+async def async_prune_doctors_groups(
+    client: AsyncGorzdrav,
+    doctors_groups: dict[tuple[int, str], list[DbDoctorRecord]],
+) -> dict[tuple[int, str], list[DbDoctorRecord]]:
+    """Асинхронный вариант prune_doctors_groups"""
+    if not Config.CHECKER_PRUNE_BY_SPECIALTIES:
+        return doctors_groups
+    lpuIds = list({lpuId for lpuId, _ in doctors_groups})
+    results = await asyncio.gather(
+        *(client.get_specialties(lpuId=lpuId) for lpuId in lpuIds),
+        return_exceptions=True,
+    )
+    specialties_by_lpu: dict[int, list[ApiSpecialty]] = {}
+    for lpuId, result in zip(lpuIds, results):
+        if isinstance(result, Exception):
+            log_gorzdrav_exception(result)
+            continue
+        specialties_by_lpu[lpuId] = result
+    pruned_groups = CheckerApp.prune_doctors_groups(
+        doctors_groups=doctors_groups, specialties_by_lpu=specialties_by_lpu
+    )
+    log_pruning(
+        groups_count=len(doctors_groups),
+        pruned_count=len(doctors_groups) - len(pruned_groups),
+        specialties_calls=len(specialties_by_lpu),
+    )
+    return pruned_groups
+
+
+async def _async_check_doctors_group(
+    client: AsyncGorzdrav,
+    lpuId: int,
+    specialtyId: str,
+    group_docs: list[DbDoctorRecord],
+):
+    if not await asyncio.to_thread(is_own_lpu, lpuId):
+        return
+    try:
+        api_doctors = await client.get_doctor_records_index(
+            lpuId=lpuId,
+            specialtyId=specialtyId,
+        )
+    except Exception as e:
+        log_gorzdrav_exception(e)
+        return
 
+    for doc_with_users in group_docs:
+        doctor = get_free_doctor(doc_with_users=doc_with_users, api_doctors=api_doctors)
+        if doctor is None:
+            continue
+        appointments: list[ApiAppointmentRecord] = []
+        if CheckerApp.is_any_user_have_day_limit(doc_with_users.pinging_users):
+            try:
+                appointments = await client.get_appointment_records(
+                    lpuId=doc_with_users.lpuId,
+                    doctorId=doc_with_users.doctorId,
+                )
+            except Exception as e:
+                log_gorzdrav_exception(e)
+                continue
+            if not filter_users_by_appointments(doc_with_users, appointments):
+                continue
+        await asyncio.to_thread(
+            notify_doctor_users,
+            doc_with_users=doc_with_users,
+            api_doctor=doctor,
+            appointments=appointments,
+        )
+
+
+def get_free_doctor(
+    doc_with_users: DbDoctorRecord,
+    api_doctors: dict[str, ApiDoctorRecord],
+) -> ApiDoctorRecord | None:
+    """Возвращает врача из списка горздрава, если у него есть свободные места"""
+    api_doctor = api_doctors.get(doc_with_users.doctorId)
+    if api_doctor is None:
+        return None
+    logger.debug("api_doctor: %s", api_doctor)
+    if not api_doctor.have_free_places:
+        return None
+    return api_doctor
+
+
+def filter_users_by_appointments(
+    doc_with_users: DbDoctorRecord,
+    appointments: list[ApiAppointmentRecord],
+) -> list[DbUserRecord]:
+    """
+    Сравнивает назначения врача с прошлой проверкой и оставляет в pinging_users
+    только пользователей, которых нужно проверить на этих назначениях.
+    Если назначения не изменились, пользователи, которым они уже не подошли
+    по лимиту дней, не проверяются повторно.
+    Args:
+        doc_with_users: DbDoctorRecord: врач с пингующими пользователями
+        appointments: list[ApiAppointmentRecord]: назначения врача
+    Returns:
+        list[DbUserRecord]: оставшиеся пользователи
+    """
+    diff = appointment_snapshots.update(
+        doctor_id=doc_with_users.id, appointments=appointments
+    )
+    if not diff.changed:
+        doc_with_users.pinging_users = appointment_snapshots.filter_users(
+            doctor_id=doc_with_users.id, users=doc_with_users.pinging_users
+        )
+    else:
+        logger.debug(
+            "doctor %s appointments: +%s -%s",
+            doc_with_users.id,
+            len(diff.added),
+            len(diff.removed),
+        )
+    return doc_with_users.pinging_users
+
+
+def log_appointments_diff():
+    """Пишет в лог и метрики, сколько назначений изменилось за цикл проверки"""
+    stats = appointment_snapshots.pop_stats()
+    appointment_changes_total.inc(stats["added"], change="added")
+    appointment_changes_total.inc(stats["removed"], change="removed")
+    logger.info(
+        "appointments of %s doctors fetched, %s changed: +%s -%s slots",
+        stats["doctors"],
+        stats["changed"],
+        stats["added"],
+        stats["removed"],
+    )
+
+
+def notify_doctor_users(
+    doc_with_users: DbDoctorRecord,
+    api_doctor: ApiDoctorRecord,
+    appointments: list[ApiAppointmentRecord],
+):
+    """Оповещает пользователей врача о свободных местах"""
+    # ближайшее назначение считаем один раз на врача, а не на каждого пользователя
+    nearest_offset = CheckerApp.get_nearest_appointment_offset(
+        appointments=appointments
+    )
+    chat_ids: list[int] = []
+    unmatched_users: list[DbUserRecord] = []
+    for user in doc_with_users.pinging_users:
+        logger.debug("user: %s", user)
+
+        is_in_limit: bool = CheckerApp.is_offset_in_user_limit_days(
+            nearest_offset=nearest_offset,
+            user=user,
+        )
+        if not is_in_limit:
+            logger.debug("doc not in user limit days %s", user.limit_days)
+            unmatched_users.append(user)
+            continue
+        chat_ids.append(user.id)
+
+    appointment_snapshots.mark_unmatched(
+        doctor_id=doc_with_users.id, users=unmatched_users
+    )
+    if not chat_ids:
+        return
+
+    link: str = Gorzdrav.generate_link(
+        districtId=doc_with_users.districtId,
+        lpuId=doc_with_users.lpuId,
+        specialtyId=doc_with_users.specialtyId,
+        scheduleId=doc_with_users.doctorId,
+    )
+    with phase_timer.phase("render"):
         message: str = TgMessageComposer.get_doc_ready_message_md(
             doctor_name=api_doctor.name,
             free_participant_count=api_doctor.freeParticipantCount,
@@ -88,28 +790,35 @@ def raw_sql_checker():
             doctor_link=link,
             appointments=appointments,
         )
-
-        for user in doc_with_users.pinging_users:
-            logger.debug("user: %s", user.model_dump_json(indent=2))
-
-            is_in_limit: bool = CheckerApp.check_appointments_in_user_limit_days(
-                appointments=appointments,
-                user=user,
-            )
-            if user.limit_days and (not is_in_limit):
-                logger.debug("doc not in user limit days %s", user.limit_days)
-                continue
-
-            time.sleep(0.2)
-            logger.info("send message about doc to user: %s", user.id)
-            CheckerApp.send_tg_message(
-                message=message,
-                api_token=Config.BOT_TOKEN,
-                chat_id=user.id,
-                parse_mode=TGParseMode.MARKDOWN,
-            )
-            DB.set_user_ping_status(user_id=user.id, ping_status=False)
+    logger.info(
+        "send message about doc %s to %s users", doc_with_users.id, len(chat_ids)
+    )
+    with phase_timer.phase("tg_send"):
+        report = tg_dispatcher.send_many(
+            chat_ids=chat_ids,
+            message=message,
+            parse_mode=TGParseMode.MARKDOWN,
+        )
+    notifications_total.inc(len(report.delivered), status="sent")
+    notifications_total.inc(len(report.failed), status="failed")
+    notifications_total.inc(len(report.rejected), status="rejected")
+    # при временной ошибке сообщим на следующей проверке, а пользователям,
+    # заблокировавшим бота или удалённым, проверку отключаем
+    with phase_timer.phase("db_write"):
+        DB.set_users_ping_status(
+            user_ids=report.delivered + report.rejected, ping_status=False
+        )
 
 
 if __name__ == "__main__":
-    old_scheduler(timeout_secs=Config.CHECKER_TIMEOUT_SECS)
+    parser = argparse.ArgumentParser(description="Проверка свободных талонов")
+    parser.add_argument("--mode", default=Config.CHECKER_MODE)
+    parser.add_argument("--timeout-secs", type=int, default=Config.CHECKER_TIMEOUT_SECS)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=Config.CHECKER_PROFILE,
+        help="профилировать циклы проверки через cProfile",
+    )
+    args = parser.parse_args()
+    run_worker(mode=args.mode, timeout_secs=args.timeout_secs, profile=args.profile)
@@ -7,11 +7,108 @@ load_dotenv()
 class Config:
     BOT_TOKEN = os.environ["BOT_TOKEN"]
     DB_FILE = os.environ["DB_FILE"]
+    # настройки соединений sqlite, у каждого потока своё соединение
+    DB_JOURNAL_MODE = os.environ.get("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL")
+    DB_TIMEOUT_SECS = float(os.environ.get("DB_TIMEOUT_SECS", 30))
+    DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))
+    # отрицательное значение - размер в килобайтах
+    DB_CACHE_SIZE = int(os.environ.get("DB_CACHE_SIZE", -16 * 1024))
     CHECKER_TIMEOUT_SECS = int(os.environ.get("CHECKER_TIMEOUT_SECS", 120))
-    GORZDRAV_API = "https://gorzdrav.spb.ru/_api/api"
+    # режим чекера: sync - последовательный, async - параллельный на asyncio,
+    # priority - опрос врачей по приоритету в пределах бюджета запросов
+    CHECKER_MODE = os.environ.get("CHECKER_MODE", "sync")
+    CHECKER_MAX_CONCURRENCY = int(os.environ.get("CHECKER_MAX_CONCURRENCY", 20))
+    CHECKER_MAX_CONCURRENCY_PER_LPU = int(
+        os.environ.get("CHECKER_MAX_CONCURRENCY_PER_LPU", 1)
+    )
+    # количество процессов чекера и шардов, на которые делятся врачи
+    CHECKER_WORKERS = int(os.environ.get("CHECKER_WORKERS", 1))
+    CHECKER_SHARDS = int(os.environ.get("CHECKER_SHARDS", 16))
+    # через сколько секунд шарды упавшего воркера заберут другие
+    CHECKER_LEASE_SECS = float(os.environ.get("CHECKER_LEASE_SECS", 600))
+    # как часто воркер продлевает аренду по ходу цикла проверки.
+    # Аренда должна пережить промежуток между продлениями, а не весь цикл
+    CHECKER_LEASE_RENEW_SECS = float(os.environ.get("CHECKER_LEASE_RENEW_SECS", 60))
+    # пропускать специальности без свободных мест по счётчикам медучреждения
+    CHECKER_PRUNE_BY_SPECIALTIES = (
+        os.environ.get("CHECKER_PRUNE_BY_SPECIALTIES", "1") == "1"
+    )
+    CHECKER_REQUESTS_PER_MINUTE = float(
+        os.environ.get("CHECKER_REQUESTS_PER_MINUTE", 60)
+    )
+    CHECKER_MIN_INTERVAL_SECS = float(os.environ.get("CHECKER_MIN_INTERVAL_SECS", 5))
+    CHECKER_MAX_INTERVAL_SECS = float(os.environ.get("CHECKER_MAX_INTERVAL_SECS", 300))
+    # профилирование циклов чекера через cProfile (или checker.py --profile)
+    CHECKER_PROFILE = os.environ.get("CHECKER_PROFILE", "0") == "1"
+    CHECKER_PROFILE_DIR = os.environ.get("CHECKER_PROFILE_DIR", "profiles")
+    # сколько последних профилей хранить
+    CHECKER_PROFILE_KEEP = int(os.environ.get("CHECKER_PROFILE_KEEP", 20))
+    # сколько циклов профилировать, 0 - все
+    CHECKER_PROFILE_CYCLES = int(os.environ.get("CHECKER_PROFILE_CYCLES", 0))
+    # порт метрик чекера в формате Prometheus, 0 - не запускать
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+    # рассылка оповещений: лимиты Bot API - 30 сообщений в секунду, 1 в секунду в чат
+    TG_SEND_WORKERS = int(os.environ.get("TG_SEND_WORKERS", 8))
+    TG_RATE_PER_SEC = float(os.environ.get("TG_RATE_PER_SEC", 30))
+    TG_CHAT_RATE_PER_SEC = float(os.environ.get("TG_CHAT_RATE_PER_SEC", 1))
+    TG_SEND_RETRIES = int(os.environ.get("TG_SEND_RETRIES", 3))
+    # адреса api можно подменить, например на benchmarks.gorzdrav_stub
+    TG_API_URL = os.environ.get("TG_API_URL", "https://api.telegram.org")
+    GORZDRAV_API = os.environ.get("GORZDRAV_API", "https://gorzdrav.spb.ru/_api/api")
     GORZDRAV_API_V = "v2"
     API_URL = f"{GORZDRAV_API}/{GORZDRAV_API_V}"
     HEADERS = {"User-Agent": "gorzdrav-spb-bot"}
+    # разбор json ответов: auto - orjson, если установлен, pydantic или orjson
+    GORZDRAV_JSON_BACKEND = os.environ.get("GORZDRAV_JSON_BACKEND", "auto")
+    GORZDRAV_TIMEOUT_SECS = int(os.environ.get("GORZDRAV_TIMEOUT_SECS", 30))
+    # размер куска тела ответа при потоковом разборе списков
+    GORZDRAV_STREAM_CHUNK_SIZE = int(
+        os.environ.get("GORZDRAV_STREAM_CHUNK_SIZE", 64 * 1024)
+    )
+    # пул keep-alive соединений к горздраву
+    GORZDRAV_POOL_CONNECTIONS = int(os.environ.get("GORZDRAV_POOL_CONNECTIONS", 4))
+    GORZDRAV_POOL_MAXSIZE = int(os.environ.get("GORZDRAV_POOL_MAXSIZE", 10))
+    GORZDRAV_POOL_RETRIES = int(os.environ.get("GORZDRAV_POOL_RETRIES", 2))
+    GORZDRAV_DNS_CACHE = os.environ.get("GORZDRAV_DNS_CACHE", "1") == "1"
+    # частота запросов к горздраву (запросов в секунду) на одно медучреждение
+    GORZDRAV_RATE_PER_SEC = float(os.environ.get("GORZDRAV_RATE_PER_SEC", 1.0))
+    GORZDRAV_RATE_MIN_PER_SEC = float(os.environ.get("GORZDRAV_RATE_MIN_PER_SEC", 0.05))
+    GORZDRAV_RATE_MAX_PER_SEC = float(os.environ.get("GORZDRAV_RATE_MAX_PER_SEC", 2.0))
+    GORZDRAV_RATE_BURST = float(os.environ.get("GORZDRAV_RATE_BURST", 3))
+    GORZDRAV_RATE_GLOBAL_PER_SEC = float(
+        os.environ.get("GORZDRAV_RATE_GLOBAL_PER_SEC", 10.0)
+    )
+    # предохранитель: после скольких ошибок подряд медучреждение пропускается
+    GORZDRAV_BREAKER_FAILURES = int(os.environ.get("GORZDRAV_BREAKER_FAILURES", 3))
+    GORZDRAV_BREAKER_COOLOFF_SECS = float(
+        os.environ.get("GORZDRAV_BREAKER_COOLOFF_SECS", 60)
+    )
+    GORZDRAV_BREAKER_MAX_COOLOFF_SECS = float(
+        os.environ.get("GORZDRAV_BREAKER_MAX_COOLOFF_SECS", 3600)
+    )
+    # кэш справочников горздрава, пустой GORZDRAV_CACHE_FILE - только в памяти
+    GORZDRAV_CACHE_MAXSIZE = int(os.environ.get("GORZDRAV_CACHE_MAXSIZE", 1024))
+    GORZDRAV_CACHE_FILE = os.environ.get("GORZDRAV_CACHE_FILE", "")
+    GORZDRAV_CACHE_TTL_DISTRICTS_SECS = float(
+        os.environ.get("GORZDRAV_CACHE_TTL_DISTRICTS_SECS", 24 * 60 * 60)
+    )
+    GORZDRAV_CACHE_TTL_LPUS_SECS = float(
+        os.environ.get("GORZDRAV_CACHE_TTL_LPUS_SECS", 24 * 60 * 60)
+    )
+    GORZDRAV_CACHE_TTL_SPECIALTIES_SECS = float(
+        os.environ.get("GORZDRAV_CACHE_TTL_SPECIALTIES_SECS", 60 * 60)
+    )
+    # локальная копия справочников горздрава для навигации в боте
+    CATALOG_SYNC = os.environ.get("CATALOG_SYNC", "1") == "1"
+    CATALOG_SYNC_INTERVAL_SECS = float(
+        os.environ.get("CATALOG_SYNC_INTERVAL_SECS", 6 * 60 * 60)
+    )
+    CATALOG_SYNC_CONCURRENCY = int(os.environ.get("CATALOG_SYNC_CONCURRENCY", 4))
+    CATALOG_MAX_AGE_SECS = float(os.environ.get("CATALOG_MAX_AGE_SECS", 24 * 60 * 60))
+    # сколько врачей показывать в /find и inline-поиске (inline - не больше 50)
+    CATALOG_SEARCH_LIMIT = int(os.environ.get("CATALOG_SEARCH_LIMIT", 50))
     DSN_STRING = f"sqlite:///{DB_FILE}"
 
     LIMIT_DAYS_REGEX = r"^/\d{1,2}$"
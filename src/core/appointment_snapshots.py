@@ -0,0 +1,135 @@
+import datetime
+import threading
+from collections.abc import Iterable
+from typing import Callable
+
+from core.checker_app import CheckerApp
+from gorzdrav.models import ApiAppointmentRecord
+from models.records import DbUserRecord
+
+
+class AppointmentsDiff:
+    """Изменения списка назначений врача с прошлой проверки"""
+
+    __slots__ = ("added", "removed", "is_first")
+
+    def __init__(
+        self,
+        added: dict[str, datetime.datetime],
+        removed: dict[str, datetime.datetime],
+        is_first: bool = False,
+    ):
+        self.added = added
+        self.removed = removed
+        # врач проверяется впервые, сравнивать не с чем
+        self.is_first = is_first
+
+    @property
+    def changed(self) -> bool:
+        return self.is_first or bool(self.added) or bool(self.removed)
+
+
+class AppointmentSnapshots:
+    """
+    Последние увиденные назначения каждого врача {id назначения: время приёма}.
+    Помнит пользователей, которым назначения врача не подошли по лимиту дней,
+    чтобы не проверять их заново, пока назначения, дата и лимит не изменились:
+    пользователь запоминается вместе со своим лимитом дней.
+    """
+
+    def __init__(self, today: Callable[[], datetime.date] = CheckerApp.get_spb_today):
+        self.today = today
+        self.__snapshots: dict[str, dict[str, datetime.datetime]] = {}
+        # врач -> (дата, {(id пользователя, лимит дней)})
+        self.__unmatched_users: dict[
+            str, tuple[datetime.date, set[tuple[int, int | None]]]
+        ] = {}
+        self.__lock = threading.Lock()
+        self.stats = self.__get_empty_stats()
+
+    @staticmethod
+    def __get_empty_stats() -> dict[str, int]:
+        return {"doctors": 0, "changed": 0, "added": 0, "removed": 0}
+
+    def pop_stats(self) -> dict[str, int]:
+        """
+        Возвращает счётчики изменений с прошлого вызова и обнуляет их
+        Returns:
+            dict[str, int]: проверено врачей, из них изменилось,
+                добавлено и исчезло назначений
+        """
+        with self.__lock:
+            stats, self.stats = self.stats, self.__get_empty_stats()
+        return stats
+
+    def update(
+        self, doctor_id: str, appointments: list[ApiAppointmentRecord]
+    ) -> AppointmentsDiff:
+        """
+        Запоминает назначения врача и возвращает изменения с прошлой проверки
+        Args:
+            doctor_id: str: id врача в БД
+            appointments: list[ApiAppointmentRecord]: назначения врача
+        Returns:
+            AppointmentsDiff: добавленные и исчезнувшие назначения
+        """
+        snapshot = {
+            appointment.id: appointment.visitStart for appointment in appointments
+        }
+        with self.__lock:
+            previous = self.__snapshots.get(doctor_id)
+            self.__snapshots[doctor_id] = snapshot
+            if previous is None:
+                diff = AppointmentsDiff(added=snapshot, removed={}, is_first=True)
+            else:
+                diff = AppointmentsDiff(
+                    added={
+                        appointment_id: visit
+                        for appointment_id, visit in snapshot.items()
+                        if appointment_id not in previous
+                    },
+                    removed={
+                        appointment_id: visit
+                        for appointment_id, visit in previous.items()
+                        if appointment_id not in snapshot
+                    },
+                )
+            if diff.changed:
+                self.__unmatched_users.pop(doctor_id, None)
+            self.stats["doctors"] += 1
+            self.stats["changed"] += int(diff.changed)
+            self.stats["added"] += len(diff.added)
+            self.stats["removed"] += len(diff.removed)
+        return diff
+
+    def filter_users(
+        self, doctor_id: str, users: list[DbUserRecord]
+    ) -> list[DbUserRecord]:
+        """Пользователи, которых ещё не проверяли на текущих назначениях врача"""
+        with self.__lock:
+            date, unmatched = self.__unmatched_users.get(doctor_id, (None, set()))
+        if date != self.today():
+            return users
+        return [user for user in users if (user.id, user.limit_days) not in unmatched]
+
+    def mark_unmatched(self, doctor_id: str, users: Iterable[DbUserRecord]) -> None:
+        """Запоминает пользователей, которым назначения врача не подошли"""
+        today = self.today()
+        with self.__lock:
+            date, unmatched = self.__unmatched_users.get(doctor_id, (today, set()))
+            if date != today:
+                unmatched = set()
+            unmatched.update((user.id, user.limit_days) for user in users)
+            self.__unmatched_users[doctor_id] = (today, unmatched)
+
+    def retain(self, doctor_ids: Iterable[str]) -> None:
+        """Забывает врачей, которых больше не отслеживают"""
+        keep = set(doctor_ids)
+        with self.__lock:
+            for doctor_id in list(self.__snapshots):
+                if doctor_id not in keep:
+                    del self.__snapshots[doctor_id]
+                    self.__unmatched_users.pop(doctor_id, None)
+
+    def __len__(self) -> int:
+        return len(self.__snapshots)
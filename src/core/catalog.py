@@ -0,0 +1,343 @@
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any
+
+import requests
+
+from db.sqlite_db import SqliteDb
+from gorzdrav import exceptions
+from gorzdrav.api import Gorzdrav
+from gorzdrav.models import ApiDistrict, ApiDoctor, ApiLPU, ApiSpecialty
+from models.pydantic_models import CatalogDoctor, DbDoctorToCreate
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogMirror:
+    """
+    Справочники горздрава для навигации в боте: районы, медучреждения,
+    специальности и врачи берутся из локальной копии в БД,
+    если она синхронизирована не раньше max_age_secs назад.
+    Иначе справочник запрашивается у горздрава и сохраняется в копию.
+    """
+
+    def __init__(
+        self,
+        db: SqliteDb,
+        max_age_secs: float,
+        api: Any = Gorzdrav,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.db = db
+        self.max_age_secs = max_age_secs
+        self.api = api
+        self.clock = clock
+
+    def __is_fresh(self, level: str, scope: str) -> bool:
+        return self.db.is_catalog_fresh(
+            level=level, scope=scope, min_synced_at=self.clock() - self.max_age_secs
+        )
+
+    def get_districts(self) -> list[ApiDistrict]:
+        """Список районов города"""
+        if self.__is_fresh("districts", ""):
+            return self.db.get_catalog_districts()
+        districts = self.api.get_districts()
+        self.db.save_catalog_districts(districts, now=self.clock())
+        return districts
+
+    def get_lpus(self, districtId: str) -> list[ApiLPU]:
+        """
+        Медучреждения района
+        Args:
+            districtId: str: id района
+        Returns:
+            list[ApiLPU]: медучреждения
+        """
+        if self.__is_fresh("lpus", districtId):
+            return self.db.get_catalog_lpus(districtId)
+        lpus = list(self.api.iter_lpus(districtId=districtId))
+        self.db.save_catalog_lpus(districtId, lpus, now=self.clock())
+        return lpus
+
+    def get_lpu(self, lpuId: int) -> ApiLPU:
+        """
+        Медучреждение по id
+        Args:
+            lpuId: int: id медучреждения
+        Returns:
+            ApiLPU: медучреждение
+        """
+        result = self.db.get_catalog_lpu(
+            lpuId, min_synced_at=self.clock() - self.max_age_secs
+        )
+        if result is not None:
+            return result[1]
+        return self.api.get_lpu(lpuId=lpuId)
+
+    def get_specialties(self, lpuId: int) -> list[ApiSpecialty]:
+        """
+        Специальности медучреждения
+        Args:
+            lpuId: int: id медучреждения
+        Returns:
+            list[ApiSpecialty]: специальности
+        """
+        if self.__is_fresh("specialties", str(lpuId)):
+            return self.db.get_catalog_specialties(lpuId)
+        specialties = self.api.get_specialties(lpuId=lpuId)
+        self.db.save_catalog_specialties(lpuId, specialties, now=self.clock())
+        return specialties
+
+    def get_doctors(self, lpuId: int, specialtyId: str) -> list[ApiDoctor]:
+        """
+        Врачи медучреждения по специальности.
+        Количество мест у врачей на момент синхронизации,
+        актуальное проверяется при выборе врача
+        Args:
+            lpuId: int: id медучреждения
+            specialtyId: str: id специальности
+        Returns:
+            list[ApiDoctor]: врачи
+        """
+        if self.__is_fresh("doctors", f"{lpuId}/{specialtyId}"):
+            return self.db.get_catalog_doctors(lpuId, specialtyId)
+        doctors = self.api.get_doctors(lpuId=lpuId, specialtyId=specialtyId)
+        self.db.save_catalog_doctors(lpuId, specialtyId, doctors, now=self.clock())
+        return doctors
+
+    def get_live_doctors(
+        self, lpuId: int, specialtyId: str
+    ) -> tuple[list[ApiDoctor], bool]:
+        """
+        Врачи медучреждения по специальности для выбора врача.
+        Количество мест у врачей - это проверка доступности, поэтому список
+        всегда запрашивается у горздрава и заодно обновляет копию.
+        Если горздрав не ответил, врачи берутся из копии,
+        но количество мест в ней может быть устаревшим
+        Args:
+            lpuId: int: id медучреждения
+            specialtyId: str: id специальности
+        Returns:
+            tuple[list[ApiDoctor], bool]: врачи и актуально ли количество мест
+        """
+        scope = f"{lpuId}/{specialtyId}"
+        try:
+            doctors = self.api.get_doctors(lpuId=lpuId, specialtyId=specialtyId)
+        except (exceptions.GorzdravExceptionBase, requests.RequestException) as e:
+            if not self.db.is_catalog_fresh("doctors", scope, min_synced_at=0.0):
+                raise
+            logger.warning("doctors %s from catalog, gorzdrav failed: %s", scope, e)
+            return self.db.get_catalog_doctors(lpuId, specialtyId), False
+        self.db.save_catalog_doctors(lpuId, specialtyId, doctors, now=self.clock())
+        return doctors, True
+
+    @staticmethod
+    def get_search_words(text: str) -> list[str]:
+        """
+        Слова запроса пользователя. Слова короче трёх букв
+        не ищутся триграммным индексом и отбрасываются,
+        кавычки разделяют слова, чтобы не сломать синтаксис запроса fts5
+        """
+        return [word for word in re.findall(r'[^\s"]+', text) if len(word) >= 3]
+
+    @classmethod
+    def get_match_query(cls, text: str) -> str | None:
+        """
+        Запрос fts5 по тексту пользователя: все слова должны встретиться
+        в ФИО врача, специальности или названии медучреждения
+        Args:
+            text: str: текст запроса, например "иванов терапевт"
+        Returns:
+            str | None: запрос fts5, None - искать нечего
+        """
+        words = cls.get_search_words(text)
+        if not words:
+            return None
+        return " ".join(f'"{word}"' for word in words)
+
+    def search_doctors(self, text: str, limit: int) -> list[CatalogDoctor]:
+        """
+        Поиск врачей по фамилии, специальности или медучреждению
+        в локальной копии справочников, без запросов к горздраву.
+        Сначала идут врачи, в ФИО которых нашлись слова запроса
+        Args:
+            text: str: текст запроса
+            limit: int: максимум результатов
+        Returns:
+            list[CatalogDoctor]: найденные врачи
+        """
+        match = self.get_match_query(text)
+        if match is None:
+            return []
+        return self.db.search_catalog_doctors(match, limit=limit)
+
+    def get_found_doctor(self, lpuId: int, doctor_hash: str) -> DbDoctorToCreate | None:
+        """
+        Врач из результатов поиска по медучреждению и хешу врача.
+        В callback кнопки найденного врача помещаются только эти два поля:
+        id врача и специальности у горздрава бывают длинными,
+        а telegram ограничивает callback_data 64 байтами
+        Args:
+            lpuId: int: id медучреждения
+            doctor_hash: str: хеш врача, SqliteDb.get_doctor_hash
+        Returns:
+            DbDoctorToCreate | None: врач, None - врача уже нет в справочнике
+        """
+        for doctor in self.db.get_catalog_lpu_doctors(lpuId):
+            if SqliteDb.get_doctor_hash(doctor) == doctor_hash:
+                return doctor
+        return None
+
+
+class CatalogSync:
+    """
+    Фоновый обход справочников горздрава в локальную копию:
+    районы, медучреждения районов, специальности медучреждений, врачи специальностей.
+    Запросы уровня выполняются параллельно не больше чем в concurrency потоков,
+    в БД результаты пишет один поток. Записи, синхронизированные позже
+    refresh_secs назад, не запрашиваются повторно, например после перезапуска.
+    При ошибке запроса в копии остаются прежние записи.
+    """
+
+    def __init__(
+        self,
+        db: SqliteDb,
+        concurrency: int,
+        refresh_secs: float,
+        api: Any = Gorzdrav,
+        clock: Callable[[], float] = time.time,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.db = db
+        self.concurrency = concurrency
+        self.refresh_secs = refresh_secs
+        self.api = api
+        self.clock = clock
+
+    def __get_stale(self, level: str, scopes: Iterable[Any]) -> list[Any]:
+        synced_at = self.db.get_catalog_synced_at(level)
+        min_synced_at = self.clock() - self.refresh_secs
+        return [
+            scope
+            for scope in scopes
+            if synced_at.get(self.get_scope(scope), 0.0) < min_synced_at
+        ]
+
+    @staticmethod
+    def get_scope(key: Any) -> str:
+        """scope в catalog_sync по ключу запроса: id или (id медучреждения, id специальности)"""
+        if isinstance(key, tuple):
+            return "/".join(map(str, key))
+        return str(key)
+
+    def __fetch_all(
+        self,
+        level: str,
+        keys: list[Any],
+        fetch: Callable[[Any], list[Any]],
+        save: Callable[[Any, list[Any]], Any],
+        stats: dict[str, int],
+    ) -> None:
+        """Запрашивает уровень справочника по ключам и сохраняет ответы по мере готовности"""
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix=f"catalog_{level}"
+        ) as executor:
+            futures = {executor.submit(fetch, key): key for key in keys}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    items = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.warning("catalog %s %s not synced: %s", level, key, e)
+                    continue
+                save(key, items)
+                stats[level] += 1
+
+    def run_once(self) -> dict[str, int]:
+        """
+        Один проход синхронизации справочников
+        Returns:
+            dict[str, int]: количество обновлённых scope по уровням и ошибок
+        """
+        stats = {"districts": 0, "lpus": 0, "specialties": 0, "doctors": 0, "failed": 0}
+        started_at = time.monotonic()
+
+        if self.__get_stale("districts", [""]):
+            self.__fetch_all(
+                level="districts",
+                keys=[""],
+                fetch=lambda _: self.api.get_districts(),
+                save=lambda _, items: self.db.save_catalog_districts(
+                    items, now=self.clock()
+                ),
+                stats=stats,
+            )
+        districts = self.db.get_catalog_districts()
+
+        self.__fetch_all(
+            level="lpus",
+            keys=self.__get_stale("lpus", [district.id for district in districts]),
+            fetch=lambda districtId: list(
+                self.api.iter_lpus(districtId=districtId, use_cache=False)
+            ),
+            save=lambda districtId, items: self.db.save_catalog_lpus(
+                districtId, items, now=self.clock()
+            ),
+            stats=stats,
+        )
+        lpu_ids = [
+            lpu.id
+            for district in districts
+            for lpu in self.db.get_catalog_lpus(district.id)
+        ]
+
+        self.__fetch_all(
+            level="specialties",
+            keys=self.__get_stale("specialties", lpu_ids),
+            fetch=lambda lpuId: self.api.get_specialties(lpuId=lpuId, use_cache=False),
+            save=lambda lpuId, items: self.db.save_catalog_specialties(
+                lpuId, items, now=self.clock()
+            ),
+            stats=stats,
+        )
+        specialty_keys = [
+            (lpuId, specialty.id)
+            for lpuId in lpu_ids
+            for specialty in self.db.get_catalog_specialties(lpuId)
+        ]
+
+        self.__fetch_all(
+            level="doctors",
+            keys=self.__get_stale("doctors", specialty_keys),
+            fetch=lambda key: self.api.get_doctors(lpuId=key[0], specialtyId=key[1]),
+            save=lambda key, items: self.db.save_catalog_doctors(
+                key[0], key[1], items, now=self.clock()
+            ),
+            stats=stats,
+        )
+        logger.info(
+            "catalog synced in %.1f s: %s", time.monotonic() - started_at, stats
+        )
+        return stats
+
+    def run_forever(self, interval_secs: float, stop: threading.Event) -> None:
+        """
+        Синхронизирует справочники каждые interval_secs, пока не выставлен stop
+        Args:
+            interval_secs: float: пауза между проходами
+            stop: threading.Event: событие остановки
+        """
+        logger.info("catalog sync started")
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("catalog sync failed: %s", e)
+            stop.wait(interval_secs)
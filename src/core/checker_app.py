@@ -1,16 +1,84 @@
 import datetime
+import itertools
 import logging
+from collections.abc import Iterable, Iterator
 
 import requests
 
-from gorzdrav.models import ApiAppointment, Doctor
+from gorzdrav.models import ApiAppointment, ApiAppointmentRecord, ApiSpecialty, Doctor
 from models.pydantic_models import DbUser
+from models.records import DbDoctorRecord, DbUserRecord
 from telegram.types import TGParseMode
 
 logger = logging.getLogger(__name__)
 
 
 class CheckerApp:
+    @staticmethod
+    def group_doctors_by_specialty(
+        doctors: Iterable[DbDoctorRecord],
+    ) -> dict[tuple[int, str], list[DbDoctorRecord]]:
+        """
+        Группирует отслеживаемых врачей по паре (lpuId, specialtyId).
+        Список врачей специальности в медучреждении горздрав отдаёт одним запросом,
+        поэтому на каждую группу достаточно одного обращения к API.
+        Args:
+            doctors: Iterable[DbDoctorRecord]: врачи с пингующими пользователями
+        Returns:
+            dict[tuple[int, str], list[DbDoctorRecord]]: врачи по группам
+        """
+        groups: dict[tuple[int, str], list[DbDoctorRecord]] = {}
+        for doctor in doctors:
+            key = (doctor.lpuId, doctor.specialtyId)
+            groups.setdefault(key, []).append(doctor)
+        return groups
+
+    @classmethod
+    def iter_lpu_doctors_groups(
+        cls,
+        doctors: Iterable[DbDoctorRecord],
+    ) -> Iterator[tuple[int, dict[tuple[int, str], list[DbDoctorRecord]]]]:
+        """
+        Группирует поток врачей по медучреждениям на лету.
+        Врачи одного медучреждения должны идти подряд, как их отдаёт
+        SqliteDb.iter_active_doctors_joined_users, в памяти только одно медучреждение
+        Args:
+            doctors: Iterable[DbDoctorRecord]: врачи с пингующими пользователями
+        Returns:
+            Iterator[tuple[int, dict[tuple[int, str], list[DbDoctorRecord]]]]:
+                id медучреждения и его врачи по группам (lpuId, specialtyId)
+        """
+        for lpuId, lpu_doctors in itertools.groupby(
+            doctors, key=lambda doctor: doctor.lpuId
+        ):
+            yield lpuId, cls.group_doctors_by_specialty(lpu_doctors)
+
+    @staticmethod
+    def prune_doctors_groups(
+        doctors_groups: dict[tuple[int, str], list[DbDoctorRecord]],
+        specialties_by_lpu: dict[int, list[ApiSpecialty]],
+    ) -> dict[tuple[int, str], list[DbDoctorRecord]]:
+        """
+        Убирает группы врачей, у специальности которых нет свободных мест.
+        Если специальности медучреждения неизвестны или счётчик не пришёл,
+        группа остаётся, чтобы не пропустить талоны.
+        Args:
+            doctors_groups: dict[tuple[int, str], list[DbDoctorRecord]]: врачи по группам
+            specialties_by_lpu: dict[int, list[ApiSpecialty]]: специальности медучреждений
+        Returns:
+            dict[tuple[int, str], list[DbDoctorRecord]]: группы, которые нужно запросить
+        """
+        free_places: dict[tuple[int, str], int | None] = {
+            (lpuId, specialty.id): specialty.countFreeParticipant
+            for lpuId, specialties in specialties_by_lpu.items()
+            for specialty in specialties
+        }
+        return {
+            key: group_docs
+            for key, group_docs in doctors_groups.items()
+            if free_places.get(key) != 0
+        }
+
     @staticmethod
     def is_doc_nearestDate_in_user_limit_days(user: DbUser, doctor: Doctor) -> bool:
         """Проверяет, попадает ли ближайшая дата записи врача в лимит дней пользователя от текущей даты"""
@@ -45,6 +113,11 @@ class CheckerApp:
         logger.debug("delta_days: %s", delta_days)
         return delta_days <= user_limit_days
 
+    @staticmethod
+    def is_any_user_have_day_limit(users: list[DbUserRecord]) -> bool:
+        """Проверяет, есть ли среди пользователей врача те, кто задал лимит дней"""
+        return any(user.limit_days for user in users)
+
     # send message to telegram with requests.post
     @staticmethod
     def send_tg_message(
@@ -78,12 +151,65 @@ class CheckerApp:
                 response.text,
             )
 
+    @staticmethod
+    def get_spb_today() -> datetime.date:
+        """Текущая дата в СПб (UTC+3)"""
+        return datetime.datetime.now(
+            datetime.timezone(offset=datetime.timedelta(hours=3))
+        ).date()
+
+    @staticmethod
+    def get_nearest_appointment_offset(
+        appointments: list[ApiAppointmentRecord],
+        today: datetime.date | None = None,
+    ) -> int | None:
+        """
+        Через сколько дней ближайшее назначение врача, считая сегодня за 1 день.
+        Считается один раз на врача, дальше лимит каждого пользователя
+        проверяется одним сравнением в is_offset_in_user_limit_days
+        Args:
+            appointments: list[ApiAppointmentRecord]: назначения врача
+            today: datetime.date | None: текущая дата в СПб, по умолчанию сегодня
+        Returns:
+            int | None: номер дня ближайшего назначения, None если назначений нет
+        """
+        if today is None:
+            today = CheckerApp.get_spb_today()
+        visit_dates = (appointment.visitStart.date() for appointment in appointments)
+        nearest_date: datetime.date | None = min(
+            (visit_date for visit_date in visit_dates if visit_date >= today),
+            default=None,
+        )
+        if nearest_date is None:
+            return None
+        return (nearest_date - today).days + 1
+
+    @staticmethod
+    def is_offset_in_user_limit_days(
+        nearest_offset: int | None, user: DbUserRecord
+    ) -> bool:
+        """
+        Попадает ли ближайшее назначение врача в лимит дней пользователя
+        Args:
+            nearest_offset: int | None: результат get_nearest_appointment_offset
+            user: DbUserRecord: пользователь
+        Returns:
+            bool: True если лимит не задан или назначение в его пределах
+        """
+        if not user.limit_days:
+            return True
+        return nearest_offset is not None and nearest_offset <= user.limit_days
+
     @staticmethod
     def check_appointments_in_user_limit_days(
         appointments: list[ApiAppointment],
         user: DbUser,
     ) -> bool:
-        """Проверяет есть ли назначения врача в пределах лимита дней пользователя"""
+        """
+        Проверяет есть ли назначения врача в пределах лимита дней пользователя.
+        Для проверки многих пользователей одного врача быстрее
+        get_nearest_appointment_offset + is_offset_in_user_limit_days
+        """
         if not appointments:
             return False
 
@@ -0,0 +1,250 @@
+import bisect
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    """Число в формате Prometheus"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def format_labels(names: tuple[str, ...], values: LabelValues) -> str:
+    """Метки метрики в формате Prometheus: {name="value",...}"""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """Метрика с необязательными метками, значения хранятся по набору меток"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, labels: dict[str, str | int]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def get(self, **labels: str | int) -> float:
+        """Текущее значение по меткам"""
+        return self._values.get(self._get_key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        """Строки метрики в текстовом формате Prometheus"""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Счётчик, только растёт"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str | int) -> None:
+        if amount < 0:
+            raise ValueError("counter can only increase")
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Текущее значение, может считаться функцией в момент сбора"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self.__function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels: str | int) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str | int) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Значение метрики без меток будет вычисляться при каждом сборе"""
+        if self.label_names:
+            raise ValueError("function gauge can not have labels")
+        self.__function = function
+
+    def render(self) -> list[str]:
+        if self.__function is not None:
+            self.set(self.__function())
+        return super().render()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам, например длительностей запросов"""
+
+    type_name = "histogram"
+    default_buckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = default_buckets,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.__counts: dict[LabelValues, list[int]] = {}
+        self.__sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str | int) -> None:
+        key = self._get_key(labels)
+        # корзины хранятся не накопительно, суммируются при выводе
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.__counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self.__sums[key] = self.__sums.get(key, 0.0) + value
+
+    def get_count(self, **labels: str | int) -> int:
+        """Сколько значений наблюдалось по меткам"""
+        return sum(self.__counts.get(self._get_key(labels), []))
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            items = sorted(
+                (key, list(counts), self.__sums[key])
+                for key, counts in self.__counts.items()
+            )
+        bucket_label_names = self.label_names + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = format_labels(bucket_label_names, key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+class MetricsRegistry:
+    """Набор метрик процесса, отдаётся целиком в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self.__metrics: dict[str, Metric] = {}
+        self.__lock = threading.Lock()
+
+    def register(self, metric: MetricType) -> MetricType:
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, description: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = Histogram.default_buckets,
+    ) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# общий набор метрик процесса
+registry = MetricsRegistry()
+
+
+def start_metrics_server(
+    port: int,
+    host: str = "127.0.0.1",
+    metrics_registry: MetricsRegistry = registry,
+) -> ThreadingHTTPServer:
+    """
+    Запускает в фоновом потоке http сервер, отдающий метрики на /metrics
+    Args:
+        port: int: порт, 0 - выбрать свободный
+        host: str: адрес, по умолчанию только локальный
+        metrics_registry: MetricsRegistry: набор метрик
+    Returns:
+        ThreadingHTTPServer: запущенный сервер
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics_registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics request: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics_server", daemon=True
+    )
+    thread.start()
+    logger.info("metrics server started on %s:%s", host, server.server_address[1])
+    return server
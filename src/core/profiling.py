@@ -0,0 +1,135 @@
+import contextvars
+import cProfile
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseFrame:
+    """Открытая фаза: время начала и время вложенных фаз"""
+
+    __slots__ = ("name", "started_at", "children_time")
+
+    def __init__(self, name: str, started_at: float):
+        self.name = name
+        self.started_at = started_at
+        self.children_time = 0.0
+
+
+class PhaseTimer:
+    """
+    Суммирует время по фазам цикла проверки (БД, запросы, разбор, отправка...).
+    Время вложенной фазы не учитывается в родительской.
+    В async режиме и при рассылке в потоках фазы идут параллельно,
+    поэтому сумма фаз может быть больше длительности цикла.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.__totals: dict[str, float] = {}
+        self.__lock = threading.Lock()
+        self.__stack: contextvars.ContextVar[tuple[PhaseFrame, ...]] = (
+            contextvars.ContextVar("phase_stack", default=())
+        )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Засекает время блока кода как фазу name"""
+        frame = PhaseFrame(name=name, started_at=self.clock())
+        stack = self.__stack.get()
+        token = self.__stack.set(stack + (frame,))
+        try:
+            yield
+        finally:
+            self.__stack.reset(token)
+            elapsed = self.clock() - frame.started_at
+            if stack:
+                stack[-1].children_time += elapsed
+            with self.__lock:
+                self.__totals[name] = self.__totals.get(name, 0.0) + max(
+                    0.0, elapsed - frame.children_time
+                )
+
+    def pop_totals(self) -> dict[str, float]:
+        """
+        Возвращает время по фазам с прошлого вызова и обнуляет его
+        Returns:
+            dict[str, float]: {фаза: секунды}
+        """
+        with self.__lock:
+            totals, self.__totals = self.__totals, {}
+        return totals
+
+
+class CycleProfiler:
+    """
+    Профилирование циклов проверки через cProfile.
+    Каждый цикл пишется в отдельный файл .prof в directory,
+    хранятся только keep последних файлов.
+    cProfile видит только поток, в котором цикл был запущен.
+    """
+
+    file_prefix = "checker-cycle-"
+
+    def __init__(self, directory: str, keep: int, max_cycles: int = 0):
+        if keep < 1:
+            raise ValueError("keep must be >= 1")
+        self.directory = directory
+        self.keep = keep
+        # сколько циклов профилировать, 0 - все
+        self.max_cycles = max_cycles
+        self.cycles = 0
+        self.__profile: cProfile.Profile | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.max_cycles == 0 or self.cycles < self.max_cycles
+
+    def start(self) -> None:
+        """Начинает профилирование цикла"""
+        if not self.active or self.__profile is not None:
+            return
+        self.__profile = cProfile.Profile()
+        self.__profile.enable()
+
+    def stop(self) -> str | None:
+        """
+        Заканчивает профилирование цикла и сохраняет профиль
+        Returns:
+            str | None: путь к файлу профиля, None если профилирование не шло
+        """
+        if self.__profile is None:
+            return None
+        self.__profile.disable()
+        self.cycles += 1
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory,
+            f"{self.file_prefix}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+            f"-{self.cycles:06d}.prof",
+        )
+        self.__profile.dump_stats(path)
+        self.__profile = None
+        self.rotate()
+        logger.info("cycle profile saved to %s", path)
+        return path
+
+    def rotate(self) -> None:
+        """Удаляет старые профили сверх keep"""
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(self.file_prefix) and name.endswith(".prof")
+        ]
+        paths.sort(key=lambda path: (os.path.getmtime(path), path))
+        for path in paths[: -self.keep]:
+            os.remove(path)
+
+
+# общий счётчик фаз процесса
+phase_timer = PhaseTimer()
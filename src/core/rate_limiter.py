@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Ведро токенов: пропускает в среднем rate запросов в секунду
+    и допускает всплеск до capacity запросов подряд.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.clock = clock
+        self.__rate = rate
+        self.__tokens = capacity
+        self.__updated_at = clock()
+        self.__lock = threading.Lock()
+
+    def __refill(self) -> None:
+        now = self.clock()
+        elapsed = max(0.0, now - self.__updated_at)
+        self.__tokens = min(self.capacity, self.__tokens + elapsed * self.__rate)
+        self.__updated_at = now
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        if value <= 0:
+            raise ValueError("rate must be > 0")
+        with self.__lock:
+            # накопленные токены считаются по старой скорости
+            self.__refill()
+            self.__rate = value
+
+    @property
+    def full_at(self) -> float:
+        """Время по clock, когда ведро снова наполнится до capacity"""
+        with self.__lock:
+            return self.__updated_at + (self.capacity - self.__tokens) / self.__rate
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Забирает токены из ведра
+        Args:
+            tokens: float: количество токенов
+        Returns:
+            float: сколько секунд нужно подождать до запроса
+        """
+        with self.__lock:
+            self.__refill()
+            self.__tokens -= tokens
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.__rate
+
+    def drain(self) -> None:
+        """Опустошает ведро, следующий запрос подождёт 1 / rate секунд"""
+        with self.__lock:
+            self.__refill()
+            self.__tokens = min(self.__tokens, 0.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    Ограничитель запросов с отдельным ведром токенов на каждый ключ.
+    Скорость по ключу уменьшается в decrease_factor раз при перегрузке сервера
+    и растёт на increase_step запросов в секунду после каждого успешного ответа.
+    Все запросы дополнительно проходят через общее ведро global_rate.
+    Если задан idle_secs, ведра ключей, которые простояли полными idle_secs,
+    удаляются, вместе с ними забывается и подобранная скорость.
+    Нужно, когда ключей неограниченно много, например чаты телеграма.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        capacity: float = 1.0,
+        global_rate: float | None = None,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        idle_secs: float | None = None,
+    ):
+        if not (0 < min_rate <= initial_rate <= max_rate):
+            raise ValueError("rates must be 0 < min_rate <= initial_rate <= max_rate")
+        if not (0 < decrease_factor < 1):
+            raise ValueError("decrease_factor must be in (0, 1)")
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.idle_secs = idle_secs
+        self.__buckets: dict[str, TokenBucket] = {}
+        self.__lock = threading.Lock()
+        self.__pruned_at = clock()
+        self.__global_bucket: TokenBucket | None = None
+        if global_rate is not None:
+            self.__global_bucket = TokenBucket(
+                rate=global_rate, capacity=max(capacity, global_rate), clock=clock
+            )
+
+    def __prune(self) -> None:
+        """Удаляет простаивающие ведра не чаще раза в idle_secs, вызывать под __lock"""
+        if self.idle_secs is None:
+            return
+        now = self.clock()
+        if now - self.__pruned_at < self.idle_secs:
+            return
+        self.__pruned_at = now
+        for key in [
+            key
+            for key, bucket in self.__buckets.items()
+            if now - bucket.full_at >= self.idle_secs
+        ]:
+            del self.__buckets[key]
+
+    def __get_bucket(self, key: str) -> TokenBucket:
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            with self.__lock:
+                self.__prune()
+                bucket = self.__buckets.setdefault(
+                    key,
+                    TokenBucket(
+                        rate=self.initial_rate,
+                        capacity=self.capacity,
+                        clock=self.clock,
+                    ),
+                )
+        return bucket
+
+    def reserve(self, key: str) -> float:
+        """
+        Резервирует запрос по ключу
+        Args:
+            key: str: ключ ограничителя (медучреждение и группа эндпоинтов)
+        Returns:
+            float: сколько секунд нужно подождать до запроса
+        """
+        wait = self.__get_bucket(key).reserve()
+        if self.__global_bucket is not None:
+            wait = max(wait, self.__global_bucket.reserve())
+        return wait
+
+    def acquire(self, key: str) -> float:
+        """Ждёт своей очереди на запрос. Возвращает время ожидания"""
+        wait = self.reserve(key)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, key: str) -> float:
+        """Асинхронно ждёт своей очереди на запрос. Возвращает время ожидания"""
+        wait = self.reserve(key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self, key: str) -> None:
+        """Ответ получен, плавно увеличиваем скорость"""
+        bucket = self.__get_bucket(key)
+        if bucket.rate < self.max_rate:
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+
+    def on_throttle(self, key: str) -> None:
+        """Сервер перегружен, резко снижаем скорость"""
+        bucket = self.__get_bucket(key)
+        bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+        bucket.drain()
+
+    def get_rate(self, key: str) -> float:
+        """Текущая скорость по ключу в запросах в секунду"""
+        bucket = self.__buckets.get(key)
+        return bucket.rate if bucket is not None else self.initial_rate
+
+    def __len__(self) -> int:
+        return len(self.__buckets)
+
+    def get_rates(self) -> dict[str, float]:
+        """Текущие скорости по всем ключам в запросах в секунду"""
+        with self.__lock:
+            return {key: bucket.rate for key, bucket in self.__buckets.items()}
+
+    def get_slowed_down(self) -> dict[str, float]:
+        """Ключи, скорость которых сейчас ниже начальной"""
+        return {
+            key: rate
+            for key, rate in self.get_rates().items()
+            if rate < self.initial_rate
+        }
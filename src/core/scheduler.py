@@ -0,0 +1,185 @@
+import heapq
+import math
+import threading
+import time
+from typing import Callable
+
+
+class DoctorPollState:
+    """Статистика опроса одного врача"""
+
+    __slots__ = (
+        "doctor_id",
+        "watchers",
+        "first_seen_at",
+        "checks",
+        "hits",
+        "interval",
+        "next_check_at",
+    )
+
+    def __init__(self, doctor_id: str, watchers: int, now: float):
+        self.doctor_id = doctor_id
+        self.watchers = watchers
+        self.first_seen_at = now
+        self.checks = 0
+        self.hits = 0
+        self.interval = 0.0
+        self.next_check_at = now
+
+    @property
+    def volatility(self) -> float:
+        """Сглаженная доля проверок, на которых у врача были свободные места"""
+        return (self.hits + 1) / (self.checks + 2)
+
+
+class PriorityScheduler:
+    """
+    Планировщик опроса врачей по приоритету.
+    Интервал проверки врача тем меньше, чем больше у него наблюдателей,
+    чем дольше они ждут и чем чаще у врача раньше появлялись талоны.
+    Интервалы лежат в пределах [min_interval_secs, max_interval_secs]
+    и растягиваются, если суммарно не укладываются в requests_per_minute.
+    """
+
+    # через сколько часов ожидания приоритет врача удваивается
+    wait_doubling_hours = 24.0
+    # во сколько раз всегда свободный врач приоритетнее никогда не свободного
+    volatility_weight = 10.0
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        min_interval_secs: float,
+        max_interval_secs: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be > 0")
+        if not (0 < min_interval_secs <= max_interval_secs):
+            raise ValueError("intervals must be 0 < min <= max")
+        self.requests_per_minute = requests_per_minute
+        self.min_interval_secs = min_interval_secs
+        self.max_interval_secs = max_interval_secs
+        self.clock = clock
+        self.budget_scale = 1.0
+        self.__states: dict[str, DoctorPollState] = {}
+        self.__queue: list[tuple[float, str]] = []
+        self.__lock = threading.Lock()
+
+    def get_priority(self, state: DoctorPollState, now: float) -> float:
+        """Приоритет врача, не меньше 1"""
+        watchers_factor = 1 + math.log2(max(state.watchers, 1))
+        waited_hours = max(0.0, now - state.first_seen_at) / 3600
+        wait_factor = 1 + waited_hours / self.wait_doubling_hours
+        volatility_factor = 1 + (self.volatility_weight - 1) * state.volatility
+        return watchers_factor * wait_factor * volatility_factor
+
+    def get_base_interval(self, state: DoctorPollState, now: float) -> float:
+        """Интервал проверки врача без учёта бюджета запросов"""
+        interval = self.max_interval_secs / self.get_priority(state, now)
+        return min(self.max_interval_secs, max(self.min_interval_secs, interval))
+
+    def __rescale_budget(self, now: float) -> None:
+        """Растягивает интервалы, если врачей больше, чем позволяет бюджет"""
+        demand = sum(
+            60 / self.get_base_interval(state, now) for state in self.__states.values()
+        )
+        self.budget_scale = max(1.0, demand / self.requests_per_minute)
+
+    def __schedule(self, state: DoctorPollState, now: float) -> None:
+        state.interval = self.get_base_interval(state, now) * self.budget_scale
+        state.next_check_at = now + state.interval
+        heapq.heappush(self.__queue, (state.next_check_at, state.doctor_id))
+
+    def update_doctors(self, watchers: dict[str, int]) -> None:
+        """
+        Обновляет список отслеживаемых врачей.
+        Новые врачи проверяются сразу, пропавшие удаляются из очереди.
+        Args:
+            watchers: dict[str, int]: {id врача в БД: количество наблюдателей}
+        """
+        now = self.clock()
+        with self.__lock:
+            for doctor_id in list(self.__states):
+                if doctor_id not in watchers:
+                    del self.__states[doctor_id]
+            for doctor_id, count in watchers.items():
+                state = self.__states.get(doctor_id)
+                if state is None:
+                    state = DoctorPollState(doctor_id, watchers=count, now=now)
+                    self.__states[doctor_id] = state
+                    heapq.heappush(self.__queue, (now, doctor_id))
+                state.watchers = count
+            self.__rescale_budget(now)
+            # очередь без удалённых врачей и устаревших записей
+            self.__queue = [
+                (check_at, doctor_id)
+                for check_at, doctor_id in self.__queue
+                if doctor_id in self.__states
+                and check_at == self.__states[doctor_id].next_check_at
+            ]
+            heapq.heapify(self.__queue)
+
+    def pop_due(self, limit: int | None = None) -> list[str]:
+        """
+        Забирает врачей, которых пора проверить
+        Args:
+            limit: int | None: максимум врачей за раз
+        Returns:
+            list[str]: id врачей в порядке срочности
+        """
+        now = self.clock()
+        due: list[str] = []
+        with self.__lock:
+            while self.__queue and (limit is None or len(due) < limit):
+                check_at, doctor_id = self.__queue[0]
+                if check_at > now:
+                    break
+                heapq.heappop(self.__queue)
+                state = self.__states.get(doctor_id)
+                if state is None or state.next_check_at != check_at:
+                    continue
+                # до отчёта о проверке врач не стоит в очереди
+                state.next_check_at = math.inf
+                due.append(doctor_id)
+        return due
+
+    def report(self, doctor_id: str, had_free_places: bool | None) -> None:
+        """
+        Сообщает результат проверки врача и ставит его в очередь снова
+        Args:
+            doctor_id: str: id врача в БД
+            had_free_places: bool | None: были ли места, None - проверка не удалась
+        """
+        now = self.clock()
+        with self.__lock:
+            state = self.__states.get(doctor_id)
+            if state is None:
+                return
+            if had_free_places is not None:
+                state.checks += 1
+                state.hits += int(had_free_places)
+            self.__schedule(state, now)
+
+    def remove(self, doctor_id: str) -> None:
+        """Убирает врача из очереди, например когда у него не осталось наблюдателей"""
+        with self.__lock:
+            self.__states.pop(doctor_id, None)
+
+    def next_due_in(self) -> float:
+        """Через сколько секунд нужно проверить следующего врача"""
+        with self.__lock:
+            if not self.__queue:
+                return math.inf
+            return max(0.0, self.__queue[0][0] - self.clock())
+
+    def get_intervals(self) -> dict[str, float]:
+        """Текущие интервалы проверки врачей в секундах"""
+        with self.__lock:
+            return {
+                doctor_id: state.interval for doctor_id, state in self.__states.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self.__states)
@@ -0,0 +1,128 @@
+import logging
+import socket
+import threading
+import time
+import zlib
+from typing import Callable
+
+from db.sqlite_db import SqliteDb
+from models.records import DbDoctorRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ShardLeases:
+    """
+    Распределение врачей между воркерами чекера через аренду шардов в БД.
+    Врачи делятся на шарды по хешу медучреждения, чтобы все запросы
+    к одной поликлинике шли из одного воркера и его ограничителя скорости.
+    Воркер проверяет только врачей арендованных шардов.
+    Цикл проверки может идти дольше аренды, поэтому перед проверкой
+    каждого медучреждения аренда продлевается, если прошло renew_secs,
+    а шарды, которые забрал другой воркер, перестают проверяться.
+    id воркера по умолчанию - хост и номер воркера, а не pid процесса:
+    перезапущенный воркер сразу возвращает себе свою аренду,
+    а не ждёт, пока истечёт аренда прежнего процесса.
+    """
+
+    def __init__(
+        self,
+        db: SqliteDb,
+        shards_count: int,
+        lease_secs: float,
+        worker_id: str | None = None,
+        clock: Callable[[], float] = time.time,
+        renew_secs: float | None = None,
+        worker_index: int = 0,
+    ):
+        if shards_count < 1:
+            raise ValueError("shards_count must be >= 1")
+        if renew_secs is None:
+            renew_secs = lease_secs / 3
+        if not 0 < renew_secs < lease_secs:
+            raise ValueError("renew_secs must be > 0 and < lease_secs")
+        self.db = db
+        self.shards_count = shards_count
+        self.lease_secs = lease_secs
+        self.renew_secs = renew_secs
+        self.worker_id = worker_id or f"{socket.gethostname()}:{worker_index}"
+        self.clock = clock
+        self.shards: set[int] = set()
+        self.refreshed_at: float | None = None
+        # owns вызывается из нескольких потоков асинхронного чекера
+        self.__lock = threading.RLock()
+
+    @staticmethod
+    def get_shard(lpuId: int, shards_count: int) -> int:
+        """Шард медучреждения, одинаковый во всех процессах и на всех хостах"""
+        return zlib.crc32(str(lpuId).encode()) % shards_count
+
+    def refresh(self) -> set[int]:
+        """
+        Продлевает аренду и при необходимости забирает или отпускает шарды
+        Returns:
+            set[int]: шарды воркера
+        """
+        with self.__lock:
+            now = self.clock()
+            shards = set(
+                self.db.acquire_checker_shards(
+                    worker_id=self.worker_id,
+                    shards_count=self.shards_count,
+                    lease_secs=self.lease_secs,
+                    now=now,
+                )
+            )
+            if shards != self.shards:
+                logger.info(
+                    "worker %s owns %s of %s shards: %s",
+                    self.worker_id,
+                    len(shards),
+                    self.shards_count,
+                    sorted(shards),
+                )
+            self.shards = shards
+            self.refreshed_at = now
+            return shards
+
+    def owns(self, lpuId: int) -> bool:
+        """
+        Проверяет, что медучреждение всё ещё в шардах воркера.
+        Продлевает аренду, если прошло renew_secs с прошлого продления.
+        Если продлить не удалось, шарды считаются своими, пока не истекла аренда
+        Args:
+            lpuId: int: id медучреждения
+        Returns:
+            bool: можно проверять врачей медучреждения и оповещать их пользователей
+        """
+        with self.__lock:
+            now = self.clock()
+            if self.refreshed_at is None or now - self.refreshed_at >= self.renew_secs:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning("worker %s lease not renewed: %s", self.worker_id, e)
+            if self.refreshed_at is None or now - self.refreshed_at >= self.lease_secs:
+                return False
+            return self.is_own(lpuId)
+
+    def is_own(self, lpuId: int) -> bool:
+        """Медучреждение в шардах воркера"""
+        return self.get_shard(lpuId, self.shards_count) in self.shards
+
+    def filter_doctors(
+        self, doctors: dict[str, DbDoctorRecord]
+    ) -> dict[str, DbDoctorRecord]:
+        """Оставляет врачей из шардов воркера"""
+        return {
+            doctor_id: doctor
+            for doctor_id, doctor in doctors.items()
+            if self.is_own(doctor.lpuId)
+        }
+
+    def release(self) -> None:
+        """Отпускает шарды воркера"""
+        with self.__lock:
+            self.db.release_checker_shards(worker_id=self.worker_id)
+            self.shards = set()
+            self.refreshed_at = None
@@ -0,0 +1,228 @@
+import logging
+import sqlite3
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    """
+    Версия схемы БД: запросы, которые переводят схему из version - 1 в version.
+    Запросы идемпотентны (IF NOT EXISTS), чтобы миграция проходила
+    и на базах, созданных до появления версий
+    """
+
+    version: int
+    description: str
+    queries: tuple[str, ...]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        description="baseline schema",
+        queries=(
+            # doctors - врачи, которых наблюдают пользователи:
+            # id - хеш врача, districtId, lpuId, specialtyId, doctorId - id в горздраве
+            """CREATE TABLE IF NOT EXISTS doctors (
+            id VARCHAR(40) PRIMARY KEY,
+            districtId TEXT REQUIRED,
+            lpuId INT REQUIRED,
+            specialtyId TEXT REQUIRED,
+            doctorId TEXT REQUIRED
+        );""",
+            # users - пользователи telegram: ping_status - флаг активности проверки,
+            # doctor_id - наблюдаемый врач, last_seen - дата последнего входа в бота
+            """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            ping_status INTEGER DEFAULT 0 NOT NULL,
+            doctor_id VARCHAR(40),
+            last_seen DATETIME,
+            limit_days INTEGER,
+            FOREIGN KEY (doctor_id) REFERENCES doctors (id)
+        );""",
+            # живые воркеры чекера и аренда ими шардов врачей до expires_at
+            """CREATE TABLE IF NOT EXISTS checker_workers (
+            worker_id TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        );""",
+            """CREATE TABLE IF NOT EXISTS checker_leases (
+            shard INTEGER PRIMARY KEY,
+            worker_id TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );""",
+            # локальная копия справочников горздрава, catalog_sync - версия
+            # и время синхронизации уровня справочника в разрезе родителя (scope)
+            """CREATE TABLE IF NOT EXISTS catalog_sync (
+            level TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            synced_at REAL NOT NULL,
+            PRIMARY KEY (level, scope)
+        );""",
+            """CREATE TABLE IF NOT EXISTS catalog_districts (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL
+        );""",
+            """CREATE TABLE IF NOT EXISTS catalog_lpus (
+            id INTEGER PRIMARY KEY,
+            districtId TEXT NOT NULL,
+            address TEXT,
+            lpuFullName TEXT
+        );""",
+            """CREATE INDEX IF NOT EXISTS catalog_lpus_district
+            ON catalog_lpus (districtId);""",
+            """CREATE TABLE IF NOT EXISTS catalog_specialties (
+            lpuId INTEGER NOT NULL,
+            id TEXT NOT NULL,
+            name TEXT,
+            countFreeParticipant INTEGER,
+            countFreeTicket INTEGER,
+            lastDate TEXT,
+            nearestDate TEXT,
+            PRIMARY KEY (lpuId, id)
+        );""",
+            """CREATE TABLE IF NOT EXISTS catalog_doctors (
+            lpuId INTEGER NOT NULL,
+            specialtyId TEXT NOT NULL,
+            id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            freeParticipantCount INTEGER NOT NULL,
+            freeTicketCount INTEGER NOT NULL,
+            lastDate TEXT,
+            nearestDate TEXT,
+            ariaNumber TEXT,
+            PRIMARY KEY (lpuId, specialtyId, id)
+        );""",
+            # полнотекстовый индекс врачей (fts5, триграммы), rowid записи
+            # совпадает с rowid врача в catalog_doctors, обновляется триггерами
+            """CREATE VIRTUAL TABLE IF NOT EXISTS catalog_search USING fts5 (
+            doctorName,
+            specialtyName,
+            lpuFullName,
+            tokenize = 'trigram'
+        );""",
+            """CREATE TRIGGER IF NOT EXISTS catalog_doctors_search_insert
+            AFTER INSERT ON catalog_doctors
+        BEGIN
+            INSERT INTO catalog_search (rowid, doctorName, specialtyName, lpuFullName)
+            VALUES (
+                new.rowid,
+                new.name,
+                (
+                    SELECT name FROM catalog_specialties
+                    WHERE lpuId = new.lpuId AND id = new.specialtyId
+                ),
+                (SELECT lpuFullName FROM catalog_lpus WHERE id = new.lpuId)
+            );
+        END;""",
+            """CREATE TRIGGER IF NOT EXISTS catalog_doctors_search_delete
+            AFTER DELETE ON catalog_doctors
+        BEGIN
+            DELETE FROM catalog_search WHERE rowid = old.rowid;
+        END;""",
+            # врачи, сохранённые до появления индекса
+            """INSERT INTO catalog_search (rowid, doctorName, specialtyName, lpuFullName)
+            SELECT
+                catalog_doctors.rowid,
+                catalog_doctors.name,
+                catalog_specialties.name,
+                catalog_lpus.lpuFullName
+            FROM catalog_doctors
+            LEFT JOIN catalog_specialties ON
+                catalog_specialties.lpuId = catalog_doctors.lpuId
+                AND catalog_specialties.id = catalog_doctors.specialtyId
+            LEFT JOIN catalog_lpus ON catalog_lpus.id = catalog_doctors.lpuId
+            WHERE catalog_doctors.rowid NOT IN (SELECT rowid FROM catalog_search);""",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="users indexes for the checker",
+        queries=(
+            # пользователи врача: get_users_by_doctor
+            """CREATE INDEX IF NOT EXISTS users_doctor ON users (doctor_id);""",
+            # JOIN врачей с пингующими пользователями в чекере читает только индекс.
+            # ping_status в колонках, иначе sqlite не считает индекс покрывающим
+            """CREATE INDEX IF NOT EXISTS users_pinging_doctor
+            ON users (doctor_id, limit_days, ping_status) WHERE ping_status = 1;""",
+            # отключение проверки у давно не заходивших пользователей
+            """CREATE INDEX IF NOT EXISTS users_pinging_last_seen
+            ON users (last_seen) WHERE ping_status = 1;""",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="doctors index for streaming the checker JOIN",
+        queries=(
+            # врачи по специальностям медучреждений: JOIN чекера идёт
+            # в этом порядке без сортировки и отдаёт врачей по одному
+            """CREATE INDEX IF NOT EXISTS doctors_specialty
+            ON doctors (lpuId, specialtyId, id);""",
+        ),
+    ),
+)
+
+
+class SchemaMigrator:
+    """
+    Применяет миграции схемы БД, номер версии хранится в PRAGMA user_version.
+    Каждая миграция выполняется в своей короткой транзакции BEGIN IMMEDIATE:
+    в режиме WAL бот продолжает читать базу, а его записи ждут
+    окончания миграции не дольше busy timeout соединения.
+    Если бот и чекер запускаются одновременно, миграцию применит первый,
+    второй увидит новую версию после получения блокировки и пропустит её
+    """
+
+    @staticmethod
+    def get_version(connection: sqlite3.Connection) -> int:
+        """
+        Версия схемы базы
+        Args:
+            connection: sqlite3.Connection: соединение с базой
+        Returns:
+            int: версия, 0 - база без версии
+        """
+        return connection.execute("PRAGMA user_version;").fetchone()[0]
+
+    @classmethod
+    def migrate(
+        cls,
+        connection: sqlite3.Connection,
+        migrations: tuple[Migration, ...] = MIGRATIONS,
+    ) -> int:
+        """
+        Применяет миграции новее версии базы по возрастанию версии
+        Args:
+            connection: sqlite3.Connection: соединение с базой
+            migrations: tuple[Migration, ...]: миграции
+        Returns:
+            int: версия схемы после миграций
+        """
+        migrations = tuple(sorted(migrations, key=lambda m: m.version))
+        latest = migrations[-1].version if migrations else 0
+        version = cls.get_version(connection)
+        if version > latest:
+            logger.warning(
+                "db schema version %s is newer than known %s", version, latest
+            )
+        for migration in migrations:
+            if migration.version <= version:
+                continue
+            connection.commit()
+            connection.execute("BEGIN IMMEDIATE;")
+            try:
+                version = cls.get_version(connection)
+                if migration.version <= version:
+                    connection.rollback()
+                    continue
+                for q in migration.queries:
+                    connection.execute(q)
+                connection.execute(f"PRAGMA user_version = {migration.version};")
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            version = migration.version
+            logger.info("db migrated to version %s: %s", version, migration.description)
+        return version
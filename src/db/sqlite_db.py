@@ -1,10 +1,19 @@
 import datetime
 import hashlib
+import math
+import os
 import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
 
-from models.pydantic_models import DbDoctor, DbDoctorWithUsers
+from config import Config
+from db.migrations import SchemaMigrator
+from gorzdrav.models import ApiDistrict, ApiDoctor, ApiLPU, ApiSpecialty
+from models.pydantic_models import CatalogDoctor
+from models.pydantic_models import DbDoctor
 from models.pydantic_models import DbDoctorToCreate
 from models.pydantic_models import DbUser
+from models.records import DbDoctorRecord, DbUserRecord
 
 
 class SqliteDb:
@@ -12,6 +21,11 @@ class SqliteDb:
     Класс для работы с БД
     params: file: название файла с базой данных
     type: file: str
+
+    У каждого потока своё соединение и курсор: self.connection и self.cursor
+    возвращают соединение текущего потока, в дочернем процессе после fork
+    соединения открываются заново. База в режиме WAL: чтение не ждёт записи,
+    а записи бота и чекера ждут друг друга до DB_TIMEOUT_SECS.
     """
 
     @staticmethod
@@ -28,58 +42,74 @@ class SqliteDb:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.connection = sqlite3.connect(
-            database=self.db_path, check_same_thread=False, timeout=5
-        )
-        self.cursor = self.connection.cursor()
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__connections: list[sqlite3.Connection] = []
+        self.__pid = os.getpid()
+        # режим журнала хранится в файле базы, достаточно выставить один раз
+        self.connection.execute(f"PRAGMA journal_mode = {Config.DB_JOURNAL_MODE};")
         self.create_db()
 
-    def create_db(self):
+    def connect(self) -> sqlite3.Connection:
         """
-        Создаются таблицы докторов для поиска
-        и пользователей телеграм бота
+        Открывает новое соединение с базой и настраивает его
+        Returns:
+            sqlite3.Connection: соединение
         """
-        self.create_table_doctors()
-        self.create_table_users()
+        connection = sqlite3.connect(
+            database=self.db_path,
+            check_same_thread=False,
+            timeout=Config.DB_TIMEOUT_SECS,
+        )
+        connection.execute(f"PRAGMA synchronous = {Config.DB_SYNCHRONOUS};")
+        connection.execute(f"PRAGMA mmap_size = {Config.DB_MMAP_SIZE};")
+        connection.execute(f"PRAGMA cache_size = {Config.DB_CACHE_SIZE};")
+        return connection
+
+    def __get_local(self) -> threading.local:
+        """Соединение и курсор текущего потока, открываются при первом обращении"""
+        pid = os.getpid()
+        if self.__pid != pid:
+            # соединения родителя после fork не используются и не закрываются
+            self.__local = threading.local()
+            self.__lock = threading.Lock()
+            self.__connections = []
+            self.__pid = pid
+        local = self.__local
+        if getattr(local, "connection", None) is None:
+            local.connection = self.connect()
+            local.cursor = local.connection.cursor()
+            with self.__lock:
+                self.__connections.append(local.connection)
+        return local
 
-    def create_table_users(self):
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока"""
+        return self.__get_local().connection
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """Курсор текущего потока"""
+        return self.__get_local().cursor
+
+    def close(self) -> None:
+        """Закрывает соединения всех потоков текущего процесса"""
+        with self.__lock:
+            connections, self.__connections = self.__connections, []
+        self.__local = threading.local()
+        for connection in connections:
+            connection.close()
+
+    def create_db(self) -> int:
         """
-        Создание таблицы users:
-        id:int - идентификатор пользователя в telegram
-        doctor_id:str - идентификатор доктора, к которому относится пользователь
-        ping_status: bool - флаг активности проверки
-        last_seen:datetime - дата последнего входа в бота
-        Для каждого доктора может быть только один юзер, который его наблюдает
+        Создаёт или обновляет схему БД: таблицы докторов для поиска,
+        пользователей телеграм бота, аренды чекера и справочников горздрава.
+        Схема версионируется миграциями из db.migrations
+        Returns:
+            int: версия схемы
         """
-        q = """CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            ping_status INTEGER DEFAULT 0 NOT NULL,
-            doctor_id VARCHAR(40),
-            last_seen DATETIME,
-            limit_days INTEGER,
-            FOREIGN KEY (doctor_id) REFERENCES doctors (id)
-        );"""
-        self.cursor.execute(q)
-        self.connection.commit()
-
-    def create_table_doctors(self) -> None:
-        """
-        Создание таблицы doctors:
-        id: str - идентификатор доктора
-        districtId: str - идентификатор района
-        lpuId:int - идентификатор медучреждения
-        specialtyId:str - идентификатор специальности доктора
-        doctorId:str - идентификатор доктора в горздраве
-        """
-        q = """CREATE TABLE IF NOT EXISTS doctors (
-            id VARCHAR(40) PRIMARY KEY,
-            districtId TEXT REQUIRED,
-            lpuId INT REQUIRED,
-            specialtyId TEXT REQUIRED,
-            doctorId TEXT REQUIRED
-        );"""
-        self.cursor.execute(q)
-        self.connection.commit()
+        return SchemaMigrator.migrate(self.connection)
 
     def add_user(self, user: DbUser) -> None:
         """
@@ -229,6 +259,28 @@ class SqliteDb:
         self.cursor.execute(q, (ping_status, user_id))
         self.connection.commit()
 
+    def set_users_ping_status(self, user_ids: Iterable[int], ping_status: bool) -> int:
+        """
+        Устанавливает значение ping_status сразу для нескольких пользователей
+        одной транзакцией
+        Args:
+            user_ids: Iterable[int] - id пользователей
+            ping_status: bool - флаг активности проверки доктора
+        Returns:
+            int: количество обновлённых пользователей
+        """
+        q = """
+        UPDATE users
+            set ping_status = ?
+            WHERE users.id = ?;
+        """
+        params = [(ping_status, user_id) for user_id in user_ids]
+        if not params:
+            return 0
+        with self.connection:
+            cursor = self.connection.executemany(q, params)
+        return cursor.rowcount
+
     def add_user_doctor(self, user_id: int, doctor_id: str) -> None:
         """
         Добавляет доктора к пользователю
@@ -383,14 +435,20 @@ class SqliteDb:
         self.cursor.execute(q, (user_id,))
         self.connection.commit()
 
-    def get_active_doctors_joined_users(self) -> dict[str, DbDoctorWithUsers]:
-        """
-        Возвращает словарь докторов с пингующими их пользовтелями
-        Args:
-            None: None
+    def iter_active_doctors_joined_users(self) -> Iterator[DbDoctorRecord]:
+        """
+        Отдаёт докторов с пингующими их пользователями по одному.
+        Доктора идут по медучреждению, специальности и id доктора,
+        врачи одной специальности и одного медучреждения подряд.
+        JOIN читается по одному медучреждению с продолжением по lpuId,
+        в памяти только его строки, а первый доктор готов сразу.
+        Между медучреждениями открытых запросов нет: запись этим же соединением
+        не упирается в снимок чтения, а контрольная точка WAL не ждёт конца цикла.
+        Записи строятся прямо из строк без pydantic, это горячий путь чекера
         Returns:
-            dict[str, DbDoctorWithUsers]: словарь докторов с их активными пользователями
+            Iterator[DbDoctorRecord]: доктора с активными пользователями
         """
+        # CROSS JOIN фиксирует порядок обхода: доктора по индексу, к ним пользователи
         q = """
         SELECT
             doctors.id,
@@ -399,49 +457,51 @@ class SqliteDb:
             doctors.specialtyId,
             doctors.doctorId,
             users.id,
-            users.ping_status,
-            users.doctor_id,
-            users.last_seen,
             users.limit_days
         FROM doctors
-        JOIN users ON doctors.id = users.doctor_id
-        WHERE ping_status == 1;
+        CROSS JOIN users ON doctors.id = users.doctor_id
+        WHERE users.ping_status == 1 AND doctors.lpuId = (
+            SELECT doctors.lpuId
+            FROM doctors
+            CROSS JOIN users ON doctors.id = users.doctor_id
+            WHERE users.ping_status == 1 AND doctors.lpuId > ?
+            ORDER BY doctors.lpuId
+            LIMIT 1
+        )
+        ORDER BY doctors.specialtyId, doctors.id;
+        """
+        # меньше любого id медучреждения
+        last_lpu_id = -(2**63)
+        while True:
+            rows = self.connection.execute(q, (last_lpu_id,)).fetchall()
+            if not rows:
+                return
+            last_lpu_id = rows[0][2]
+            doctor: DbDoctorRecord | None = None
+            for row in rows:
+                if doctor is None or doctor.id != row[0]:
+                    if doctor is not None:
+                        yield doctor
+                    doctor = DbDoctorRecord(
+                        id=row[0],
+                        districtId=row[1],
+                        lpuId=row[2],
+                        specialtyId=row[3],
+                        doctorId=row[4],
+                    )
+                doctor.pinging_users.append(DbUserRecord(id=row[5], limit_days=row[6]))
+            if doctor is not None:
+                yield doctor
+
+    def get_active_doctors_joined_users(self) -> dict[str, DbDoctorRecord]:
         """
-        self.cursor.execute(q)
-        results = self.cursor.fetchall()
-        result = [
-            (
-                DbDoctor(
-                    id=d[0],
-                    districtId=d[1],
-                    lpuId=d[2],
-                    specialtyId=d[3],
-                    doctorId=d[4],
-                ),
-                DbUser(
-                    id=d[5],
-                    ping_status=d[6],
-                    doctor_id=d[7],
-                    last_seen=d[8],
-                    limit_days=d[9],
-                ),
-            )
-            for d in results
-        ]
-        d: dict[str, DbDoctorWithUsers] = {}
-        for doctor, user in result:
-            if doctor.id not in d:
-                d[doctor.id] = DbDoctorWithUsers(
-                    id=doctor.id,
-                    districtId=doctor.districtId,
-                    lpuId=doctor.lpuId,
-                    specialtyId=doctor.specialtyId,
-                    doctorId=doctor.doctorId,
-                    pinging_users=[user],
-                )
-            else:
-                d[doctor.id].pinging_users.append(user)
-        return d
+        Возвращает словарь докторов с пингующими их пользовтелями
+        Args:
+            None: None
+        Returns:
+            dict[str, DbDoctorRecord]: словарь докторов с их активными пользователями
+        """
+        return {doctor.id: doctor for doctor in self.iter_active_doctors_joined_users()}
 
     def inactivate_ping_for_old_users(self, inactive_months: int):
         """Отключает проверку у пользователей, которых не было видно больше указанного количества месяцев"""
@@ -451,8 +511,438 @@ class SqliteDb:
         UPDATE users
             SET ping_status = 0
         WHERE
-            users.last_seen < datetime('now', ?)
+            users.ping_status = 1
+            AND users.last_seen < datetime('now', ?)
         ;
         """
         self.cursor.execute(q, (f"-{inactive_months} months",))
         self.connection.commit()
+
+    def acquire_checker_shards(
+        self,
+        worker_id: str,
+        shards_count: int,
+        lease_secs: float,
+        now: float,
+    ) -> list[int]:
+        """
+        Продлевает аренду шардов воркера и забирает свободные шарды
+        до равной доли между живыми воркерами. Лишние шарды отпускаются,
+        чтобы их забрали новые воркеры. Шарды упавших воркеров
+        освобождаются, когда истекает их аренда.
+        Args:
+            worker_id: str - id воркера
+            shards_count: int - общее количество шардов
+            lease_secs: float - время аренды в секундах
+            now: float - текущее время (unix timestamp)
+        Returns:
+            list[int]: шарды, арендованные воркером
+        """
+        expires_at = now + lease_secs
+        # IMMEDIATE: два воркера не должны одновременно делить шарды
+        self.cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO checker_workers VALUES (?, ?);",
+                (worker_id, expires_at),
+            )
+            self.cursor.execute(
+                "DELETE FROM checker_workers WHERE expires_at <= ?;", (now,)
+            )
+            self.cursor.execute(
+                "DELETE FROM checker_leases WHERE expires_at <= ? OR shard >= ?;",
+                (now, shards_count),
+            )
+            workers_count = self.cursor.execute(
+                "SELECT COUNT(*) FROM checker_workers;"
+            ).fetchone()[0]
+            fair_share = math.ceil(shards_count / max(workers_count, 1))
+
+            own = [
+                row[0]
+                for row in self.cursor.execute(
+                    "SELECT shard FROM checker_leases WHERE worker_id = ? ORDER BY shard;",
+                    (worker_id,),
+                )
+            ]
+            self.cursor.executemany(
+                "DELETE FROM checker_leases WHERE shard = ?;",
+                [(shard,) for shard in own[fair_share:]],
+            )
+            own = own[:fair_share]
+            taken = {
+                row[0]
+                for row in self.cursor.execute("SELECT shard FROM checker_leases;")
+            }
+            free = [shard for shard in range(shards_count) if shard not in taken]
+            own.extend(free[: fair_share - len(own)])
+            self.cursor.executemany(
+                "INSERT OR REPLACE INTO checker_leases VALUES (?, ?, ?);",
+                [(shard, worker_id, expires_at) for shard in own],
+            )
+            self.connection.commit()
+        except BaseException:
+            # в том числе SystemExit по SIGTERM посреди транзакции
+            self.connection.rollback()
+            raise
+        return sorted(own)
+
+    def release_checker_shards(self, worker_id: str) -> None:
+        """
+        Отпускает все шарды воркера, например при остановке
+        Args:
+            worker_id: str - id воркера
+        Returns:
+            None: None
+        """
+        self.cursor.execute(
+            "DELETE FROM checker_leases WHERE worker_id = ?;", (worker_id,)
+        )
+        self.cursor.execute(
+            "DELETE FROM checker_workers WHERE worker_id = ?;", (worker_id,)
+        )
+        self.connection.commit()
+
+    def __replace_catalog_scope(
+        self,
+        level: str,
+        scope: str,
+        delete_query: str,
+        delete_params: tuple,
+        insert_query: str,
+        rows: list[tuple],
+        now: float,
+    ) -> int:
+        """
+        Заменяет записи одного уровня справочника в scope одной транзакцией
+        и увеличивает версию scope
+        Returns:
+            int: новая версия scope
+        """
+        with self.connection:
+            self.connection.execute(delete_query, delete_params)
+            self.connection.executemany(insert_query, rows)
+            self.connection.execute(
+                """
+                INSERT INTO catalog_sync (level, scope, version, synced_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT (level, scope) DO UPDATE
+                SET version = version + 1, synced_at = excluded.synced_at;
+                """,
+                (level, scope, now),
+            )
+            version = self.connection.execute(
+                "SELECT version FROM catalog_sync WHERE level = ? AND scope = ?;",
+                (level, scope),
+            ).fetchone()[0]
+        return version
+
+    def is_catalog_fresh(self, level: str, scope: str, min_synced_at: float) -> bool:
+        """
+        Есть ли в справочнике записи scope, синхронизированные не раньше min_synced_at
+        Args:
+            level: str - уровень справочника: districts, lpus, specialties, doctors
+            scope: str - родитель записей уровня
+            min_synced_at: float - самое раннее допустимое время синхронизации
+        Returns:
+            bool: можно ли отдавать записи из справочника
+        """
+        q = """
+        SELECT synced_at FROM catalog_sync WHERE level = ? AND scope = ?;
+        """
+        result = self.cursor.execute(q, (level, scope)).fetchone()
+        return result is not None and result[0] >= min_synced_at
+
+    def get_catalog_synced_at(self, level: str) -> dict[str, float]:
+        """
+        Время последней синхронизации каждого scope уровня справочника
+        Args:
+            level: str - уровень справочника
+        Returns:
+            dict[str, float]: {scope: время синхронизации}
+        """
+        q = """SELECT scope, synced_at FROM catalog_sync WHERE level = ?;"""
+        return dict(self.cursor.execute(q, (level,)).fetchall())
+
+    def get_catalog_version(self, level: str, scope: str = "") -> int:
+        """
+        Версия scope уровня справочника, 0 - ещё не синхронизирован
+        """
+        q = """SELECT version FROM catalog_sync WHERE level = ? AND scope = ?;"""
+        result = self.cursor.execute(q, (level, scope)).fetchone()
+        return 0 if result is None else result[0]
+
+    def save_catalog_districts(self, districts: list[ApiDistrict], now: float) -> int:
+        """
+        Заменяет список районов в справочнике
+        Args:
+            districts: list[ApiDistrict] - районы
+            now: float - время синхронизации (unix timestamp)
+        Returns:
+            int: новая версия уровня
+        """
+        return self.__replace_catalog_scope(
+            level="districts",
+            scope="",
+            delete_query="DELETE FROM catalog_districts;",
+            delete_params=(),
+            insert_query="INSERT OR REPLACE INTO catalog_districts VALUES (?, ?);",
+            rows=[(district.id, district.name) for district in districts],
+            now=now,
+        )
+
+    def get_catalog_districts(self) -> list[ApiDistrict]:
+        """Районы из справочника"""
+        q = """SELECT id, name FROM catalog_districts ORDER BY rowid;"""
+        return [
+            ApiDistrict(id=id, name=name)
+            for (id, name) in self.cursor.execute(q).fetchall()
+        ]
+
+    def save_catalog_lpus(self, districtId: str, lpus: list[ApiLPU], now: float) -> int:
+        """
+        Заменяет медучреждения района в справочнике
+        Args:
+            districtId: str - id района
+            lpus: list[ApiLPU] - медучреждения района
+            now: float - время синхронизации (unix timestamp)
+        Returns:
+            int: новая версия scope
+        """
+        return self.__replace_catalog_scope(
+            level="lpus",
+            scope=districtId,
+            delete_query="DELETE FROM catalog_lpus WHERE districtId = ?;",
+            delete_params=(districtId,),
+            insert_query="INSERT OR REPLACE INTO catalog_lpus VALUES (?, ?, ?, ?);",
+            rows=[(lpu.id, districtId, lpu.address, lpu.lpuFullName) for lpu in lpus],
+            now=now,
+        )
+
+    def get_catalog_lpus(self, districtId: str) -> list[ApiLPU]:
+        """Медучреждения района из справочника"""
+        q = """
+        SELECT id, address, lpuFullName FROM catalog_lpus
+        WHERE districtId = ? ORDER BY rowid;
+        """
+        return [
+            ApiLPU(id=id, address=address, lpuFullName=lpuFullName)
+            for (id, address, lpuFullName) in self.cursor.execute(
+                q, (districtId,)
+            ).fetchall()
+        ]
+
+    def get_catalog_lpu(
+        self, lpuId: int, min_synced_at: float
+    ) -> tuple[str, ApiLPU] | None:
+        """
+        Медучреждение из справочника, если его район синхронизирован
+        не раньше min_synced_at
+        Args:
+            lpuId: int - id медучреждения
+            min_synced_at: float - самое раннее допустимое время синхронизации
+        Returns:
+            tuple[str, ApiLPU] | None: id района и медучреждение
+        """
+        q = """
+        SELECT catalog_lpus.districtId, address, lpuFullName
+        FROM catalog_lpus
+        JOIN catalog_sync ON
+            catalog_sync.level = 'lpus'
+            AND catalog_sync.scope = catalog_lpus.districtId
+        WHERE catalog_lpus.id = ? AND catalog_sync.synced_at >= ?;
+        """
+        result = self.cursor.execute(q, (lpuId, min_synced_at)).fetchone()
+        if result is None:
+            return None
+        (districtId, address, lpuFullName) = result
+        return districtId, ApiLPU(id=lpuId, address=address, lpuFullName=lpuFullName)
+
+    def save_catalog_specialties(
+        self, lpuId: int, specialties: list[ApiSpecialty], now: float
+    ) -> int:
+        """
+        Заменяет специальности медучреждения в справочнике
+        Args:
+            lpuId: int - id медучреждения
+            specialties: list[ApiSpecialty] - специальности
+            now: float - время синхронизации (unix timestamp)
+        Returns:
+            int: новая версия scope
+        """
+        rows = [
+            (
+                lpuId,
+                specialty.id,
+                specialty.name,
+                specialty.countFreeParticipant,
+                specialty.countFreeTicket,
+                specialty.lastDate and specialty.lastDate.isoformat(),
+                specialty.nearestDate and specialty.nearestDate.isoformat(),
+            )
+            for specialty in specialties
+        ]
+        return self.__replace_catalog_scope(
+            level="specialties",
+            scope=str(lpuId),
+            delete_query="DELETE FROM catalog_specialties WHERE lpuId = ?;",
+            delete_params=(lpuId,),
+            insert_query="""
+            INSERT OR REPLACE INTO catalog_specialties VALUES (?, ?, ?, ?, ?, ?, ?);
+            """,
+            rows=rows,
+            now=now,
+        )
+
+    def get_catalog_specialties(self, lpuId: int) -> list[ApiSpecialty]:
+        """Специальности медучреждения из справочника"""
+        q = """
+        SELECT id, name, countFreeParticipant, countFreeTicket, lastDate, nearestDate
+        FROM catalog_specialties
+        WHERE lpuId = ? ORDER BY rowid;
+        """
+        return [
+            ApiSpecialty(
+                id=d[0],
+                name=d[1],
+                countFreeParticipant=d[2],
+                countFreeTicket=d[3],
+                lastDate=d[4],
+                nearestDate=d[5],
+            )
+            for d in self.cursor.execute(q, (lpuId,)).fetchall()
+        ]
+
+    def save_catalog_doctors(
+        self, lpuId: int, specialtyId: str, doctors: list[ApiDoctor], now: float
+    ) -> int:
+        """
+        Заменяет врачей специальности медучреждения в справочнике
+        Args:
+            lpuId: int - id медучреждения
+            specialtyId: str - id специальности
+            doctors: list[ApiDoctor] - врачи
+            now: float - время синхронизации (unix timestamp)
+        Returns:
+            int: новая версия scope
+        """
+        rows = [
+            (
+                lpuId,
+                specialtyId,
+                doctor.id,
+                doctor.name,
+                doctor.freeParticipantCount,
+                doctor.freeTicketCount,
+                doctor.lastDate and doctor.lastDate.isoformat(),
+                doctor.nearestDate and doctor.nearestDate.isoformat(),
+                doctor.ariaNumber,
+            )
+            for doctor in doctors
+        ]
+        return self.__replace_catalog_scope(
+            level="doctors",
+            scope=f"{lpuId}/{specialtyId}",
+            delete_query="""
+            DELETE FROM catalog_doctors WHERE lpuId = ? AND specialtyId = ?;
+            """,
+            delete_params=(lpuId, specialtyId),
+            insert_query="""
+            INSERT OR REPLACE INTO catalog_doctors
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            rows=rows,
+            now=now,
+        )
+
+    def get_catalog_doctors(self, lpuId: int, specialtyId: str) -> list[ApiDoctor]:
+        """Врачи специальности медучреждения из справочника"""
+        q = """
+        SELECT
+            id,
+            name,
+            freeParticipantCount,
+            freeTicketCount,
+            lastDate,
+            nearestDate,
+            ariaNumber
+        FROM catalog_doctors
+        WHERE lpuId = ? AND specialtyId = ? ORDER BY rowid;
+        """
+        return [
+            ApiDoctor(
+                id=d[0],
+                name=d[1],
+                freeParticipantCount=d[2],
+                freeTicketCount=d[3],
+                lastDate=d[4],
+                nearestDate=d[5],
+                ariaNumber=d[6],
+            )
+            for d in self.cursor.execute(q, (lpuId, specialtyId)).fetchall()
+        ]
+
+    def get_catalog_lpu_doctors(self, lpuId: int) -> list[DbDoctorToCreate]:
+        """
+        Все врачи медучреждения из справочника с районом медучреждения
+        Args:
+            lpuId: int - id медучреждения
+        Returns:
+            list[DbDoctorToCreate]: врачи
+        """
+        q = """
+        SELECT catalog_lpus.districtId, catalog_doctors.specialtyId, catalog_doctors.id
+        FROM catalog_doctors
+        JOIN catalog_lpus ON catalog_lpus.id = catalog_doctors.lpuId
+        WHERE catalog_doctors.lpuId = ?;
+        """
+        return [
+            DbDoctorToCreate(
+                districtId=d[0], lpuId=lpuId, specialtyId=d[1], doctorId=d[2]
+            )
+            for d in self.cursor.execute(q, (lpuId,)).fetchall()
+        ]
+
+    def search_catalog_doctors(self, match: str, limit: int) -> list[CatalogDoctor]:
+        """
+        Поиск врачей в справочнике по полнотекстовому индексу.
+        Результаты отсортированы по rank до LIMIT: bm25 с весом ФИО врача
+        в 10 раз больше, чем специальности и медучреждения,
+        поэтому врачи, найденные по фамилии, идут первыми
+        Args:
+            match: str - запрос fts5, например '"иван" "терапевт"'
+            limit: int - максимум результатов
+        Returns:
+            list[CatalogDoctor]: найденные врачи
+        """
+        q = """
+        SELECT
+            catalog_lpus.districtId,
+            catalog_doctors.lpuId,
+            catalog_doctors.specialtyId,
+            catalog_doctors.id,
+            catalog_doctors.name,
+            catalog_specialties.name,
+            catalog_lpus.lpuFullName
+        FROM catalog_search
+        JOIN catalog_doctors ON catalog_doctors.rowid = catalog_search.rowid
+        JOIN catalog_lpus ON catalog_lpus.id = catalog_doctors.lpuId
+        LEFT JOIN catalog_specialties ON
+            catalog_specialties.lpuId = catalog_doctors.lpuId
+            AND catalog_specialties.id = catalog_doctors.specialtyId
+        WHERE catalog_search MATCH ? AND rank MATCH 'bm25(10.0, 1.0, 1.0)'
+        ORDER BY rank
+        LIMIT ?;
+        """
+        return [
+            CatalogDoctor(
+                districtId=d[0],
+                lpuId=d[1],
+                specialtyId=d[2],
+                doctorId=d[3],
+                doctorName=d[4],
+                specialtyName=d[5],
+                lpuFullName=d[6],
+            )
+            for d in self.cursor.execute(q, (match, limit)).fetchall()
+        ]
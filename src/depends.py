@@ -1,4 +1,6 @@
 from config import Config
+from core.catalog import CatalogMirror
 from db.sqlite_db import SqliteDb
 
 sqlite_db = SqliteDb(db_path=Config.DB_FILE)
+catalog = CatalogMirror(db=sqlite_db, max_age_secs=Config.CATALOG_MAX_AGE_SECS)
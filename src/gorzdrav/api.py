@@ -1,15 +1,23 @@
 import time
+from collections.abc import Iterator
 from typing import Any
 
 import requests
 
 from config import Config
+from core.metrics import registry
+from core.profiling import phase_timer
+from core.rate_limiter import AdaptiveRateLimiter
 from gorzdrav import exceptions
+from gorzdrav.cache import GorzdravCache
+from gorzdrav.circuit_breaker import CircuitBreaker
 
 from .models import (
     ApiAppointment,
+    ApiAppointmentRecord,
     ApiDistrict,
     ApiDoctor,
+    ApiDoctorRecord,
     ApiLPU,
     ApiResponse,
     ApiSpecialty,
@@ -17,6 +25,8 @@ from .models import (
     Doctor,
 )
 from gorzdrav.endpoint import GorzdravEndpoint
+from gorzdrav.parsing import ResponseParser, ResultStream
+from gorzdrav.session import GorzdravSession
 
 
 class Gorzdrav:
@@ -25,6 +35,37 @@ class Gorzdrav:
     """
 
     __headers = Config.HEADERS
+    rate_limiter = AdaptiveRateLimiter(
+        initial_rate=Config.GORZDRAV_RATE_PER_SEC,
+        min_rate=Config.GORZDRAV_RATE_MIN_PER_SEC,
+        max_rate=Config.GORZDRAV_RATE_MAX_PER_SEC,
+        capacity=Config.GORZDRAV_RATE_BURST,
+        global_rate=Config.GORZDRAV_RATE_GLOBAL_PER_SEC,
+    )
+    cache = GorzdravCache(
+        maxsize=Config.GORZDRAV_CACHE_MAXSIZE,
+        disk_path=Config.GORZDRAV_CACHE_FILE or None,
+    )
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=Config.GORZDRAV_BREAKER_FAILURES,
+        base_cooloff_secs=Config.GORZDRAV_BREAKER_COOLOFF_SECS,
+        max_cooloff_secs=Config.GORZDRAV_BREAKER_MAX_COOLOFF_SECS,
+    )
+    request_duration = registry.histogram(
+        "gorzdrav_request_duration_seconds",
+        "Длительность запросов к горздраву",
+        labels=("endpoint",),
+    )
+    requests_total = registry.counter(
+        "gorzdrav_requests_total",
+        "Запросы к горздраву: ok, error - ответ с errorCode, failure - нет ответа",
+        labels=("endpoint", "outcome"),
+    )
+    errors_total = registry.counter(
+        "gorzdrav_errors_total",
+        "Ответы горздрава с ошибкой по errorCode",
+        labels=("error_code",),
+    )
 
     @staticmethod
     def generate_link(
@@ -38,26 +79,292 @@ class Gorzdrav:
         addon = f"""%5B%7B%22district%22:%22{districtId}%22%7D,%7B%22lpu%22:%22{lpuId}%22%7D,%7B%22speciality%22:%22{specialtyId}%22%7D,%7B%22schedule%22:%22{scheduleId}%22%7D,%7B%22doctor%22:%22{scheduleId}%22%7D%5D"""
         return base_link + addon
 
+    @staticmethod
+    def get_limiter_key(family: str, lpuId: int | None = None) -> str:
+        """
+        Ключ ограничителя запросов: группа эндпоинтов и медучреждение
+        Args:
+            family: str: группа эндпоинтов (shared, schedule)
+            lpuId: int | None: id медучреждения
+        Returns:
+            str: ключ ограничителя
+        """
+        if lpuId is None:
+            return family
+        return f"{family}/{lpuId}"
+
     @classmethod
-    def __get_result(cls, url: str, sleep_time: float = 1.0) -> Any:
+    def __get_result(
+        cls,
+        url: str,
+        family: str,
+        result_type: Any,
+        lpuId: int | None = None,
+        cache_ttl: float | None = None,
+    ) -> Any:
         """
-        Возвращает содержимое поля `result` в json после запроса по url
+        Возвращает содержимое поля `result` после запроса по url,
+        разобранное сразу в result_type
         Args:
             url: str: url для запроса
-            sleep_time: float: задержка перед запросом
+            family: str: группа эндпоинтов для ограничителя частоты запросов
+            result_type: Any: тип результата, например list[ApiDoctor]
+            lpuId: int | None: id медучреждения, к которому относится запрос
+            cache_ttl: float | None: сколько секунд хранить ответ в кэше,
+                None - не использовать кэш
         Returns:
             Any: результат
         Raises:
+            CircuitOpenException: если медучреждение временно не опрашивается
             HttpError: если произошла ошибка запроса
-            Exception: если не удалось преобразовать в json
+            Exception: если ответ не соответствует result_type
             GorzdravExceptionBase: если `success` в json = False
         """
-        if sleep_time > 0.05:
-            time.sleep(sleep_time)
-        response = requests.get(url, headers=cls.__headers)
-        response.raise_for_status()
-        response_json = response.json()
-        api_response: ApiResponse = ApiResponse(**response_json)
+        if cache_ttl is not None:
+            # ответ из кэша не требует ни запроса, ни ожидания очереди.
+            # в кэше лежит тело ответа, записи старого формата пропускаются
+            cached_body = cls.cache.get(url)
+            if isinstance(cached_body, str):
+                with phase_timer.phase("parsing"):
+                    api_response = ResponseParser.parse(cached_body, result_type)
+                return cls.get_result_from_response(api_response, url=url)
+        limiter_key = cls.get_limiter_key(family=family, lpuId=lpuId)
+        cls.check_circuit(lpuId=lpuId, url=url)
+        try:
+            cls.rate_limiter.acquire(limiter_key)
+        except BaseException:
+            cls.feedback_abort(lpuId=lpuId)
+            raise
+        session = GorzdravSession.get_session()
+        started_at = time.monotonic()
+        outcome = "failure"
+        try:
+            with phase_timer.phase("api_fetch"):
+                response = session.get(
+                    url,
+                    headers=cls.__headers,
+                    timeout=Config.GORZDRAV_TIMEOUT_SECS,
+                )
+            if response.status_code in exceptions.THROTTLE_HTTP_CODES:
+                cls.rate_limiter.on_throttle(limiter_key)
+            response.raise_for_status()
+            with phase_timer.phase("parsing"):
+                api_response = ResponseParser.parse(response.content, result_type)
+                result = cls.get_result_from_response(api_response, url=url)
+            outcome = "ok"
+        except exceptions.GorzdravExceptionBase as e:
+            outcome = "error"
+            cls.feedback_error(limiter_key=limiter_key, lpuId=lpuId, error=e)
+            raise
+        except (requests.ConnectionError, requests.Timeout):
+            cls.feedback_failure(limiter_key=limiter_key, lpuId=lpuId, throttle=True)
+            raise
+        except Exception:
+            cls.feedback_failure(limiter_key=limiter_key, lpuId=lpuId, throttle=False)
+            raise
+        except BaseException:
+            # KeyboardInterrupt и т.п.: ответа не было
+            cls.feedback_abort(lpuId=lpuId)
+            raise
+        finally:
+            cls.observe_request(
+                url=url, duration=time.monotonic() - started_at, outcome=outcome
+            )
+        cls.feedback_success(limiter_key=limiter_key, lpuId=lpuId)
+        if cache_ttl is not None:
+            cls.cache.set(url, response.text, ttl=cache_ttl)
+        return result
+
+    @classmethod
+    def __iter_result(
+        cls,
+        url: str,
+        family: str,
+        item_type: Any,
+        lpuId: int | None = None,
+        cache_ttl: float | None = None,
+    ) -> Iterator[Any]:
+        """
+        Потоковый вариант __get_result для ответов, в которых result - массив:
+        элементы разбираются по мере чтения тела ответа и отдаются по одному
+        Args:
+            url: str: url для запроса
+            family: str: группа эндпоинтов для ограничителя частоты запросов
+            item_type: Any: тип элемента массива, например ApiLPU
+            lpuId: int | None: id медучреждения, к которому относится запрос
+            cache_ttl: float | None: сколько секунд хранить ответ в кэше,
+                None - не использовать кэш и не держать тело ответа в памяти
+        Yields:
+            Any: элементы result
+        Raises:
+            те же исключения, что и __get_result.
+            GorzdravExceptionBase поднимается после разбора всего тела
+        """
+        if cache_ttl is not None:
+            cached_body = cls.cache.get(url)
+            if isinstance(cached_body, str):
+                stream = ResultStream([cached_body.encode()], item_type)
+                yield from stream
+                cls.get_result_from_response(stream.get_response(), url=url)
+                return
+        limiter_key = cls.get_limiter_key(family=family, lpuId=lpuId)
+        cls.check_circuit(lpuId=lpuId, url=url)
+        try:
+            cls.rate_limiter.acquire(limiter_key)
+        except BaseException:
+            cls.feedback_abort(lpuId=lpuId)
+            raise
+        session = GorzdravSession.get_session()
+        started_at = time.monotonic()
+        outcome = "failure"
+        body: list[bytes] = []
+        try:
+            with session.get(
+                url,
+                headers=cls.__headers,
+                timeout=Config.GORZDRAV_TIMEOUT_SECS,
+                stream=True,
+            ) as response:
+                if response.status_code in exceptions.THROTTLE_HTTP_CODES:
+                    cls.rate_limiter.on_throttle(limiter_key)
+                response.raise_for_status()
+                chunks = response.iter_content(
+                    chunk_size=Config.GORZDRAV_STREAM_CHUNK_SIZE
+                )
+                if cache_ttl is not None:
+                    chunks = cls.__collect_chunks(chunks, body)
+                stream = ResultStream(chunks, item_type)
+                yield from stream
+                cls.get_result_from_response(stream.get_response(), url=url)
+            outcome = "ok"
+        except GeneratorExit:
+            # потребитель остановился раньше, ответ не дочитан
+            outcome = "ok"
+            cls.feedback_abort(lpuId=lpuId)
+            raise
+        except exceptions.GorzdravExceptionBase as e:
+            outcome = "error"
+            cls.feedback_error(limiter_key=limiter_key, lpuId=lpuId, error=e)
+            raise
+        except (requests.ConnectionError, requests.Timeout):
+            cls.feedback_failure(limiter_key=limiter_key, lpuId=lpuId, throttle=True)
+            raise
+        except Exception:
+            cls.feedback_failure(limiter_key=limiter_key, lpuId=lpuId, throttle=False)
+            raise
+        except BaseException:
+            # KeyboardInterrupt и т.п.: ответа не было
+            cls.feedback_abort(lpuId=lpuId)
+            raise
+        finally:
+            cls.observe_request(
+                url=url, duration=time.monotonic() - started_at, outcome=outcome
+            )
+        cls.feedback_success(limiter_key=limiter_key, lpuId=lpuId)
+        if cache_ttl is not None:
+            cls.cache.set(url, b"".join(body).decode(), ttl=cache_ttl)
+
+    @staticmethod
+    def __collect_chunks(chunks: Iterator[bytes], body: list[bytes]) -> Iterator[bytes]:
+        """Отдаёт куски тела дальше, сохраняя их в body для записи в кэш"""
+        for chunk in chunks:
+            body.append(chunk)
+            yield chunk
+
+    @classmethod
+    def invalidate_cache(cls, url_prefix: str | None = None) -> int:
+        """
+        Удаляет из кэша ответы горздрава
+        Args:
+            url_prefix: str | None: начало url эндпоинта, None - очистить весь кэш
+        Returns:
+            int: количество удалённых записей
+        """
+        return cls.cache.invalidate(prefix=url_prefix)
+
+    @classmethod
+    def observe_request(cls, url: str, duration: float, outcome: str) -> None:
+        """
+        Записывает длительность и исход запроса в метрики
+        Args:
+            url: str: url запроса
+            duration: float: длительность в секундах
+            outcome: str: ok, error или failure
+        """
+        endpoint = GorzdravEndpoint.get_endpoint_label(url)
+        cls.request_duration.observe(duration, endpoint=endpoint)
+        cls.requests_total.inc(endpoint=endpoint, outcome=outcome)
+
+    @classmethod
+    def check_circuit(cls, lpuId: int | None, url: str | None = None) -> None:
+        """
+        Проверяет, можно ли сейчас обращаться к медучреждению
+        Raises:
+            CircuitOpenException: если предохранитель медучреждения разомкнут
+        """
+        if lpuId is None:
+            return
+        if not cls.circuit_breaker.allow(lpuId):
+            raise exceptions.CircuitOpenException(lpuId=lpuId, url=url)
+
+    @classmethod
+    def feedback_success(cls, limiter_key: str, lpuId: int | None) -> None:
+        """Горздрав ответил, запросы можно ускорять"""
+        cls.rate_limiter.on_success(limiter_key)
+        if lpuId is not None:
+            cls.circuit_breaker.on_success(lpuId)
+
+    @classmethod
+    def feedback_abort(cls, lpuId: int | None) -> None:
+        """Запрос прерван до ответа горздрава: освобождаем пробный запрос"""
+        if lpuId is not None:
+            cls.circuit_breaker.on_abort(lpuId)
+
+    @classmethod
+    def feedback_failure(
+        cls, limiter_key: str, lpuId: int | None, throttle: bool
+    ) -> None:
+        """Горздрав не ответил: считаем ошибку медучреждения и замедляем запросы"""
+        if throttle:
+            cls.rate_limiter.on_throttle(limiter_key)
+        if lpuId is not None:
+            cls.circuit_breaker.on_failure(lpuId)
+
+    @classmethod
+    def feedback_error(
+        cls,
+        limiter_key: str,
+        lpuId: int | None,
+        error: exceptions.GorzdravExceptionBase,
+    ) -> None:
+        """
+        Сообщает ограничителю и предохранителю об ответе горздрава с ошибкой.
+        Ошибки вида "медорганизация не ответила" замедляют запросы
+        и считаются отказом медучреждения,
+        остальные ошибки считаются обычным ответом.
+        """
+        cls.errors_total.inc(error_code=error.errorCode)
+        if error.errorCode in exceptions.UNAVAILABLE_ERROR_CODES:
+            cls.feedback_failure(
+                limiter_key=limiter_key,
+                lpuId=lpuId,
+                throttle=error.errorCode in exceptions.THROTTLE_ERROR_CODES,
+            )
+        else:
+            cls.feedback_success(limiter_key=limiter_key, lpuId=lpuId)
+
+    @staticmethod
+    def get_result_from_response(api_response: ApiResponse, url: str) -> Any:
+        """
+        Возвращает содержимое поля `result` из ответа горздрава
+        Args:
+            api_response: ApiResponse: разобранный ответ горздрава
+            url: str: url, по которому был получен ответ
+        Returns:
+            Any: результат
+        Raises:
+            GorzdravExceptionBase: если `success` в ответе = False
+        """
         if not api_response.success:
             response_message = api_response.message or "Неизвестное сообщение об ошибке"
             raise exceptions.GorzdravException(
@@ -67,19 +374,18 @@ class Gorzdrav:
             )
         return api_response.result
 
-    @staticmethod
-    def __parse_list_in_result(objects: list[Any], model: Any) -> list[Any]:
-        objects = [model(**result) for result in objects]
-        return objects
-
     @classmethod
     def get_districts(cls) -> list[ApiDistrict]:
         """
         Список районов города
         """
         url = GorzdravEndpoint.get_districts_endpoint()
-        result = cls.__get_result(url)
-        districts = cls.__parse_list_in_result(result, ApiDistrict)
+        districts: list[ApiDistrict] = cls.__get_result(
+            url,
+            family="shared",
+            result_type=list[ApiDistrict],
+            cache_ttl=Config.GORZDRAV_CACHE_TTL_DISTRICTS_SECS,
+        )
         return districts
 
     @classmethod
@@ -89,10 +395,37 @@ class Gorzdrav:
         Если ид района не указан то получаем медучреждения во всех районах
         """
         url = GorzdravEndpoint.get_lpus_endpoint(districtId)
-        result = cls.__get_result(url)
-        lpus = cls.__parse_list_in_result(result, ApiLPU)
+        lpus: list[ApiLPU] = cls.__get_result(
+            url,
+            family="shared",
+            result_type=list[ApiLPU],
+            cache_ttl=Config.GORZDRAV_CACHE_TTL_LPUS_SECS,
+        )
         return lpus
 
+    @classmethod
+    def iter_lpus(
+        cls, districtId: str | None = None, use_cache: bool = True
+    ) -> Iterator[ApiLPU]:
+        """
+        Медучреждения по одному, по мере чтения ответа горздрава.
+        Список всех медучреждений города целиком в памяти не собирается
+        Args:
+            districtId: str | None: id района, None - медучреждения всех районов
+            use_cache: bool: брать ответ из кэша и сохранять его туда,
+                False - тело ответа не держится в памяти целиком
+        Yields:
+            ApiLPU: медучреждение
+        """
+        url = GorzdravEndpoint.get_lpus_endpoint(districtId)
+        cache_ttl = Config.GORZDRAV_CACHE_TTL_LPUS_SECS if use_cache else None
+        yield from cls.__iter_result(
+            url,
+            family="shared",
+            item_type=ApiLPU,
+            cache_ttl=cache_ttl,
+        )
+
     @classmethod
     def get_lpu(cls, lpuId: int) -> ApiLPU:
         """
@@ -103,25 +436,36 @@ class Gorzdrav:
             ApiLPU: информация о медучреждении
         """
         url = GorzdravEndpoint.get_lpu_endpoint(lpuId=lpuId)
-        result = cls.__get_result(url=url)
-        lpu = ApiLPU(**result)
+        lpu: ApiLPU = cls.__get_result(
+            url=url,
+            family="shared",
+            result_type=ApiLPU,
+            cache_ttl=Config.GORZDRAV_CACHE_TTL_LPUS_SECS,
+        )
         return lpu
 
     @classmethod
-    def get_specialties(cls, lpuId: int) -> list[ApiSpecialty]:
+    def get_specialties(cls, lpuId: int, use_cache: bool = True) -> list[ApiSpecialty]:
         """
         Список всех специальностей в медучреждении
         Args:
             lpuId: int: id медучреждения
+            use_cache: bool: можно ли взять список из кэша
         Returns:
             list[ApiSpecialty]: список специальностей
         """
         url = GorzdravEndpoint.get_specialties_endpoint(lpuId=lpuId)
+        cache_ttl = Config.GORZDRAV_CACHE_TTL_SPECIALTIES_SECS if use_cache else None
         try:
-            result = cls.__get_result(url)
+            specialties: list[ApiSpecialty] = cls.__get_result(
+                url,
+                family="schedule",
+                result_type=list[ApiSpecialty],
+                lpuId=lpuId,
+                cache_ttl=cache_ttl,
+            )
         except exceptions.NoSpecialtiesException:
             return []
-        specialties = cls.__parse_list_in_result(result, ApiSpecialty)
         return specialties
 
     @classmethod
@@ -138,10 +482,11 @@ class Gorzdrav:
             lpuId=lpuId, specialtyId=specialtyId
         )
         try:
-            result = cls.__get_result(url)
+            doctors: list[ApiDoctor] = cls.__get_result(
+                url, family="schedule", result_type=list[ApiDoctor], lpuId=lpuId
+            )
         except exceptions.NoDoctorsException:
             return []
-        doctors = cls.__parse_list_in_result(result, ApiDoctor)
         return doctors
 
     @classmethod
@@ -162,18 +507,54 @@ class Gorzdrav:
         Returns:
             Doctor | None: врач если найден
         """
+        doctors = cls.get_doctors_index(lpuId=lpuId, specialtyId=specialtyId)
+        doctor = doctors.get(doctorId)
+        if doctor is None:
+            return None
+        return Doctor(
+            **doctor.model_dump(),
+            districtId=districtId,
+            lpuId=lpuId,
+            specialtyId=specialtyId,
+        )
+
+    @classmethod
+    def get_doctors_index(cls, lpuId: int, specialtyId: str) -> dict[str, ApiDoctor]:
+        """
+        Врачи медучреждения по специальности, проиндексированные по id врача.
+        Позволяет за один запрос к горздраву найти сразу несколько врачей.
+        Args:
+            lpuId: int: id медучреждения по горздраву
+            specialtyId: str: id специальности по горздраву
+        Returns:
+            dict[str, ApiDoctor]: словарь {id врача: врач}
+        """
         doctors: list[ApiDoctor] = cls.get_doctors(lpuId=lpuId, specialtyId=specialtyId)
-        for doctor in doctors:
-            if doctor.id == doctorId:
-                doc = Doctor(
-                    **doctor.model_dump(),
-                    districtId=districtId,
-                    lpuId=lpuId,
-                    specialtyId=specialtyId,
-                )
+        return {doctor.id: doctor for doctor in doctors}
 
-                return doc
-        return None
+    @classmethod
+    def get_doctor_records_index(
+        cls, lpuId: int, specialtyId: str
+    ) -> dict[str, ApiDoctorRecord]:
+        """
+        Облегчённый get_doctors_index для чекера:
+        врачи разбираются в ApiDoctorRecord без лишних полей
+        Args:
+            lpuId: int: id медучреждения по горздраву
+            specialtyId: str: id специальности по горздраву
+        Returns:
+            dict[str, ApiDoctorRecord]: словарь {id врача: врач}
+        """
+        url = GorzdravEndpoint.get_doctors_endpoint(
+            lpuId=lpuId, specialtyId=specialtyId
+        )
+        try:
+            doctors: list[ApiDoctorRecord] = cls.__get_result(
+                url, family="schedule", result_type=list[ApiDoctorRecord], lpuId=lpuId
+            )
+        except exceptions.NoDoctorsException:
+            return {}
+        return {doctor.id: doctor for doctor in doctors}
 
     @classmethod
     def get_timetables(cls, lpu_id: int, doctor_id: str) -> list[ApiTimetable]:
@@ -186,9 +567,8 @@ class Gorzdrav:
             list[ApiTimetable]: список расписаний.
         """
         url = GorzdravEndpoint.get_timetable_endpoint(lpuId=lpu_id, doctorId=doctor_id)
-        result = cls.__get_result(url)
-        timetables: list[ApiTimetable] = cls.__parse_list_in_result(
-            objects=result, model=ApiTimetable
+        timetables: list[ApiTimetable] = cls.__get_result(
+            url, family="schedule", result_type=list[ApiTimetable], lpuId=lpu_id
         )
         return timetables
 
@@ -202,10 +582,33 @@ class Gorzdrav:
             lpuId=lpuId, doctorId=doctorId
         )
         try:
-            result = cls.__get_result(url)
+            appointments: list[ApiAppointment] = cls.__get_result(
+                url, family="schedule", result_type=list[ApiAppointment], lpuId=lpuId
+            )
+        except exceptions.NoTicketsException:
+            return []
+        return appointments
+
+    @classmethod
+    def get_appointment_records(
+        cls, lpuId: int, doctorId: str
+    ) -> list[ApiAppointmentRecord]:
+        """
+        Облегчённый get_appointments для чекера: только id и время приёма
+        Args:
+            lpuId: int: id медучреждения по горздраву
+            doctorId: str: id врача
+        Returns:
+            list[ApiAppointmentRecord]: список назначений
+        """
+        url = GorzdravEndpoint.get_appointments_endpoint(lpuId=lpuId, doctorId=doctorId)
+        try:
+            appointments: list[ApiAppointmentRecord] = cls.__get_result(
+                url,
+                family="schedule",
+                result_type=list[ApiAppointmentRecord],
+                lpuId=lpuId,
+            )
         except exceptions.NoTicketsException:
             return []
-        appointments: list[ApiAppointment] = cls.__parse_list_in_result(
-            objects=result, model=ApiAppointment
-        )
         return appointments
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from typing import Any
+
+import aiohttp
+
+from config import Config
+from core.profiling import phase_timer
+from gorzdrav import exceptions
+from gorzdrav.api import Gorzdrav
+from gorzdrav.endpoint import GorzdravEndpoint
+from gorzdrav.parsing import ResponseParser
+
+from .models import ApiAppointmentRecord, ApiDoctorRecord, ApiSpecialty
+
+
+class AsyncGorzdrav:
+    """
+    Асинхронный клиент API Gorzdrav.spb.ru для чекера.
+    Ограничивает количество одновременных запросов глобально
+    и отдельно для каждого медучреждения, чтобы разные поликлиники
+    опрашивались параллельно, а одна поликлиника не перегружалась.
+    """
+
+    __headers = Config.HEADERS
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        max_concurrency: int = Config.CHECKER_MAX_CONCURRENCY,
+        max_concurrency_per_lpu: int = Config.CHECKER_MAX_CONCURRENCY_PER_LPU,
+    ):
+        self.session = session
+        self.max_concurrency_per_lpu = max_concurrency_per_lpu
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        self.__lpu_semaphores: dict[int, asyncio.Semaphore] = {}
+
+    def __get_lpu_semaphore(self, lpuId: int) -> asyncio.Semaphore:
+        semaphore = self.__lpu_semaphores.get(lpuId)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency_per_lpu)
+            self.__lpu_semaphores[lpuId] = semaphore
+        return semaphore
+
+    async def __get_result(self, url: str, lpuId: int, result_type: Any) -> Any:
+        """
+        Возвращает содержимое поля `result` после запроса по url,
+        разобранное сразу в result_type
+        Args:
+            url: str: url для запроса
+            lpuId: int: id медучреждения, к которому относится запрос
+            result_type: Any: тип результата, например list[ApiDoctor]
+        Returns:
+            Any: результат
+        Raises:
+            CircuitOpenException: если медучреждение временно не опрашивается
+            aiohttp.ClientResponseError: если произошла ошибка запроса
+            GorzdravExceptionBase: если `success` в json = False
+        """
+        limiter_key = Gorzdrav.get_limiter_key("schedule", lpuId=lpuId)
+        async with self.__get_lpu_semaphore(lpuId):
+            Gorzdrav.check_circuit(lpuId=lpuId, url=url)
+            try:
+                await Gorzdrav.rate_limiter.acquire_async(limiter_key)
+                async with self.__semaphore:
+                    started_at = time.monotonic()
+                    outcome = "failure"
+                    try:
+                        with phase_timer.phase("api_fetch"):
+                            async with self.session.get(
+                                url, headers=self.__headers
+                            ) as response:
+                                if response.status in exceptions.THROTTLE_HTTP_CODES:
+                                    Gorzdrav.rate_limiter.on_throttle(limiter_key)
+                                response.raise_for_status()
+                                response_body = await response.read()
+                        with phase_timer.phase("parsing"):
+                            api_response = ResponseParser.parse(
+                                response_body, result_type
+                            )
+                            result = Gorzdrav.get_result_from_response(
+                                api_response, url=url
+                            )
+                        outcome = "ok"
+                    except exceptions.GorzdravExceptionBase as e:
+                        outcome = "error"
+                        Gorzdrav.feedback_error(
+                            limiter_key=limiter_key, lpuId=lpuId, error=e
+                        )
+                        raise
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                        Gorzdrav.feedback_failure(
+                            limiter_key=limiter_key, lpuId=lpuId, throttle=True
+                        )
+                        raise
+                    except Exception:
+                        Gorzdrav.feedback_failure(
+                            limiter_key=limiter_key, lpuId=lpuId, throttle=False
+                        )
+                        raise
+                    finally:
+                        Gorzdrav.observe_request(
+                            url=url,
+                            duration=time.monotonic() - started_at,
+                            outcome=outcome,
+                        )
+            except BaseException:
+                # задачу отменили в очереди или во время запроса, ответа нет:
+                # пробный запрос предохранителя освобождается
+                Gorzdrav.feedback_abort(lpuId=lpuId)
+                raise
+        Gorzdrav.feedback_success(limiter_key=limiter_key, lpuId=lpuId)
+        return result
+
+    async def get_specialties(self, lpuId: int) -> list[ApiSpecialty]:
+        """
+        Список всех специальностей в медучреждении
+        Args:
+            lpuId: int: id медучреждения
+        Returns:
+            list[ApiSpecialty]: список специальностей
+        """
+        url = GorzdravEndpoint.get_specialties_endpoint(lpuId=lpuId)
+        try:
+            return await self.__get_result(
+                url, lpuId=lpuId, result_type=list[ApiSpecialty]
+            )
+        except exceptions.NoSpecialtiesException:
+            return []
+
+    async def get_doctor_records_index(
+        self, lpuId: int, specialtyId: str
+    ) -> dict[str, ApiDoctorRecord]:
+        """
+        Врачи медучреждения по специальности для чекера,
+        проиндексированные по id врача: только поля, нужные для проверки
+        Args:
+            lpuId: int: id медучреждения по горздраву
+            specialtyId: str: id специальности по горздраву
+        Returns:
+            dict[str, ApiDoctorRecord]: словарь {id врача: врач}
+        """
+        url = GorzdravEndpoint.get_doctors_endpoint(
+            lpuId=lpuId, specialtyId=specialtyId
+        )
+        try:
+            doctors: list[ApiDoctorRecord] = await self.__get_result(
+                url, lpuId=lpuId, result_type=list[ApiDoctorRecord]
+            )
+        except exceptions.NoDoctorsException:
+            return {}
+        return {doctor.id: doctor for doctor in doctors}
+
+    async def get_appointment_records(
+        self, lpuId: int, doctorId: str
+    ) -> list[ApiAppointmentRecord]:
+        """
+        Доступные назначения к врачу для чекера: только id и время приёма
+        Args:
+            lpuId: int: id медучреждения по горздраву
+            doctorId: str: id врача
+        Returns:
+            list[ApiAppointmentRecord]: список назначений
+        """
+        url = GorzdravEndpoint.get_appointments_endpoint(lpuId=lpuId, doctorId=doctorId)
+        try:
+            return await self.__get_result(
+                url, lpuId=lpuId, result_type=list[ApiAppointmentRecord]
+            )
+        except exceptions.NoTicketsException:
+            return []
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMiss:
+    """Маркер отсутствия значения в кэше (None тоже может быть значением)"""
+
+
+MISS = CacheMiss()
+
+
+class MemoryCache:
+    """
+    LRU кэш в памяти с временем жизни записей.
+    При переполнении вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.clock = clock
+        self.evictions = 0
+        self.__data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Значение по ключу или MISS"""
+        with self.__lock:
+            item = self.__data.get(key)
+            if item is None:
+                return MISS
+            expires_at, value = item
+            if expires_at <= self.clock():
+                del self.__data[key]
+                return MISS
+            self.__data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд"""
+        self.set_until(key, value, expires_at=self.clock() + ttl)
+
+    def set_until(self, key: str, value: Any, expires_at: float) -> None:
+        """Сохраняет значение до момента expires_at"""
+        with self.__lock:
+            self.__data[key] = (expires_at, value)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, prefix: str | None = None) -> int:
+        """Удаляет записи, ключ которых начинается с prefix (все, если не задан)"""
+        with self.__lock:
+            if prefix is None:
+                count = len(self.__data)
+                self.__data.clear()
+                return count
+            keys = [key for key in self.__data if key.startswith(prefix)]
+            for key in keys:
+                del self.__data[key]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+
+class DiskCache:
+    """
+    Кэш в файле sqlite, переживает перезапуск бота.
+    Соединение открывается отдельно в каждом процессе.
+    """
+
+    def __init__(self, db_path: str, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.clock = clock
+        self.__connection: sqlite3.Connection | None = None
+        self.__pid: int | None = None
+        self.__lock = threading.Lock()
+
+    def __get_connection(self) -> sqlite3.Connection:
+        if self.__connection is None or self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(
+                database=self.db_path, check_same_thread=False, timeout=5
+            )
+            self.__pid = os.getpid()
+            self.__connection.execute(
+                """CREATE TABLE IF NOT EXISTS gorzdrav_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );"""
+            )
+            self.__connection.commit()
+        return self.__connection
+
+    def get(self, key: str) -> tuple[Any, float | None]:
+        """Значение по ключу и время его устаревания или (MISS, None)"""
+        q = "SELECT value, expires_at FROM gorzdrav_cache WHERE key = ?;"
+        with self.__lock:
+            connection = self.__get_connection()
+            row = connection.execute(q, (key,)).fetchone()
+            if row is None:
+                return MISS, None
+            value, expires_at = row
+            if expires_at <= self.clock():
+                connection.execute("DELETE FROM gorzdrav_cache WHERE key = ?;", (key,))
+                connection.commit()
+                return MISS, None
+        return json.loads(value), expires_at
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд"""
+        q = """
+        INSERT OR REPLACE INTO gorzdrav_cache (key, value, expires_at)
+        VALUES (?, ?, ?);
+        """
+        with self.__lock:
+            connection = self.__get_connection()
+            connection.execute(
+                q, (key, json.dumps(value, ensure_ascii=False), self.clock() + ttl)
+            )
+            connection.commit()
+
+    def invalidate(self, prefix: str | None = None) -> int:
+        """Удаляет записи, ключ которых начинается с prefix (все, если не задан)"""
+        with self.__lock:
+            connection = self.__get_connection()
+            if prefix is None:
+                cursor = connection.execute("DELETE FROM gorzdrav_cache;")
+            else:
+                cursor = connection.execute(
+                    "DELETE FROM gorzdrav_cache WHERE substr(key, 1, ?) = ?;",
+                    (len(prefix), prefix),
+                )
+            connection.commit()
+            return cursor.rowcount
+
+
+class GorzdravCache:
+    """
+    Двухуровневый кэш справочных ответов горздрава:
+    LRU в памяти и необязательный файл на диске.
+    Ключ - url запроса, значение - тело ответа (json строкой) целиком,
+    при чтении из кэша оно разбирается так же, как ответ сервера.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        disk_path: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.memory = MemoryCache(maxsize=maxsize, clock=clock)
+        self.disk = DiskCache(db_path=disk_path, clock=clock) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        """Значение по ключу или MISS"""
+        value = self.memory.get(key)
+        if value is not MISS:
+            self.hits += 1
+            return value
+        if self.disk is not None:
+            try:
+                value, expires_at = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("gorzdrav disk cache error: %s", e)
+                value, expires_at = MISS, None
+            if value is not MISS:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set_until(key, value, expires_at=expires_at)
+                return value
+        self.misses += 1
+        return MISS
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд"""
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, ttl=ttl)
+            except sqlite3.Error as e:
+                logger.warning("gorzdrav disk cache error: %s", e)
+
+    def invalidate(self, prefix: str | None = None) -> int:
+        """
+        Удаляет записи, url которых начинается с prefix
+        Args:
+            prefix: str | None: начало url, None - очистить весь кэш
+        Returns:
+            int: количество удалённых записей в памяти
+        """
+        count = self.memory.invalidate(prefix=prefix)
+        if self.disk is not None:
+            self.disk.invalidate(prefix=prefix)
+        logger.info("gorzdrav cache invalidated: %s, %s entries", prefix, count)
+        return count
+
+    def get_stats(self) -> dict[str, int]:
+        """Счётчики попаданий, промахов и вытеснений"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "size": len(self.memory),
+        }
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from enum import StrEnum
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class LpuCircuit:
+    """Состояние предохранителя одного медучреждения"""
+
+    __slots__ = ("state", "failures", "opened_at", "cooloff", "probe_in_flight")
+
+    def __init__(self):
+        self.state: CircuitState = CircuitState.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.cooloff: float = 0.0
+        self.probe_in_flight: bool = False
+
+
+class CircuitBreaker:
+    """
+    Предохранитель запросов к медучреждениям.
+    После failure_threshold ошибок подряд медучреждение пропускается
+    на время остывания. Затем пропускается один пробный запрос:
+    если он успешен, запросы возобновляются, иначе время остывания удваивается
+    (но не больше max_cooloff_secs).
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        base_cooloff_secs: float,
+        max_cooloff_secs: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be >= 1")
+        self.failure_threshold = failure_threshold
+        self.base_cooloff_secs = base_cooloff_secs
+        self.max_cooloff_secs = max(max_cooloff_secs, base_cooloff_secs)
+        self.clock = clock
+        self.__circuits: dict[int, LpuCircuit] = {}
+        self.__lock = threading.Lock()
+
+    def __get_circuit(self, lpuId: int) -> LpuCircuit:
+        circuit = self.__circuits.get(lpuId)
+        if circuit is None:
+            circuit = self.__circuits.setdefault(lpuId, LpuCircuit())
+        return circuit
+
+    def __set_state(self, lpuId: int, circuit: LpuCircuit, state: CircuitState):
+        if circuit.state == state:
+            return
+        log_level = logging.WARNING if state == CircuitState.OPEN else logging.INFO
+        logger.log(
+            log_level,
+            "lpu %s circuit %s -> %s (failures: %s, cooloff: %.0f s)",
+            lpuId,
+            circuit.state,
+            state,
+            circuit.failures,
+            circuit.cooloff,
+        )
+        circuit.state = state
+
+    def __open(self, lpuId: int, circuit: LpuCircuit):
+        if circuit.cooloff:
+            circuit.cooloff = min(self.max_cooloff_secs, circuit.cooloff * 2)
+        else:
+            circuit.cooloff = self.base_cooloff_secs
+        circuit.opened_at = self.clock()
+        circuit.probe_in_flight = False
+        self.__set_state(lpuId, circuit, CircuitState.OPEN)
+
+    def allow(self, lpuId: int) -> bool:
+        """
+        Можно ли сейчас делать запрос к медучреждению.
+        После остывания первый вызов разрешает пробный запрос.
+        Args:
+            lpuId: int: id медучреждения
+        Returns:
+            bool: True если запрос разрешён
+        """
+        with self.__lock:
+            circuit = self.__get_circuit(lpuId)
+            if circuit.state == CircuitState.CLOSED:
+                return True
+            if circuit.state == CircuitState.OPEN:
+                if self.clock() - circuit.opened_at < circuit.cooloff:
+                    return False
+                self.__set_state(lpuId, circuit, CircuitState.HALF_OPEN)
+            if circuit.probe_in_flight:
+                return False
+            circuit.probe_in_flight = True
+            return True
+
+    def on_success(self, lpuId: int) -> None:
+        """Медучреждение ответило"""
+        with self.__lock:
+            circuit = self.__get_circuit(lpuId)
+            circuit.failures = 0
+            circuit.cooloff = 0.0
+            circuit.probe_in_flight = False
+            self.__set_state(lpuId, circuit, CircuitState.CLOSED)
+
+    def on_failure(self, lpuId: int) -> None:
+        """Медучреждение не ответило"""
+        with self.__lock:
+            circuit = self.__get_circuit(lpuId)
+            circuit.failures += 1
+            if circuit.state == CircuitState.HALF_OPEN:
+                self.__open(lpuId, circuit)
+            elif (
+                circuit.state == CircuitState.CLOSED
+                and circuit.failures >= self.failure_threshold
+            ):
+                self.__open(lpuId, circuit)
+
+    def on_abort(self, lpuId: int) -> None:
+        """
+        Запрос прерван до ответа, например задачу отменили:
+        пробный запрос не состоялся, следующий вызов allow может повторить его
+        """
+        with self.__lock:
+            circuit = self.__get_circuit(lpuId)
+            if circuit.state == CircuitState.HALF_OPEN:
+                circuit.probe_in_flight = False
+
+    def get_state(self, lpuId: int) -> CircuitState:
+        """Текущее состояние предохранителя медучреждения"""
+        circuit = self.__circuits.get(lpuId)
+        return circuit.state if circuit is not None else CircuitState.CLOSED
+
+    def get_states(self) -> dict[int, CircuitState]:
+        """Медучреждения, предохранитель которых сейчас не замкнут"""
+        with self.__lock:
+            return {
+                lpuId: circuit.state
+                for lpuId, circuit in self.__circuits.items()
+                if circuit.state != CircuitState.CLOSED
+            }
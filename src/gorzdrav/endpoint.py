@@ -8,6 +8,22 @@ class GorzdravEndpoint:
     __shared_url = f"{api_url}/shared"
     __schedule_url = f"{api_url}/schedule"
 
+    @classmethod
+    def get_endpoint_label(cls, url: str) -> str:
+        """
+        Эндпоинт без id для метрик:
+        .../schedule/lpu/123/specialties -> /schedule/lpu/{id}/specialties
+        Args:
+            url: str: url запроса
+        Returns:
+            str: шаблон эндпоинта
+        """
+        path = url.removeprefix(cls.api_url).split("?")[0]
+        return "/".join(
+            "{id}" if any(char.isdigit() for char in segment) else segment
+            for segment in path.split("/")
+        )
+
     @classmethod
     def get_districts_endpoint(cls) -> str:
         """
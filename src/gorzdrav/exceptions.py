@@ -1,3 +1,11 @@
+# ответы горздрава, означающие что медорганизация не справляется с запросами
+THROTTLE_ERROR_CODES = frozenset({602, 603, 660})
+# http коды, при которых нужно снизить частоту запросов
+THROTTLE_HTTP_CODES = frozenset({429, 500, 502, 503, 504})
+# ответы горздрава, означающие что медорганизация недоступна
+UNAVAILABLE_ERROR_CODES = THROTTLE_ERROR_CODES | {616}
+
+
 class GorzdravExceptionBase(Exception):
     """
     {
@@ -133,6 +141,26 @@ class Api603Exception(GorzdravExceptionBase):
         )
 
 
+class CircuitOpenException(GorzdravExceptionBase):
+    default_message = "Медорганизация временно не отвечает. \
+        Попробуйте записаться позже или обратитесь в регистратуру \
+        медорганизации"
+    default_errorCode = None
+
+    def __init__(
+        self,
+        lpuId: int,
+        message: str = default_message,
+        url: str | None = None,
+    ):
+        super().__init__(
+            message=message,
+            errorCode=self.__class__.default_errorCode,
+            url=url,
+        )
+        self.lpuId = lpuId
+
+
 class GorzdravException(GorzdravExceptionBase):
     def __init__(
         self,
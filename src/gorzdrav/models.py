@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel, Field
+from pydantic.dataclasses import dataclass
 
+ResultType = TypeVar("ResultType")
 
-class ApiResponse(BaseModel):
-    result: Any | None = None
+
+class ApiResponse(BaseModel, Generic[ResultType]):
+    result: ResultType | None = None
     success: bool
     errorCode: int
     message: str | None = None
@@ -97,6 +100,33 @@ class Doctor(ApiDoctor):
         return self.have_free_tickets and self.have_free_places
 
 
+@dataclass(slots=True)
+class ApiDoctorRecord:
+    """
+    Врач из списка горздрава для чекера: только читаемые им поля.
+    Лишние поля ответа отбрасываются при разборе, без BaseModel на каждого врача
+    """
+
+    id: str
+    name: str
+    freeParticipantCount: int = 0
+    freeTicketCount: int = 0
+    nearestDate: datetime | None = None
+    lastDate: datetime | None = None
+
+    @property
+    def have_free_places(self) -> bool:
+        return self.freeParticipantCount > 0
+
+
+@dataclass(slots=True)
+class ApiAppointmentRecord:
+    """Назначение к врачу для чекера: id и время приёма"""
+
+    id: str
+    visitStart: datetime
+
+
 class LinkParsingResult(BaseModel):
     districtId: str
     lpuId: int
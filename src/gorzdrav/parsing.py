@@ -0,0 +1,232 @@
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pydantic import TypeAdapter
+
+from config import Config
+from gorzdrav.models import ApiResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ("pydantic", "orjson")
+
+
+def get_json_backend(backend: str) -> str:
+    """
+    Бэкенд json по настройке
+    Args:
+        backend: str: auto - orjson, если установлен, pydantic или orjson
+    Returns:
+        str: pydantic или orjson
+    Raises:
+        ValueError: если бэкенд неизвестен или orjson не установлен
+    """
+    if backend == "auto":
+        return "orjson" if orjson is not None else "pydantic"
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"unknown json backend: {backend}")
+    if backend == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed")
+    return backend
+
+
+class ResponseParser:
+    """
+    Разбор тела ответа горздрава сразу в ApiResponse с типизированным result,
+    без промежуточных словарей и повторного создания моделей.
+    Адаптеры pydantic создаются один раз на тип результата.
+    """
+
+    default_backend = get_json_backend(Config.GORZDRAV_JSON_BACKEND)
+    __adapters: dict[Any, TypeAdapter] = {}
+    __item_adapters: dict[Any, TypeAdapter] = {}
+
+    @classmethod
+    def get_adapter(cls, result_type: Any) -> TypeAdapter:
+        """Адаптер ApiResponse[result_type], общий для всех запросов"""
+        adapter = cls.__adapters.get(result_type)
+        if adapter is None:
+            adapter = TypeAdapter(ApiResponse[result_type])
+            cls.__adapters[result_type] = adapter
+        return adapter
+
+    @classmethod
+    def get_item_adapter(cls, item_type: Any) -> TypeAdapter:
+        """Адаптер одного элемента массива result для потокового разбора"""
+        adapter = cls.__item_adapters.get(item_type)
+        if adapter is None:
+            adapter = TypeAdapter(item_type)
+            cls.__item_adapters[item_type] = adapter
+        return adapter
+
+    @classmethod
+    def parse(
+        cls,
+        body: bytes | str,
+        result_type: Any,
+        backend: str | None = None,
+    ) -> ApiResponse:
+        """
+        Разбирает тело ответа горздрава
+        Args:
+            body: bytes | str: тело ответа
+            result_type: Any: тип поля result, например list[ApiDoctor]
+            backend: str | None: pydantic или orjson, None - по настройке
+        Returns:
+            ApiResponse: ответ с result типа result_type
+        Raises:
+            pydantic.ValidationError: если тело не соответствует типу
+        """
+        adapter = cls.get_adapter(result_type)
+        if (backend or cls.default_backend) == "orjson":
+            return adapter.validate_python(orjson.loads(body))
+        return adapter.validate_json(body)
+
+
+class ResultStream:
+    """
+    Потоковый разбор ответа горздрава, в котором result - массив.
+    Элементы массива разбираются по одному по мере чтения тела
+    и отдаются генератором, весь массив в памяти не собирается.
+    Остальные поля ответа (success, errorCode, message)
+    доступны после окончания итерации в fields.
+    """
+
+    __structural = re.compile(rb'["{}\[\]]')
+    __scalar_end = re.compile(rb"[\s,}\]]")
+
+    def __init__(self, chunks: Iterable[bytes], item_type: Any):
+        """
+        Args:
+            chunks: Iterable[bytes]: куски тела ответа, например response.iter_content()
+            item_type: Any: тип элемента массива result, например ApiLPU
+        """
+        self.fields: dict[str, Any] = {}
+        self.__chunks = iter(chunks)
+        self.__buffer = bytearray()
+        self.__pos = 0
+        self.__adapter = ResponseParser.get_item_adapter(item_type)
+
+    def get_response(self) -> ApiResponse:
+        """
+        Ответ горздрава без result, собранный из остальных полей
+        Raises:
+            pydantic.ValidationError: если поля ответа не прочитаны или неверны
+        """
+        return ApiResponse(**self.fields)
+
+    def __iter__(self) -> Iterator[Any]:
+        self.__expect(b"{")
+        if self.__peek() == b"}":
+            self.__pos += 1
+            return
+        while True:
+            key = json.loads(self.__read_value())
+            self.__expect(b":")
+            if key == "result" and self.__peek() == b"[":
+                yield from self.__iter_array()
+            else:
+                self.fields[key] = json.loads(self.__read_value())
+            delimiter = self.__peek()
+            self.__pos += 1
+            if delimiter == b"}":
+                return
+            if delimiter != b",":
+                raise ValueError(f"unexpected {delimiter!r} in gorzdrav response")
+
+    def __iter_array(self) -> Iterator[Any]:
+        self.__expect(b"[")
+        if self.__peek() == b"]":
+            self.__pos += 1
+            return
+        while True:
+            yield self.__adapter.validate_json(self.__read_value())
+            # прочитанное больше не нужно, буфер держит только текущий элемент
+            del self.__buffer[: self.__pos]
+            self.__pos = 0
+            delimiter = self.__peek()
+            self.__pos += 1
+            if delimiter == b"]":
+                return
+            if delimiter != b",":
+                raise ValueError(f"unexpected {delimiter!r} in result array")
+
+    def __fill(self) -> bool:
+        """Дочитывает следующий кусок тела, False - тело закончилось"""
+        for chunk in self.__chunks:
+            if chunk:
+                self.__buffer += chunk
+                return True
+        return False
+
+    def __peek(self) -> bytes:
+        """Следующий значимый символ, пробелы пропускаются"""
+        while True:
+            while self.__pos < len(self.__buffer):
+                char = self.__buffer[self.__pos : self.__pos + 1]
+                if not char.isspace():
+                    return char
+                self.__pos += 1
+            if not self.__fill():
+                raise ValueError("unexpected end of gorzdrav response")
+
+    def __expect(self, char: bytes) -> None:
+        found = self.__peek()
+        if found != char:
+            raise ValueError(f"expected {char!r}, got {found!r} in gorzdrav response")
+        self.__pos += 1
+
+    def __read_value(self) -> bytes:
+        """Читает одно значение json целиком и возвращает его байты"""
+        start = self.__peek()
+        begin = self.__pos
+        if start not in b'"{[':
+            # число, true, false, null
+            while True:
+                match = self.__scalar_end.search(self.__buffer, begin)
+                if match:
+                    self.__pos = match.start()
+                    return bytes(self.__buffer[begin : self.__pos])
+                if not self.__fill():
+                    self.__pos = len(self.__buffer)
+                    return bytes(self.__buffer[begin:])
+        depth = 0
+        in_string = False
+        scan_pos = begin
+        while True:
+            match = self.__structural.search(self.__buffer, scan_pos)
+            if match is None:
+                scan_pos = len(self.__buffer)
+                if not self.__fill():
+                    raise ValueError("unexpected end of gorzdrav response")
+                continue
+            index = match.start()
+            scan_pos = index + 1
+            char = self.__buffer[index]
+            if in_string:
+                if char == ord('"') and not self.__is_escaped(index):
+                    in_string = False
+                    if depth == 0:
+                        break
+            elif char == ord('"'):
+                in_string = True
+            elif char in b"{[":
+                depth += 1
+            elif char in b"}]":
+                depth -= 1
+                if depth == 0:
+                    break
+        self.__pos = scan_pos
+        return bytes(self.__buffer[begin:scan_pos])
+
+    def __is_escaped(self, index: int) -> bool:
+        """Экранирована ли кавычка: перед ней нечётное число обратных слэшей"""
+        backslashes = 0
+        while self.__buffer[index - backslashes - 1] == ord("\\"):
+            backslashes += 1
+        return backslashes % 2 == 1
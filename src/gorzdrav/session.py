@@ -0,0 +1,145 @@
+import logging
+import os
+import socket
+import threading
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DnsCache:
+    """
+    Кэш DNS для заданных хостов на всё время жизни процесса.
+    Подменяет socket.getaddrinfo, остальные хосты резолвятся как обычно.
+    Ошибки резолвинга не кэшируются.
+    Подмена действует на весь процесс, поэтому включается явно
+    только в процессах чекера, а не при импорте модуля.
+    """
+
+    __original_getaddrinfo = socket.getaddrinfo
+    __cache: dict[tuple[Any, ...], list[Any]] = {}
+    __hosts: set[str] = set()
+    __lock = threading.Lock()
+
+    @classmethod
+    def __getaddrinfo(cls, host, port, *args, **kwargs):
+        if host not in cls.__hosts:
+            return cls.__original_getaddrinfo(host, port, *args, **kwargs)
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        cached = cls.__cache.get(key)
+        if cached is not None:
+            return cached
+        result = cls.__original_getaddrinfo(host, port, *args, **kwargs)
+        with cls.__lock:
+            cls.__cache[key] = result
+        return result
+
+    @classmethod
+    def install(cls, hosts: list[str]) -> None:
+        """
+        Включает кэширование DNS для хостов
+        Args:
+            hosts: list[str]: хосты, для которых кэшируются адреса
+        """
+        with cls.__lock:
+            cls.__hosts.update(hosts)
+            socket.getaddrinfo = cls.__getaddrinfo
+
+    @classmethod
+    def uninstall(cls) -> None:
+        """Отключает кэширование DNS и очищает кэш"""
+        with cls.__lock:
+            socket.getaddrinfo = cls.__original_getaddrinfo
+            cls.__hosts.clear()
+            cls.__cache.clear()
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls.__cache)
+
+
+class GorzdravSession:
+    """
+    Пул keep-alive соединений к API горздрава, один на процесс.
+    Сессия создаётся лениво и пересоздаётся в дочернем процессе после fork,
+    чтобы процессы не делили между собой сокеты.
+    """
+
+    __session: requests.Session | None = None
+    __pid: int | None = None
+    __lock = threading.Lock()
+
+    @staticmethod
+    def create_session() -> requests.Session:
+        """
+        Создаёт сессию с пулом соединений по настройкам из Config
+        Returns:
+            requests.Session: сессия
+        """
+        session = requests.Session()
+        retries = Retry(
+            total=Config.GORZDRAV_POOL_RETRIES,
+            connect=Config.GORZDRAV_POOL_RETRIES,
+            read=0,
+            status=0,
+            backoff_factor=0.5,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=Config.GORZDRAV_POOL_CONNECTIONS,
+            pool_maxsize=Config.GORZDRAV_POOL_MAXSIZE,
+            max_retries=retries,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(Config.HEADERS)
+        session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+        return session
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        Возвращает сессию текущего процесса
+        Returns:
+            requests.Session: сессия с пулом соединений
+        """
+        pid = os.getpid()
+        if cls.__session is not None and cls.__pid == pid:
+            return cls.__session
+        with cls.__lock:
+            if cls.__session is None or cls.__pid != pid:
+                cls.__session = cls.create_session()
+                cls.__pid = pid
+                logger.debug("gorzdrav session created in process %s", pid)
+        return cls.__session
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Сбрасывает пул соединений.
+        Сокеты унаследованные от родителя не закрываются,
+        они остаются в распоряжении родительского процесса.
+        """
+        cls.__session = None
+        cls.__pid = None
+        cls.__lock = threading.Lock()
+
+    @classmethod
+    def close(cls) -> None:
+        """Закрывает все соединения пула текущего процесса"""
+        with cls.__lock:
+            if cls.__session is not None and cls.__pid == os.getpid():
+                cls.__session.close()
+            cls.__session = None
+            cls.__pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=GorzdravSession.reset)
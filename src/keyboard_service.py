@@ -1,12 +1,15 @@
 import hashlib
 import datetime
+from collections.abc import Iterable
 from pydantic import BaseModel
 from pydantic import Field
 
 from telebot.types import InlineKeyboardButton
 from telebot.types import InlineKeyboardMarkup
 
+from db.sqlite_db import SqliteDb
 from gorzdrav.models import ApiDistrict, ApiDoctor, ApiLPU, ApiSpecialty
+from models.pydantic_models import CatalogDoctor
 
 
 class ButtonSchema(BaseModel):
@@ -237,7 +240,7 @@ class KeyboardService:
         return lpu_name.strip()
 
     @classmethod
-    def get_lpus_buttons(cls, lpus: list[ApiLPU]):
+    def get_lpus_buttons(cls, lpus: Iterable[ApiLPU]):
         buttons: list[ButtonSchema] = []
         for lpu in lpus:
             short_lpu_name = cls.get_shorten_lpu_name(lpu.lpuFullName or "нет имени")
@@ -264,11 +267,16 @@ class KeyboardService:
         return buttons
 
     @classmethod
-    def get_doctor_buttons(cls, doctors: list[ApiDoctor]):
+    def get_doctor_buttons(cls, doctors: list[ApiDoctor], show_counts: bool = True):
+        """
+        Кнопки врачей. show_counts=False - количество мест устарело
+        и не показывается, чтобы его не приняли за актуальное
+        """
         buttons: list[ButtonSchema] = []
         for doc in doctors:
+            counts = f"[{doc.freeParticipantCount}:{doc.freeTicketCount}] "
             button_text = cls.__get_button_text(
-                f"[{doc.freeParticipantCount}:{doc.freeTicketCount}] {doc.name}"
+                f"{counts if show_counts else ''}{doc.name}"
             )
             button_callback = f"doctor/{doc.id}"
             button = ButtonSchema(
@@ -277,3 +285,37 @@ class KeyboardService:
             )
             buttons.append(button)
         return buttons
+
+    @staticmethod
+    def get_found_doctor_id(doctor: CatalogDoctor) -> str:
+        """
+        Короткий id врача из поиска: медучреждение и хеш врача.
+        Длина не зависит от id горздрава и укладывается в 64 байта,
+        которые telegram допускает для callback_data и id inline-результата.
+        """
+        return f"{doctor.lpuId}/{SqliteDb.get_doctor_hash(doctor)}"
+
+    @classmethod
+    def get_found_doctor_callback(cls, doctor: CatalogDoctor) -> str:
+        """Возвращает callback для врача из поиска."""
+        return f"find/{cls.get_found_doctor_id(doctor)}"
+
+    @classmethod
+    def get_found_doctor_description(cls, doctor: CatalogDoctor) -> str:
+        """Специальность и сокращённое название ЛПУ врача из поиска."""
+        short_lpu_name = cls.get_shorten_lpu_name(doctor.lpuFullName or "нет имени")
+        return f"{doctor.specialtyName or 'нет специальности'} - {short_lpu_name}"
+
+    @classmethod
+    def get_found_doctors_buttons(cls, doctors: list[CatalogDoctor]):
+        buttons: list[ButtonSchema] = []
+        for doctor in doctors:
+            button_text = cls.__get_button_text(
+                f"{doctor.doctorName} - {cls.get_found_doctor_description(doctor)}"
+            )
+            button = ButtonSchema(
+                text=button_text,
+                callback_data=cls.get_found_doctor_callback(doctor),
+            )
+            buttons.append(button)
+        return buttons
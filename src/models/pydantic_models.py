@@ -14,6 +14,14 @@ class DbDoctor(DbDoctorToCreate):
     id: str
 
 
+class CatalogDoctor(DbDoctorToCreate):
+    """Врач, найденный в локальной копии справочников горздрава"""
+
+    doctorName: str
+    specialtyName: str | None = None
+    lpuFullName: str | None = None
+
+
 class DbUser(BaseModel):
     id: int
     ping_status: bool | None = False
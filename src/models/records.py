@@ -0,0 +1,48 @@
+from typing import NamedTuple
+
+
+class DbUserRecord(NamedTuple):
+    """Пингующий пользователь врача для чекера: только читаемые им поля"""
+
+    id: int
+    limit_days: int | None = None
+
+
+class DbDoctorRecord:
+    """
+    Врач с пингующими пользователями для чекера.
+    Строится прямо из строк JOIN без валидации pydantic,
+    поля те же, что у DbDoctorWithUsers
+    """
+
+    __slots__ = (
+        "id",
+        "districtId",
+        "lpuId",
+        "specialtyId",
+        "doctorId",
+        "pinging_users",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        districtId: str,
+        lpuId: int,
+        specialtyId: str,
+        doctorId: str,
+        pinging_users: list[DbUserRecord] | None = None,
+    ):
+        self.id = id
+        self.districtId = districtId
+        self.lpuId = lpuId
+        self.specialtyId = specialtyId
+        self.doctorId = doctorId
+        self.pinging_users: list[DbUserRecord] = pinging_users or []
+
+    def __repr__(self) -> str:
+        return (
+            f"DbDoctorRecord(id={self.id!r}, lpuId={self.lpuId!r}, "
+            f"specialtyId={self.specialtyId!r}, doctorId={self.doctorId!r}, "
+            f"pinging_users={len(self.pinging_users)})"
+        )
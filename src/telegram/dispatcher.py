@@ -0,0 +1,243 @@
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import StrEnum
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.rate_limiter import AdaptiveRateLimiter
+
+from .types import TGParseMode
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryStatus(StrEnum):
+    """
+    Итог отправки сообщения: доставлено, временная ошибка
+    (сеть, 5xx, исчерпаны повторы на 429) или отказ телеграма для этого чата
+    (4xx: бот заблокирован, чат не найден), повторять который бессмысленно
+    """
+
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    REJECTED = "rejected"
+
+
+class DeliveryReport:
+    """Итог рассылки одного сообщения группе пользователей"""
+
+    __slots__ = ("delivered", "failed", "rejected", "latencies")
+
+    def __init__(self):
+        self.delivered: list[int | str] = []
+        # временные ошибки, можно повторить позже
+        self.failed: list[int | str] = []
+        # чаты, в которые телеграм не доставит сообщение и при повторе
+        self.rejected: list[int | str] = []
+        # секунды от начала рассылки до доставки каждому пользователю
+        self.latencies: list[float] = []
+
+    def get_percentile(self, percent: float) -> float:
+        """Задержка доставки, в которую уложились percent% получателей"""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = max(0, math.ceil(len(latencies) * percent / 100) - 1)
+        return latencies[index]
+
+
+class TgDispatcher:
+    """
+    Параллельная рассылка сообщений телеграма через пул соединений.
+    Соблюдает ограничения Bot API: не больше global_rate сообщений в секунду
+    всего и chat_rate сообщений в секунду в один чат.
+    На ответ 429 все отправки ждут retry_after секунд и повторяются,
+    сетевые ошибки и 5xx повторяются после паузы, остальные 4xx не повторяются.
+    Ведра чатов, которым ничего не отправлялось chat_idle_secs, удаляются,
+    чтобы память не росла с числом оповещённых чатов.
+    """
+
+    def __init__(
+        self,
+        api_token: str,
+        max_workers: int,
+        global_rate: float,
+        chat_rate: float,
+        max_retries: int,
+        api_url: str = "https://api.telegram.org",
+        session_factory: Callable[[], requests.Session] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        chat_idle_secs: float = 60.0,
+    ):
+        self.url = f"{api_url}/bot{api_token}/sendMessage"
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.clock = clock
+        self.limiter = AdaptiveRateLimiter(
+            initial_rate=chat_rate,
+            min_rate=chat_rate,
+            max_rate=chat_rate,
+            global_rate=global_rate,
+            clock=clock,
+            idle_secs=chat_idle_secs,
+        )
+        self.__session_factory = session_factory or self.__create_session
+        self.__session: requests.Session | None = None
+        self.__pid: int | None = None
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def __create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_workers,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def __get_session(self) -> requests.Session:
+        # сессия не переживает fork, в дочернем процессе создаём новую
+        with self.__lock:
+            if self.__session is None or self.__pid != os.getpid():
+                self.__session = self.__session_factory()
+                self.__pid = os.getpid()
+            return self.__session
+
+    def __pause(self, secs: float) -> None:
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, self.clock() + secs)
+
+    def __wait_turn(self, chat_id: int | str) -> None:
+        wait = self.limiter.reserve(str(chat_id))
+        wait = max(wait, self.__paused_until - self.clock())
+        if wait > 0:
+            self.sleep(wait)
+
+    def send_message(
+        self,
+        chat_id: int | str,
+        message: str,
+        parse_mode: TGParseMode | None = None,
+    ) -> DeliveryStatus:
+        """
+        Отправляет сообщение в чат с повторами на 429, 5xx и сетевых ошибках
+        Args:
+            chat_id: int | str: id чата
+            message: str: сообщение
+            parse_mode: TGParseMode | None: режим разметки
+        Returns:
+            DeliveryStatus: доставлено, временная ошибка или отказ для чата
+        """
+        data = {
+            "chat_id": chat_id,
+            "text": message,
+            "disable_web_page_preview": True,
+        }
+        if parse_mode is not None:
+            data["parse_mode"] = parse_mode
+        for attempt in range(self.max_retries + 1):
+            self.__wait_turn(chat_id)
+            try:
+                response = self.__get_session().post(url=self.url, data=data)
+            except requests.RequestException as e:
+                logger.warning("Failed to send message to %s: %s", chat_id, e)
+                self.__pause(2**attempt)
+                continue
+            if response.ok:
+                return DeliveryStatus.DELIVERED
+            if response.status_code == 429:
+                retry_after = self.get_retry_after(response)
+                logger.warning(
+                    "telegram flood limit on %s, retry after %s s",
+                    chat_id,
+                    retry_after,
+                )
+                self.__pause(retry_after)
+                continue
+            logger.warning(
+                "Failed to send message to %s %s",
+                chat_id,
+                response.text,
+            )
+            if self.is_rejected(response):
+                return DeliveryStatus.REJECTED
+            self.__pause(2**attempt)
+        return DeliveryStatus.FAILED
+
+    @staticmethod
+    def is_rejected(response: requests.Response) -> bool:
+        """
+        Телеграм отказал в доставке в этот чат: 400 chat not found,
+        403 bot was blocked by the user и т.п. 401 означает неверный токен бота,
+        а не проблему чата, такие ошибки временные
+        """
+        status = response.status_code
+        return 400 <= status < 500 and status not in (401, 429)
+
+    @staticmethod
+    def get_retry_after(response: requests.Response) -> float:
+        """Сколько секунд просит подождать телеграм в ответе 429"""
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return 1.0
+
+    def send_many(
+        self,
+        chat_ids: list[int | str],
+        message: str,
+        parse_mode: TGParseMode | None = None,
+    ) -> DeliveryReport:
+        """
+        Параллельно отправляет одно сообщение в несколько чатов
+        Args:
+            chat_ids: list[int | str]: id чатов
+            message: str: сообщение
+            parse_mode: TGParseMode | None: режим разметки
+        Returns:
+            DeliveryReport: кому доставлено, кому нет и задержки доставки
+        """
+        report = DeliveryReport()
+        if not chat_ids:
+            return report
+        started_at = self.clock()
+
+        def send(chat_id: int | str) -> tuple[int | str, DeliveryStatus, float]:
+            status = self.send_message(
+                chat_id=chat_id, message=message, parse_mode=parse_mode
+            )
+            return chat_id, status, self.clock() - started_at
+
+        workers = min(self.max_workers, len(chat_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chat_id, status, latency in executor.map(send, chat_ids):
+                if status == DeliveryStatus.DELIVERED:
+                    report.delivered.append(chat_id)
+                    report.latencies.append(latency)
+                elif status == DeliveryStatus.REJECTED:
+                    report.rejected.append(chat_id)
+                else:
+                    report.failed.append(chat_id)
+
+        logger.info(
+            "delivered %s of %s messages, %s rejected, latency p50 %.2f s, "
+            "p90 %.2f s, p99 %.2f s, max %.2f s",
+            len(report.delivered),
+            len(chat_ids),
+            len(report.rejected),
+            report.get_percentile(50),
+            report.get_percentile(90),
+            report.get_percentile(99),
+            report.get_percentile(100),
+        )
+        return report
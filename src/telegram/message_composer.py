@@ -1,4 +1,4 @@
-from gorzdrav.models import ApiAppointment
+from gorzdrav.models import ApiAppointmentRecord
 
 
 class TgMessageComposer:
@@ -8,9 +8,9 @@ class TgMessageComposer:
         free_participant_count: int,
         free_ticket_count: int,
         doctor_link: str,
-        appointments: list[ApiAppointment],
+        appointments: list[ApiAppointmentRecord],
     ) -> str:
-        nearest_appointment: ApiAppointment | None = None
+        nearest_appointment: ApiAppointmentRecord | None = None
         nearest_appointment_str: str | None = None
 
         if appointments:
@@ -0,0 +1,93 @@
+import pytest
+
+from gorzdrav.cache import MISS, GorzdravCache, MemoryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_memory_cache_ttl(clock: FakeClock):
+    cache = MemoryCache(maxsize=10, clock=clock)
+    cache.set("a", [1, 2], ttl=10)
+    assert cache.get("a") == [1, 2]
+    clock.now += 10
+    assert cache.get("a") is MISS
+    assert len(cache) == 0
+
+
+def test_memory_cache_lru(clock: FakeClock):
+    cache = MemoryCache(maxsize=2, clock=clock)
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=10)
+    assert cache.get("b") is MISS
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_none_is_cached(clock: FakeClock):
+    cache = GorzdravCache(maxsize=2, clock=clock)
+    cache.set("a", None, ttl=10)
+    assert cache.get("a") is None
+
+
+def test_stats(clock: FakeClock):
+    cache = GorzdravCache(maxsize=1, clock=clock)
+    assert cache.get("a") is MISS
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("b") == 2
+    assert cache.get_stats() == {
+        "hits": 1,
+        "disk_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "size": 1,
+    }
+
+
+def test_invalidate_prefix(clock: FakeClock):
+    cache = GorzdravCache(maxsize=10, clock=clock)
+    cache.set("https://host/shared/districts", 1, ttl=10)
+    cache.set("https://host/shared/district/1/lpus", 2, ttl=10)
+    cache.set("https://host/schedule/lpu/1/specialties", 3, ttl=10)
+    assert cache.invalidate("https://host/shared/") == 2
+    assert cache.get("https://host/shared/districts") is MISS
+    assert cache.get("https://host/schedule/lpu/1/specialties") == 3
+    assert cache.invalidate() == 1
+
+
+def test_disk_tier_survives_restart(tmp_path, clock: FakeClock):
+    disk_path = str(tmp_path / "cache.db")
+    cache = GorzdravCache(maxsize=10, disk_path=disk_path, clock=clock)
+    cache.set("districts", [{"id": "1", "name": "Адмиралтейский"}], ttl=10)
+
+    restarted = GorzdravCache(maxsize=10, disk_path=disk_path, clock=clock)
+    assert restarted.get("districts") == [{"id": "1", "name": "Адмиралтейский"}]
+    assert restarted.get_stats()["disk_hits"] == 1
+    # запись поднята в память и живёт столько же, сколько на диске
+    clock.now += 10
+    assert restarted.get("districts") is MISS
+
+
+def test_disk_tier_invalidate(tmp_path, clock: FakeClock):
+    disk_path = str(tmp_path / "cache.db")
+    cache = GorzdravCache(maxsize=10, disk_path=disk_path, clock=clock)
+    cache.set("a/1", 1, ttl=10)
+    cache.set("b/1", 2, ttl=10)
+    cache.invalidate("a/")
+    restarted = GorzdravCache(maxsize=10, disk_path=disk_path, clock=clock)
+    assert restarted.get("a/1") is MISS
+    assert restarted.get("b/1") == 2
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from gorzdrav.api import Gorzdrav
+from gorzdrav.async_api import AsyncGorzdrav
+from gorzdrav.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=3,
+        base_cooloff_secs=10,
+        max_cooloff_secs=25,
+        clock=clock,
+    )
+
+
+def open_circuit(breaker: CircuitBreaker, lpuId: int):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow(lpuId)
+        breaker.on_failure(lpuId)
+
+
+def test_closed_by_default(breaker: CircuitBreaker):
+    assert breaker.allow(1)
+    assert breaker.get_state(1) == CircuitState.CLOSED
+    assert breaker.get_states() == {}
+
+
+def test_success_resets_failures(breaker: CircuitBreaker):
+    breaker.on_failure(1)
+    breaker.on_failure(1)
+    breaker.on_success(1)
+    breaker.on_failure(1)
+    assert breaker.get_state(1) == CircuitState.CLOSED
+
+
+def test_open_after_threshold(breaker: CircuitBreaker, clock: FakeClock):
+    open_circuit(breaker, 1)
+    assert breaker.get_state(1) == CircuitState.OPEN
+    assert not breaker.allow(1)
+    # другие медучреждения не затронуты
+    assert breaker.allow(2)
+    clock.now = 9.9
+    assert not breaker.allow(1)
+
+
+def test_single_half_open_probe(breaker: CircuitBreaker, clock: FakeClock):
+    open_circuit(breaker, 1)
+    clock.now = 10
+    assert breaker.allow(1)
+    assert breaker.get_state(1) == CircuitState.HALF_OPEN
+    assert not breaker.allow(1)
+    breaker.on_success(1)
+    assert breaker.get_state(1) == CircuitState.CLOSED
+    assert breaker.allow(1)
+
+
+def test_cooloff_grows_exponentially(breaker: CircuitBreaker, clock: FakeClock):
+    open_circuit(breaker, 1)
+    opened_at = 0.0
+    for cooloff in [10, 20, 25, 25]:
+        clock.now = opened_at + cooloff - 0.1
+        assert not breaker.allow(1)
+        clock.now = opened_at + cooloff
+        assert breaker.allow(1)
+        breaker.on_failure(1)
+        assert breaker.get_states() == {1: CircuitState.OPEN}
+        opened_at = clock.now
+
+
+def test_aborted_probe_is_released(breaker: CircuitBreaker, clock: FakeClock):
+    open_circuit(breaker, 1)
+    clock.now = 10
+    assert breaker.allow(1)
+    breaker.on_abort(1)
+    assert breaker.get_state(1) == CircuitState.HALF_OPEN
+    assert breaker.allow(1)
+    assert not breaker.allow(1)
+
+
+def test_cancelled_async_probe_is_released(
+    breaker: CircuitBreaker, clock: FakeClock, monkeypatch
+):
+    async def wait_forever(key: str) -> None:
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(Gorzdrav, "circuit_breaker", breaker)
+    monkeypatch.setattr(Gorzdrav.rate_limiter, "acquire_async", wait_forever)
+    open_circuit(breaker, 1)
+    clock.now = 10
+
+    async def cancel_probe():
+        client = AsyncGorzdrav(session=None)
+        task = asyncio.create_task(client.get_specialties(lpuId=1))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    # пробный запрос отменён в очереди ограничителя, следующий может его повторить
+    assert breaker.allow(1)
@@ -61,3 +61,13 @@ def test_get_appointments_endpoint(lpuId: int, doctorId: str):
     assert (
         res == f"{Config.API_URL}/schedule/lpu/{lpuId}/doctor/{doctorId}/appointments"
     )
+
+
+def test_endpoint_label():
+    url = GorzdravEndpoint.get_doctors_endpoint(lpuId=123, specialtyId="45")
+    assert (
+        GorzdravEndpoint.get_endpoint_label(url)
+        == "/schedule/lpu/{id}/speciality/{id}/doctors"
+    )
+    url = GorzdravEndpoint.get_districts_endpoint()
+    assert GorzdravEndpoint.get_endpoint_label(url) == "/shared/districts"
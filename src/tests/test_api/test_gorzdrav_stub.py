@@ -0,0 +1,107 @@
+import pytest
+import requests
+
+from benchmarks.gorzdrav_stub import GorzdravStub, StubData
+from config import Config
+from gorzdrav.endpoint import GorzdravEndpoint
+from gorzdrav.models import (
+    ApiAppointment,
+    ApiDistrict,
+    ApiDoctor,
+    ApiLPU,
+    ApiResponse,
+    ApiSpecialty,
+    ApiTimetable,
+)
+
+
+@pytest.fixture()
+def stub():
+    stub = GorzdravStub(
+        data=StubData(
+            seed=1,
+            lpus=3,
+            specialties_per_lpu=2,
+            doctors_per_specialty=4,
+            free_ratio=0.5,
+        )
+    ).start()
+    yield stub
+    stub.stop()
+
+
+def get(stub: GorzdravStub, endpoint: str) -> ApiResponse:
+    url = endpoint.replace(Config.GORZDRAV_API, stub.api_url)
+    return ApiResponse.model_validate(requests.get(url, timeout=5).json())
+
+
+def test_stub_serves_gorzdrav_endpoints(stub: GorzdravStub):
+    districts = get(stub, GorzdravEndpoint.get_districts_endpoint())
+    assert [ApiDistrict.model_validate(d) for d in districts.result]
+    lpus = [
+        ApiLPU.model_validate(lpu)
+        for lpu in get(stub, GorzdravEndpoint.get_lpus_endpoint()).result
+    ]
+    assert [lpu.id for lpu in lpus] == [1, 2, 3]
+    specialties = [
+        ApiSpecialty.model_validate(s)
+        for s in get(stub, GorzdravEndpoint.get_specialties_endpoint(lpuId=1)).result
+    ]
+    assert len(specialties) == 2
+    doctors = [
+        ApiDoctor.model_validate(d)
+        for d in get(
+            stub, GorzdravEndpoint.get_doctors_endpoint(lpuId=1, specialtyId="0")
+        ).result
+    ]
+    assert len(doctors) == 4
+    # счётчики специальности сходятся со свободными местами врачей
+    assert specialties[0].countFreeParticipant == sum(
+        d.freeParticipantCount for d in doctors
+    )
+    for doctor in doctors:
+        appointments = [
+            ApiAppointment.model_validate(a)
+            for a in get(
+                stub,
+                GorzdravEndpoint.get_appointments_endpoint(lpuId=1, doctorId=doctor.id),
+            ).result
+        ]
+        assert len(appointments) == doctor.freeParticipantCount
+        timetable = get(
+            stub, GorzdravEndpoint.get_timetable_endpoint(lpuId=1, doctorId=doctor.id)
+        )
+        days = [ApiTimetable.model_validate(t) for t in timetable.result]
+        assert len(days) == len(appointments)
+    assert stub.get_requests_count() == 4 + 2 * len(doctors)
+
+
+def test_stub_is_deterministic():
+    first = StubData(seed=7)
+    second = StubData(seed=7)
+    assert first.get_doctors(5, 3) == second.get_doctors(5, 3)
+    assert first.get_appointments(5, "3001") == second.get_appointments(5, "3001")
+
+
+def test_stub_unknown_lpu(stub: GorzdravStub):
+    response = get(stub, GorzdravEndpoint.get_specialties_endpoint(lpuId=100))
+    assert not response.success
+    assert response.errorCode == 404
+
+
+def test_stub_injects_errors():
+    stub = GorzdravStub(data=StubData(lpus=1), error_rate=1.0, error_code=602).start()
+    try:
+        response = get(stub, GorzdravEndpoint.get_lpus_endpoint())
+    finally:
+        stub.stop()
+    assert not response.success
+    assert response.errorCode == 602
+
+
+def test_stub_telegram_send_message(stub: GorzdravStub):
+    response = requests.post(
+        f"{stub.url}/bottoken/sendMessage", json={"chat_id": 1, "text": "hi"}, timeout=5
+    )
+    assert response.json()["ok"]
+    assert stub.tg_messages == 1
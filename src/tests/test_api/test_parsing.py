@@ -0,0 +1,118 @@
+import datetime
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from gorzdrav import exceptions
+from gorzdrav.api import Gorzdrav
+from gorzdrav.models import (
+    ApiAppointment,
+    ApiAppointmentRecord,
+    ApiDoctorRecord,
+    ApiLPU,
+)
+from gorzdrav.parsing import ResponseParser, get_json_backend, orjson
+
+APPOINTMENTS_BODY = json.dumps(
+    {
+        "success": True,
+        "errorCode": 0,
+        "result": [
+            {
+                "id": "1",
+                "visitStart": "2024-05-01T10:00:00",
+                "visitEnd": "2024-05-01T10:15:00",
+                "number": 1,
+                "room": "12",
+            }
+        ],
+    }
+)
+
+
+@pytest.mark.parametrize("body", [APPOINTMENTS_BODY, APPOINTMENTS_BODY.encode()])
+def test_parse_typed_result(body: str | bytes):
+    api_response = ResponseParser.parse(body, list[ApiAppointment], backend="pydantic")
+    assert api_response.success
+    assert api_response.result == [
+        ApiAppointment(
+            id="1",
+            visitStart=datetime.datetime(2024, 5, 1, 10),
+            visitEnd=datetime.datetime(2024, 5, 1, 10, 15),
+            number=1,
+            room="12",
+        )
+    ]
+
+
+def test_parse_single_object():
+    body = b'{"success": true, "errorCode": 0, "result": {"id": 5, "address": "a"}}'
+    api_response = ResponseParser.parse(body, ApiLPU)
+    assert api_response.result == ApiLPU(id=5, address="a")
+
+
+def test_adapter_is_reused():
+    adapter = ResponseParser.get_adapter(list[ApiAppointment])
+    assert ResponseParser.get_adapter(list[ApiAppointment]) is adapter
+
+
+def test_parse_error_response():
+    body = b'{"success": false, "errorCode": 39, "message": "Nothing", "result": null}'
+    api_response = ResponseParser.parse(body, list[ApiAppointment])
+    with pytest.raises(exceptions.GorzdravExceptionBase) as e:
+        Gorzdrav.get_result_from_response(api_response, url="url")
+    assert e.value.errorCode == 39
+
+
+def test_parse_invalid_result():
+    body = b'{"success": true, "errorCode": 0, "result": [{"id": "1"}]}'
+    with pytest.raises(ValidationError):
+        ResponseParser.parse(body, list[ApiAppointment])
+
+
+def test_get_json_backend():
+    assert get_json_backend("pydantic") == "pydantic"
+    assert get_json_backend("auto") == ("orjson" if orjson else "pydantic")
+    with pytest.raises(ValueError):
+        get_json_backend("ujson")
+    if orjson is None:
+        with pytest.raises(ValueError):
+            get_json_backend("orjson")
+
+
+def test_parse_records_skip_extra_fields():
+    body = json.dumps(
+        {
+            "success": True,
+            "errorCode": 0,
+            "result": [
+                {
+                    "id": "7",
+                    "name": "Врач",
+                    "freeParticipantCount": 2,
+                    "freeTicketCount": 1,
+                    "nearestDate": "2024-05-01T10:00:00",
+                    "lastDate": None,
+                    "ariaNumber": "1",
+                }
+            ],
+        }
+    )
+    (doctor,) = ResponseParser.parse(body, list[ApiDoctorRecord]).result
+    assert doctor == ApiDoctorRecord(
+        id="7",
+        name="Врач",
+        freeParticipantCount=2,
+        freeTicketCount=1,
+        nearestDate=datetime.datetime(2024, 5, 1, 10),
+    )
+    assert doctor.have_free_places
+    assert not hasattr(doctor, "__dict__")
+
+    (appointment,) = ResponseParser.parse(
+        APPOINTMENTS_BODY, list[ApiAppointmentRecord]
+    ).result
+    assert appointment == ApiAppointmentRecord(
+        id="1", visitStart=datetime.datetime(2024, 5, 1, 10)
+    )
@@ -0,0 +1,77 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from gorzdrav.session import DnsCache, GorzdravSession
+
+
+@pytest.fixture
+def fake_getaddrinfo(monkeypatch):
+    calls: list[str] = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    DnsCache.uninstall()
+    monkeypatch.setattr(socket, "getaddrinfo", socket.getaddrinfo)
+    monkeypatch.setattr(DnsCache, "_DnsCache__original_getaddrinfo", getaddrinfo)
+    yield calls
+    DnsCache.uninstall()
+
+
+def test_session_reused_in_process():
+    GorzdravSession.reset()
+    session = GorzdravSession.get_session()
+    assert GorzdravSession.get_session() is session
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+
+def test_session_reset():
+    session = GorzdravSession.get_session()
+    GorzdravSession.reset()
+    assert GorzdravSession.get_session() is not session
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_session_recreated_after_fork():
+    session = GorzdravSession.get_session()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        is_new = GorzdravSession.get_session() is not session
+        os.write(write_fd, b"1" if is_new else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    assert GorzdravSession.get_session() is session
+
+
+def test_dns_cache(fake_getaddrinfo: list[str]):
+    DnsCache.install(hosts=["gorzdrav.spb.ru"])
+    for _ in range(3):
+        socket.getaddrinfo("gorzdrav.spb.ru", 443)
+    assert fake_getaddrinfo == ["gorzdrav.spb.ru"]
+    assert DnsCache.size() == 1
+
+
+def test_dns_cache_other_hosts(fake_getaddrinfo: list[str]):
+    DnsCache.install(hosts=["gorzdrav.spb.ru"])
+    for _ in range(2):
+        socket.getaddrinfo("example.com", 443)
+    assert fake_getaddrinfo == ["example.com", "example.com"]
+    assert DnsCache.size() == 0
+
+
+def test_dns_cache_not_installed_on_import():
+    """Импорт клиента горздрава не меняет резолвинг для телеграма и aiohttp"""
+    code = (
+        "import socket; original = socket.getaddrinfo; "
+        "import gorzdrav.api, gorzdrav.session; "
+        "assert socket.getaddrinfo is original"
+    )
+    env = dict(os.environ, GORZDRAV_DNS_CACHE="1")
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from benchmarks.gorzdrav_stub import GorzdravStub, StubData
+from gorzdrav import exceptions
+from gorzdrav.api import Gorzdrav
+from gorzdrav.cache import MISS, GorzdravCache
+from gorzdrav.endpoint import GorzdravEndpoint
+from gorzdrav.models import ApiLPU
+from gorzdrav.parsing import ResponseParser, ResultStream
+
+LPUS = [
+    {
+        "id": 1,
+        "address": 'ул. "Тестовая", д. 1 {корп. [2]}',
+        "lpuFullName": "п-ка \\ 1",
+    },
+    {"id": 2, "address": None, "lpuFullName": "Больница", "extra": {"a": [1, 2]}},
+    {"id": 3},
+]
+
+
+def make_body(result, **fields) -> bytes:
+    response = {"success": True, "errorCode": 0, **fields, "result": result}
+    return json.dumps(response, ensure_ascii=False, indent=1).encode()
+
+
+def split(body: bytes, size: int) -> list[bytes]:
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_stream_matches_parse(chunk_size: int):
+    body = make_body(LPUS, message=None, stackTrace={"x": "]"})
+    stream = ResultStream(split(body, chunk_size), ApiLPU)
+    assert list(stream) == ResponseParser.parse(body, list[ApiLPU]).result
+    response = stream.get_response()
+    assert response.success
+    assert response.errorCode == 0
+    assert response.stackTrace == {"x": "]"}
+
+
+def test_stream_is_lazy():
+    body = make_body(LPUS)
+    chunks = iter(split(body, 16))
+    stream = iter(ResultStream(chunks, ApiLPU))
+    assert next(stream).id == 1
+    # тело дочитано только до конца первого элемента
+    assert b'"id": 2' in b"".join(chunks)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"success": true, "errorCode": 0, "result": []}',
+        b'{"result": null, "success": false, "errorCode": 39, "message": "x"}',
+        b"{}",
+    ],
+)
+def test_stream_empty(body: bytes):
+    assert list(ResultStream([body], ApiLPU)) == []
+
+
+def test_stream_invalid_body():
+    with pytest.raises(ValueError):
+        list(ResultStream([b'{"result": [{"id": 1}'], ApiLPU))
+    with pytest.raises(ValueError):
+        list(ResultStream([b'{"result": [{"id": 1} {"id": 2}]}'], ApiLPU))
+
+
+@pytest.fixture()
+def stub(monkeypatch):
+    stub = GorzdravStub(data=StubData(seed=1, lpus=25)).start()
+    monkeypatch.setattr(
+        GorzdravEndpoint, "_GorzdravEndpoint__shared_url", f"{stub.api_url}/v2/shared"
+    )
+    monkeypatch.setattr(Gorzdrav, "cache", GorzdravCache(maxsize=10))
+    yield stub
+    stub.stop()
+
+
+def test_iter_lpus(stub: GorzdravStub):
+    lpus = list(Gorzdrav.iter_lpus(use_cache=False))
+    assert [lpu.id for lpu in lpus] == list(range(1, 26))
+    assert Gorzdrav.cache.get(GorzdravEndpoint.get_lpus_endpoint()) is MISS
+
+    assert list(Gorzdrav.iter_lpus()) == lpus
+    assert list(Gorzdrav.iter_lpus()) == lpus
+    assert stub.get_requests_count() == 2
+
+
+def test_iter_lpus_error(stub: GorzdravStub):
+    stub.error_rate = 1.0
+    with pytest.raises(exceptions.GorzdravExceptionBase):
+        list(Gorzdrav.iter_lpus(use_cache=False))
@@ -0,0 +1,62 @@
+import datetime
+import random
+
+import pytest
+
+from core.checker_app import CheckerApp
+from gorzdrav.models import ApiAppointment
+from models.pydantic_models import DbUser
+
+
+def make_appointment(visit_date: datetime.date) -> ApiAppointment:
+    visit = datetime.datetime.combine(visit_date, datetime.time(hour=9))
+    return ApiAppointment(
+        id=str(random.randint(1, 10**9)),
+        visitStart=visit,
+        visitEnd=visit + datetime.timedelta(minutes=15),
+        number=None,
+        room=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "day_offsets, expected",
+    [
+        ([], None),
+        ([-1, -5], None),
+        ([0], 1),
+        ([3, 1, 10], 2),
+        ([-2, 4], 5),
+    ],
+)
+def test_nearest_appointment_offset(day_offsets: list[int], expected: int | None):
+    today = datetime.date(2026, 1, 1)
+    appointments = [
+        make_appointment(today + datetime.timedelta(days=offset))
+        for offset in day_offsets
+    ]
+    assert (
+        CheckerApp.get_nearest_appointment_offset(appointments, today=today) == expected
+    )
+
+
+@pytest.mark.parametrize("limit_days", [None, 0, 1, 2, 5, 30, -1])
+@pytest.mark.parametrize("day_offsets", [[], [-1], [0], [1, 7], [4], [-3, 29]])
+def test_offset_matches_reference(limit_days: int | None, day_offsets: list[int]):
+    today = CheckerApp.get_spb_today()
+    appointments = [
+        make_appointment(today + datetime.timedelta(days=offset))
+        for offset in day_offsets
+    ]
+    user = DbUser(id=1, limit_days=limit_days)
+    reference = CheckerApp.check_appointments_in_user_limit_days(
+        appointments=appointments, user=user
+    )
+    nearest_offset = CheckerApp.get_nearest_appointment_offset(appointments)
+    # пользователи без лимита оповещаются всегда, для них результат не важен
+    if limit_days:
+        assert (
+            CheckerApp.is_offset_in_user_limit_days(nearest_offset, user) == reference
+        )
+    else:
+        assert CheckerApp.is_offset_in_user_limit_days(nearest_offset, user)
@@ -0,0 +1,89 @@
+import datetime
+
+from core.appointment_snapshots import AppointmentSnapshots
+from gorzdrav.models import ApiAppointment
+from models.pydantic_models import DbUser
+
+VISIT = datetime.datetime(2026, 1, 10, 9, 0)
+
+
+def make_appointment(appointment_id: str) -> ApiAppointment:
+    return ApiAppointment(
+        id=appointment_id,
+        visitStart=VISIT,
+        visitEnd=VISIT + datetime.timedelta(minutes=15),
+        number=None,
+        room=None,
+    )
+
+
+class FakeToday:
+    def __init__(self):
+        self.date = datetime.date(2026, 1, 1)
+
+    def __call__(self) -> datetime.date:
+        return self.date
+
+
+def test_first_update_is_changed():
+    snapshots = AppointmentSnapshots()
+    diff = snapshots.update("doc", [make_appointment("1")])
+    assert diff.changed
+    assert diff.is_first
+    assert list(diff.added) == ["1"]
+
+
+def test_diff_added_and_removed():
+    snapshots = AppointmentSnapshots()
+    snapshots.update("doc", [make_appointment("1"), make_appointment("2")])
+    diff = snapshots.update("doc", [make_appointment("2"), make_appointment("3")])
+    assert diff.changed
+    assert list(diff.added) == ["3"]
+    assert list(diff.removed) == ["1"]
+    assert not snapshots.update(
+        "doc", [make_appointment("3"), make_appointment("2")]
+    ).changed
+
+
+def test_unmatched_users_skipped_until_change():
+    today = FakeToday()
+    snapshots = AppointmentSnapshots(today=today)
+    users = [DbUser(id=1, limit_days=1), DbUser(id=2, limit_days=1)]
+    snapshots.update("doc", [make_appointment("1")])
+    snapshots.mark_unmatched("doc", users[:1])
+    assert not snapshots.update("doc", [make_appointment("1")]).changed
+    assert [user.id for user in snapshots.filter_users("doc", users)] == [2]
+    # на следующий день назначения могли попасть в лимит дней
+    today.date += datetime.timedelta(days=1)
+    assert len(snapshots.filter_users("doc", users)) == 2
+    snapshots.mark_unmatched("doc", users[:1])
+    # новые назначения сбрасывают пропущенных пользователей
+    snapshots.update("doc", [make_appointment("2")])
+    assert len(snapshots.filter_users("doc", users)) == 2
+
+
+def test_unmatched_user_rechecked_after_limit_change():
+    snapshots = AppointmentSnapshots(today=FakeToday())
+    snapshots.update("doc", [make_appointment("1")])
+    snapshots.mark_unmatched("doc", [DbUser(id=1, limit_days=1)])
+    assert snapshots.filter_users("doc", [DbUser(id=1, limit_days=1)]) == []
+    # пользователь увеличил лимит дней, назначения не изменились
+    assert not snapshots.update("doc", [make_appointment("1")]).changed
+    users = [DbUser(id=1, limit_days=14)]
+    assert snapshots.filter_users("doc", users) == users
+
+
+def test_stats_and_retain():
+    snapshots = AppointmentSnapshots()
+    snapshots.update("a", [make_appointment("1")])
+    snapshots.update("b", [])
+    snapshots.update("a", [make_appointment("1")])
+    assert snapshots.pop_stats() == {
+        "doctors": 3,
+        "changed": 2,
+        "added": 1,
+        "removed": 0,
+    }
+    assert snapshots.pop_stats()["doctors"] == 0
+    snapshots.retain(["b"])
+    assert len(snapshots) == 1
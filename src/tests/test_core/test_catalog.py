@@ -0,0 +1,238 @@
+import pytest
+
+from benchmarks.gorzdrav_stub import StubData
+from core.catalog import CatalogMirror, CatalogSync
+from db.sqlite_db import SqliteDb
+from gorzdrav import exceptions
+from gorzdrav.models import ApiDistrict, ApiDoctor, ApiLPU, ApiSpecialty
+from keyboard_service import KeyboardService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeApi:
+    """Справочники горздрава из StubData без http, считает запросы"""
+
+    def __init__(self, data: StubData):
+        self.data = data
+        self.calls: dict[str, int] = {}
+        self.failing_lpus: set[int] = set()
+        self.failing_doctors_lpus: set[int] = set()
+
+    def __count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get_districts(self) -> list[ApiDistrict]:
+        self.__count("districts")
+        return [ApiDistrict(**d) for d in self.data.get_districts()]
+
+    def iter_lpus(self, districtId: str | None = None, use_cache: bool = True):
+        self.__count("lpus")
+        for lpu in self.data.get_lpus(districtId=districtId):
+            yield ApiLPU(**lpu)
+
+    def get_lpu(self, lpuId: int) -> ApiLPU:
+        self.__count("lpu")
+        return ApiLPU(**self.data.get_lpu(lpuId))
+
+    def get_specialties(self, lpuId: int, use_cache: bool = True):
+        self.__count("specialties")
+        if lpuId in self.failing_lpus:
+            raise exceptions.GorzdravException(message="Не отвечает", errorCode=602)
+        return [ApiSpecialty(**s) for s in self.data.get_specialties(lpuId)]
+
+    def get_doctors(self, lpuId: int, specialtyId: str) -> list[ApiDoctor]:
+        self.__count("doctors")
+        if lpuId in self.failing_doctors_lpus:
+            raise exceptions.GorzdravException(message="Не отвечает", errorCode=602)
+        return [ApiDoctor(**d) for d in self.data.get_doctors(lpuId, int(specialtyId))]
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def api() -> FakeApi:
+    return FakeApi(
+        StubData(
+            seed=1, districts=2, lpus=4, specialties_per_lpu=2, doctors_per_specialty=3
+        )
+    )
+
+
+@pytest.fixture
+def db(tmp_path) -> SqliteDb:
+    return SqliteDb(str(tmp_path / "catalog.db"))
+
+
+def test_mirror_reads_through(db: SqliteDb, api: FakeApi, clock: FakeClock):
+    mirror = CatalogMirror(db=db, max_age_secs=60, api=api, clock=clock)
+    for _ in range(2):
+        districts = mirror.get_districts()
+        lpus = mirror.get_lpus(districtId="1")
+        lpu = mirror.get_lpu(lpuId=lpus[0].id)
+        specialties = mirror.get_specialties(lpuId=lpu.id)
+        doctors = mirror.get_doctors(lpuId=lpu.id, specialtyId=specialties[0].id)
+    assert api.calls == {"districts": 1, "lpus": 1, "specialties": 1, "doctors": 1}
+
+    assert [d.id for d in districts] == ["1", "2"]
+    assert lpus == [ApiLPU(**lpu) for lpu in api.data.get_lpus(districtId="1")]
+    assert specialties == [ApiSpecialty(**s) for s in api.data.get_specialties(lpu.id)]
+    assert doctors == [ApiDoctor(**d) for d in api.data.get_doctors(lpu.id, 0)]
+
+    clock.now += 61
+    mirror.get_districts()
+    mirror.get_lpu(lpuId=lpu.id)
+    assert api.calls["districts"] == 2
+    assert api.calls["lpu"] == 1
+    assert db.get_catalog_version("districts") == 2
+
+
+def test_live_doctors(db: SqliteDb, api: FakeApi, clock: FakeClock):
+    mirror = CatalogMirror(db=db, max_age_secs=60, api=api, clock=clock)
+    api.failing_doctors_lpus.add(1)
+    # копии ещё нет, ошибку горздрава видит пользователь
+    with pytest.raises(exceptions.GorzdravExceptionBase):
+        mirror.get_live_doctors(lpuId=1, specialtyId="0")
+
+    api.failing_doctors_lpus.clear()
+    expected = [ApiDoctor(**d) for d in api.data.get_doctors(1, 0)]
+    for _ in range(2):
+        # количество мест каждый раз запрашивается у горздрава
+        assert mirror.get_live_doctors(lpuId=1, specialtyId="0") == (expected, True)
+    assert api.calls["doctors"] == 3
+    assert db.get_catalog_doctors(1, "0") == expected
+
+    # горздрав не ответил: врачи из копии, количество мест не актуально
+    api.failing_doctors_lpus.add(1)
+    assert mirror.get_live_doctors(lpuId=1, specialtyId="0") == (expected, False)
+    # устаревшее количество мест не показывается на кнопках
+    button, *_ = KeyboardService.get_doctor_buttons(expected, show_counts=False)
+    assert button.text == expected[0].name
+    button, *_ = KeyboardService.get_doctor_buttons(expected)
+    assert button.text.startswith(
+        f"[{expected[0].freeParticipantCount}:{expected[0].freeTicketCount}]"
+    )
+
+
+def test_sync_fills_catalog(db: SqliteDb, api: FakeApi, clock: FakeClock):
+    sync = CatalogSync(db=db, concurrency=3, refresh_secs=60, api=api, clock=clock)
+    stats = sync.run_once()
+    assert stats == {
+        "districts": 1,
+        "lpus": 2,
+        "specialties": 4,
+        "doctors": 8,
+        "failed": 0,
+    }
+
+    # справочник свежий, бот не ходит в горздрав
+    mirror = CatalogMirror(db=db, max_age_secs=120, api=None, clock=clock)
+    lpus = mirror.get_lpus(districtId="2")
+    assert [lpu.id for lpu in lpus] == [1, 3]
+    assert len(mirror.get_doctors(lpuId=3, specialtyId="1")) == 3
+
+    # свежие записи не запрашиваются повторно
+    calls = dict(api.calls)
+    assert sum(sync.run_once().values()) == 0
+    assert api.calls == calls
+
+
+def test_sync_keeps_old_records_on_error(db: SqliteDb, api: FakeApi, clock: FakeClock):
+    sync = CatalogSync(db=db, concurrency=2, refresh_secs=60, api=api, clock=clock)
+    sync.run_once()
+    old_specialties = db.get_catalog_specialties(lpuId=2)
+
+    clock.now += 61
+    api.failing_lpus.add(2)
+    stats = sync.run_once()
+    assert stats["failed"] == 1
+    assert stats["specialties"] == 3
+    assert db.get_catalog_specialties(lpuId=2) == old_specialties
+    assert db.get_catalog_synced_at("specialties")["2"] == 1000.0
+    assert db.get_catalog_version("specialties", "1") == 2
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Иванов терапевт", '"Иванов" "терапевт"'),
+        ('ива"нов', '"ива" "нов"'),
+        ("  а, бв ", None),
+    ],
+)
+def test_get_match_query(text: str, expected: str | None):
+    assert CatalogMirror.get_match_query(text) == expected
+
+
+def test_search_doctors(db: SqliteDb, api: FakeApi, clock: FakeClock):
+    CatalogSync(db=db, concurrency=2, refresh_secs=60, api=api, clock=clock).run_once()
+    mirror = CatalogMirror(db=db, max_age_secs=60, api=None, clock=clock)
+
+    (doctor,) = mirror.search_doctors("врач 3-1-2", limit=10)
+    assert doctor.doctorName == "Врач 3-1-2"
+    assert doctor.districtId == "2"
+    assert (doctor.lpuId, doctor.specialtyId, doctor.doctorId) == (3, "1", "1002")
+    assert doctor.specialtyName == "Специальность 1"
+    assert doctor.lpuFullName == "Поликлиника №3"
+
+    # поиск по части слова без учёта регистра, по специальности и медучреждению
+    assert len(mirror.search_doctors("ЦИАЛЬНОСТЬ поликлиника", limit=100)) == 24
+    assert len(mirror.search_doctors("врач", limit=5)) == 5
+    assert mirror.search_doctors("ив", limit=5) == []
+
+    # индекс обновляется вместе с врачами
+    db.save_catalog_doctors(3, "1", [], now=clock())
+    assert mirror.search_doctors("врач 3-1", limit=10) == []
+
+
+def test_search_doctors_name_first(db: SqliteDb, clock: FakeClock):
+    mirror = CatalogMirror(db=db, max_age_secs=60, api=None, clock=clock)
+    db.save_catalog_lpus("1", [ApiLPU(id=1, lpuFullName="Поликлиника")], clock())
+    db.save_catalog_specialties(1, [ApiSpecialty(id="1", name="Терапевт")], clock())
+    doctors = [
+        ApiDoctor(id=str(i), name=name, lastDate=None, nearestDate=None)
+        for i, name in enumerate(["Смирнова", "Петров", "Терапевтова"])
+    ]
+    db.save_catalog_doctors(1, "1", doctors, clock())
+    found = mirror.search_doctors("терапевт", limit=10)
+    assert [doctor.doctorName for doctor in found][0] == "Терапевтова"
+    assert len(found) == 3
+    # сортировка до LIMIT: врач по фамилии не теряется за первыми совпадениями
+    (doctor,) = mirror.search_doctors("терапевт", limit=1)
+    assert doctor.doctorName == "Терапевтова"
+
+
+def test_found_doctor_callback(db: SqliteDb, clock: FakeClock):
+    mirror = CatalogMirror(db=db, max_age_secs=60, api=None, clock=clock)
+    specialty_id = "5c1d6e3a-8f0b-4a27-9d55-7e2f1b0c9a14"
+    doctor_id = "0f8e2b7c-4d19-4c6a-b3e1-52a9d7f6c081"
+    db.save_catalog_lpus("17", [ApiLPU(id=1234, lpuFullName="Поликлиника")], clock())
+    db.save_catalog_specialties(1234, [ApiSpecialty(id=specialty_id)], clock())
+    db.save_catalog_doctors(
+        1234,
+        specialty_id,
+        [ApiDoctor(id=doctor_id, name="Врач", lastDate=None, nearestDate=None)],
+        clock(),
+    )
+    (found,) = mirror.search_doctors("врач", limit=10)
+
+    callback = KeyboardService.get_found_doctor_callback(found)
+    assert len(callback.encode()) <= 64
+    _, lpu_id, doctor_hash = callback.split("/")
+    doctor = mirror.get_found_doctor(lpuId=int(lpu_id), doctor_hash=doctor_hash)
+    assert doctor is not None
+    assert (doctor.districtId, doctor.lpuId) == ("17", 1234)
+    assert (doctor.specialtyId, doctor.doctorId) == (specialty_id, doctor_id)
+
+    # врача удалили из справочника после поиска
+    db.save_catalog_doctors(1234, specialty_id, [], clock())
+    assert mirror.get_found_doctor(lpuId=1234, doctor_hash=doctor_hash) is None
@@ -0,0 +1,90 @@
+import asyncio
+import shutil
+import sqlite3
+
+import pytest
+
+import checker
+from benchmarks.bench_checker import create_db, run_child
+from benchmarks.gorzdrav_stub import GorzdravStub, StubData
+from db.sqlite_db import SqliteDb
+
+
+def test_async_checker_sends_same_notifications(tmp_path):
+    """Асинхронный чекер оповещает тех же пользователей теми же сообщениями"""
+    stub = GorzdravStub(
+        data=StubData(
+            seed=3,
+            lpus=5,
+            specialties_per_lpu=3,
+            doctors_per_specialty=4,
+            free_ratio=0.5,
+        )
+    ).start()
+    sent: dict[str, list[tuple[str, str]]] = {}
+    try:
+        db_path = str(tmp_path / "checker.db")
+        create_db(db_path=db_path, size=60, data=stub.data)
+        db = SqliteDb(db_path)
+        # у части пользователей лимит дней: чекер запрашивает назначения
+        for user_id in range(1, 61, 2):
+            db.set_limit_days(user_id=user_id, limit_days=user_id % 10 + 1)
+        db.close()
+        for mode in ("sync", "async"):
+            mode_db_path = str(tmp_path / f"{mode}.db")
+            shutil.copy(db_path, mode_db_path)
+            stub.reset_counters()
+            run_child(stub=stub, db_path=mode_db_path, mode=mode, keep_limits=False)
+            sent[mode] = sorted(stub.tg_sent)
+    finally:
+        stub.stop()
+    assert len(sent["sync"]) > 5
+    assert sent["async"] == sent["sync"]
+
+
+class StopScheduler(BaseException):
+    """Останавливает бесконечный цикл проверки в тесте"""
+
+
+def test_async_scheduler_survives_failed_cycle(monkeypatch):
+    cycles: list[int] = []
+    real_sleep = asyncio.sleep
+
+    async def failing_checker(client):
+        cycles.append(len(cycles))
+        raise sqlite3.OperationalError("database is locked")
+
+    async def sleep(secs: float):
+        if secs == 123 and len(cycles) == 2:
+            raise StopScheduler()
+        await real_sleep(0)
+
+    monkeypatch.setattr(checker, "inactivate_old_users", lambda: None)
+    monkeypatch.setattr(checker, "async_sql_checker", failing_checker)
+    monkeypatch.setattr(checker.asyncio, "sleep", sleep)
+    with pytest.raises(StopScheduler):
+        asyncio.run(checker._async_scheduler_loop(timeout_secs=123))
+    # после упавшего цикла проверка продолжилась
+    assert cycles == [0, 1]
+
+
+def test_priority_scheduler_survives_failed_iteration(monkeypatch):
+    loads: list[int] = []
+
+    def get_own_active_doctors():
+        loads.append(len(loads))
+        if len(loads) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return {}
+
+    def sleep(secs: float):
+        if len(loads) == 2:
+            raise StopScheduler()
+
+    monkeypatch.setattr(checker, "inactivate_old_users", lambda: None)
+    monkeypatch.setattr(checker, "get_own_active_doctors", get_own_active_doctors)
+    monkeypatch.setattr(checker.time, "sleep", sleep)
+    with pytest.raises(StopScheduler):
+        checker.priority_scheduler(timeout_secs=0)
+    # список врачей перечитан после ошибки
+    assert loads == [0, 1]
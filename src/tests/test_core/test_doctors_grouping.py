@@ -0,0 +1,96 @@
+import pytest
+
+from core.checker_app import CheckerApp
+from gorzdrav.models import ApiSpecialty
+from models.pydantic_models import DbDoctorWithUsers, DbUser
+
+
+def make_doctor(lpuId: int, specialtyId: str, doctorId: str) -> DbDoctorWithUsers:
+    return DbDoctorWithUsers(
+        id=f"{lpuId}_{specialtyId}_{doctorId}",
+        districtId="1",
+        lpuId=lpuId,
+        specialtyId=specialtyId,
+        doctorId=doctorId,
+        pinging_users=[DbUser(id=1, ping_status=True)],
+    )
+
+
+def test_group_empty():
+    assert CheckerApp.group_doctors_by_specialty([]) == {}
+
+
+@pytest.mark.parametrize(
+    "doctors_params, expected_groups",
+    [
+        ([(1, "1", "a")], {(1, "1"): 1}),
+        ([(1, "1", "a"), (1, "1", "b"), (1, "1", "c")], {(1, "1"): 3}),
+        (
+            [(1, "1", "a"), (1, "2", "a"), (2, "1", "a")],
+            {(1, "1"): 1, (1, "2"): 1, (2, "1"): 1},
+        ),
+        ([(1, "1", "a"), (2, "1", "b"), (1, "1", "c")], {(1, "1"): 2, (2, "1"): 1}),
+    ],
+)
+def test_group_doctors_by_specialty(
+    doctors_params: list[tuple[int, str, str]],
+    expected_groups: dict[tuple[int, str], int],
+):
+    doctors = [make_doctor(*params) for params in doctors_params]
+    groups = CheckerApp.group_doctors_by_specialty(doctors)
+    assert {key: len(value) for key, value in groups.items()} == expected_groups
+    for (lpuId, specialtyId), group_doctors in groups.items():
+        for doctor in group_doctors:
+            assert doctor.lpuId == lpuId
+            assert doctor.specialtyId == specialtyId
+
+
+def test_iter_lpu_doctors_groups():
+    params = [(1, "1", "a"), (1, "2", "b"), (1, "1", "c"), (2, "1", "d"), (3, "1", "e")]
+    consumed: list[str] = []
+
+    def doctors():
+        for doctor in map(lambda p: make_doctor(*p), params):
+            consumed.append(doctor.doctorId)
+            yield doctor
+
+    lpus = CheckerApp.iter_lpu_doctors_groups(doctors())
+    lpuId, groups = next(lpus)
+    assert lpuId == 1
+    assert {key: len(value) for key, value in groups.items()} == {
+        (1, "1"): 2,
+        (1, "2"): 1,
+    }
+    # прочитан только первый врач следующего медучреждения
+    assert consumed == ["a", "b", "c", "d"]
+    assert [lpuId for lpuId, _ in lpus] == [2, 3]
+
+
+def make_specialty(specialtyId: str, free: int | None) -> ApiSpecialty:
+    return ApiSpecialty(id=specialtyId, countFreeParticipant=free)
+
+
+def test_prune_sold_out_specialties():
+    doctors = [
+        make_doctor(1, "1", "a"),
+        make_doctor(1, "2", "b"),
+        make_doctor(1, "3", "c"),
+        make_doctor(1, "4", "d"),
+        make_doctor(2, "1", "e"),
+    ]
+    groups = CheckerApp.group_doctors_by_specialty(doctors)
+    specialties_by_lpu = {
+        1: [
+            make_specialty("1", 0),
+            make_specialty("2", 5),
+            make_specialty("3", None),
+        ],
+    }
+    pruned = CheckerApp.prune_doctors_groups(groups, specialties_by_lpu)
+    # "4" нет в списке специальностей, у lpu 2 специальности неизвестны
+    assert set(pruned) == {(1, "2"), (1, "3"), (1, "4"), (2, "1")}
+
+
+def test_prune_without_specialties():
+    groups = CheckerApp.group_doctors_by_specialty([make_doctor(1, "1", "a")])
+    assert CheckerApp.prune_doctors_groups(groups, {}) == groups
@@ -0,0 +1,70 @@
+import urllib.request
+
+import pytest
+
+from core.metrics import MetricsRegistry, start_metrics_server
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_counter_and_gauge(registry: MetricsRegistry):
+    counter = registry.counter("sent_total", "sent", labels=("status",))
+    counter.inc(status="ok")
+    counter.inc(2, status="ok")
+    counter.inc(status='bad "one"')
+    gauge = registry.gauge("doctors", "doctors")
+    gauge.set(5)
+    text = registry.render()
+    assert "# TYPE sent_total counter" in text
+    assert 'sent_total{status="ok"} 3' in text
+    assert 'sent_total{status="bad \\"one\\""} 1' in text
+    assert "doctors 5" in text
+    with pytest.raises(ValueError):
+        counter.inc(-1, status="ok")
+    with pytest.raises(ValueError):
+        counter.inc(other="ok")
+
+
+def test_function_gauge(registry: MetricsRegistry):
+    values = iter([1.5, 2.5])
+    gauge = registry.gauge("since", "since")
+    gauge.set_function(lambda: next(values))
+    assert "since 1.5" in registry.render()
+    assert "since 2.5" in registry.render()
+
+
+def test_histogram(registry: MetricsRegistry):
+    histogram = registry.histogram(
+        "latency", "latency", labels=("endpoint",), buckets=(0.1, 1.0)
+    )
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, endpoint="/a")
+    text = registry.render()
+    assert 'latency_bucket{endpoint="/a",le="0.1"} 2' in text
+    assert 'latency_bucket{endpoint="/a",le="1"} 3' in text
+    assert 'latency_bucket{endpoint="/a",le="+Inf"} 4' in text
+    assert 'latency_count{endpoint="/a"} 4' in text
+    assert 'latency_sum{endpoint="/a"} 3.65' in text
+    assert histogram.get_count(endpoint="/a") == 4
+
+
+def test_duplicate_metric(registry: MetricsRegistry):
+    registry.counter("a", "a")
+    with pytest.raises(ValueError):
+        registry.gauge("a", "a")
+
+
+def test_metrics_server(registry: MetricsRegistry):
+    registry.gauge("up", "up").set(1)
+    server = start_metrics_server(port=0, metrics_registry=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.status == 200
+            assert "up 1" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from core.profiling import CycleProfiler, PhaseTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_nested_phases_are_exclusive():
+    clock = FakeClock()
+    timer = PhaseTimer(clock=clock)
+    with timer.phase("api_fetch"):
+        clock.now += 1.0
+        with timer.phase("parsing"):
+            clock.now += 0.25
+        clock.now += 0.5
+    with timer.phase("parsing"):
+        clock.now += 0.25
+    assert timer.pop_totals() == {
+        "api_fetch": pytest.approx(1.5),
+        "parsing": pytest.approx(0.5),
+    }
+    assert timer.pop_totals() == {}
+
+
+def test_phase_counted_on_exception():
+    clock = FakeClock()
+    timer = PhaseTimer(clock=clock)
+    with pytest.raises(RuntimeError):
+        with timer.phase("db_write"):
+            clock.now += 2
+            raise RuntimeError
+    assert timer.pop_totals() == {"db_write": pytest.approx(2)}
+
+
+def test_profiles_are_rotated(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path), keep=2)
+    paths = []
+    for _ in range(4):
+        profiler.start()
+        sum(range(1000))
+        paths.append(profiler.stop())
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(path) for path in paths[-2:]
+    )
+
+
+def test_max_cycles(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path), keep=5, max_cycles=1)
+    profiler.start()
+    assert profiler.stop() is not None
+    profiler.start()
+    assert profiler.stop() is None
+    assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,111 @@
+import pytest
+
+from core.rate_limiter import AdaptiveRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_bucket_burst(clock: FakeClock):
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+
+
+def test_bucket_refill(clock: FakeClock):
+    bucket = TokenBucket(rate=2.0, capacity=1, clock=clock)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    clock.now = 10.0
+    # после долгой паузы в ведре не больше capacity токенов
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 1), (-1, 1), (1, 0.5)])
+def test_bucket_invalid(rate: float, capacity: float):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=capacity)
+
+
+def test_limiter_keys_independent(clock: FakeClock):
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1.0, min_rate=0.1, max_rate=2.0, clock=clock
+    )
+    assert limiter.reserve("schedule/1") == 0.0
+    assert limiter.reserve("schedule/2") == 0.0
+    assert limiter.reserve("schedule/1") == pytest.approx(1.0)
+
+
+def test_limiter_global_rate(clock: FakeClock):
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1.0, min_rate=0.1, max_rate=2.0, global_rate=1.0, clock=clock
+    )
+    assert limiter.reserve("schedule/1") == 0.0
+    assert limiter.reserve("schedule/2") == pytest.approx(1.0)
+
+
+def test_limiter_adapts(clock: FakeClock):
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1.0,
+        min_rate=0.25,
+        max_rate=1.5,
+        increase_step=0.25,
+        decrease_factor=0.5,
+        clock=clock,
+    )
+    key = "schedule/1"
+    limiter.on_throttle(key)
+    assert limiter.get_rate(key) == pytest.approx(0.5)
+    assert limiter.reserve(key) == pytest.approx(2.0)
+    limiter.on_throttle(key)
+    limiter.on_throttle(key)
+    assert limiter.get_rate(key) == pytest.approx(0.25)
+    assert limiter.get_slowed_down() == {key: pytest.approx(0.25)}
+
+    for _ in range(10):
+        limiter.on_success(key)
+    assert limiter.get_rate(key) == pytest.approx(1.5)
+    assert limiter.get_slowed_down() == {}
+    assert limiter.get_rates() == {key: pytest.approx(1.5)}
+
+
+def test_limiter_prunes_idle_buckets(clock: FakeClock):
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1.0, min_rate=0.1, max_rate=2.0, clock=clock, idle_secs=60
+    )
+    limiter.reserve("chat/1")
+    limiter.reserve("chat/2")
+    limiter.reserve("chat/2")
+    # второе ведро наполнится только через секунду после первого
+    clock.now = 61.0
+    limiter.reserve("chat/3")
+    assert len(limiter) == 2
+    assert limiter.get_rates().keys() == {"chat/2", "chat/3"}
+
+    clock.now = 130.0
+    limiter.reserve("chat/4")
+    assert limiter.get_rates().keys() == {"chat/4"}
+    # удалённый ключ получает новое полное ведро
+    assert limiter.reserve("chat/1") == 0.0
+
+
+def test_limiter_keeps_buckets_without_idle_secs(clock: FakeClock):
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1.0, min_rate=0.1, max_rate=2.0, clock=clock
+    )
+    for i in range(10):
+        clock.now += 1000
+        limiter.reserve(f"chat/{i}")
+    assert len(limiter) == 10
@@ -0,0 +1,89 @@
+import pytest
+
+from core.scheduler import PriorityScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def make_scheduler(clock: FakeClock, rpm: float = 600) -> PriorityScheduler:
+    return PriorityScheduler(
+        requests_per_minute=rpm,
+        min_interval_secs=5,
+        max_interval_secs=300,
+        clock=clock,
+    )
+
+
+def test_new_doctors_are_due_immediately(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"a": 1, "b": 2})
+    assert sorted(scheduler.pop_due()) == ["a", "b"]
+    # до отчёта врачи не выдаются повторно
+    assert scheduler.pop_due() == []
+
+
+def test_popular_doctor_checked_more_often(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"popular": 16, "lonely": 1})
+    for doctor_id in scheduler.pop_due():
+        scheduler.report(doctor_id, had_free_places=False)
+    intervals = scheduler.get_intervals()
+    assert intervals["popular"] < intervals["lonely"]
+
+
+def test_volatile_doctor_checked_more_often(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"volatile": 1, "stable": 1})
+    for _ in range(5):
+        clock.now += 300
+        for doctor_id in scheduler.pop_due():
+            scheduler.report(doctor_id, had_free_places=doctor_id == "volatile")
+    intervals = scheduler.get_intervals()
+    assert intervals["volatile"] < intervals["stable"]
+
+
+def test_intervals_within_bounds(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"a": 1000})
+    clock.now = 3600 * 24 * 30
+    scheduler.pop_due()
+    scheduler.report("a", had_free_places=True)
+    assert scheduler.get_intervals()["a"] == pytest.approx(5)
+
+
+def test_budget_stretches_intervals(clock: FakeClock):
+    scheduler = make_scheduler(clock, rpm=1)
+    scheduler.update_doctors({str(i): 1 for i in range(10)})
+    assert scheduler.budget_scale > 1
+    for doctor_id in scheduler.pop_due():
+        scheduler.report(doctor_id, had_free_places=False)
+    demand = sum(60 / interval for interval in scheduler.get_intervals().values())
+    assert demand <= 1 + 1e-9
+
+
+def test_failed_check_does_not_change_stats(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"a": 1})
+    scheduler.pop_due()
+    scheduler.report("a", had_free_places=None)
+    assert scheduler.pop_due() == []
+    assert scheduler.next_due_in() == pytest.approx(scheduler.get_intervals()["a"])
+
+
+def test_removed_doctors_are_pruned(clock: FakeClock):
+    scheduler = make_scheduler(clock)
+    scheduler.update_doctors({"a": 1, "b": 1})
+    scheduler.update_doctors({"b": 1})
+    assert len(scheduler) == 1
+    assert scheduler.pop_due() == ["b"]
@@ -0,0 +1,192 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.shard_leases import ShardLeases
+from db.sqlite_db import SqliteDb
+from models.pydantic_models import DbDoctorWithUsers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / "leases.db")
+
+
+def make_worker(db_path: str, worker_id: str, clock: FakeClock) -> ShardLeases:
+    # у каждого воркера своё соединение, как у отдельного процесса
+    return ShardLeases(
+        db=SqliteDb(db_path),
+        shards_count=8,
+        lease_secs=60,
+        worker_id=worker_id,
+        clock=clock,
+    )
+
+
+def test_single_worker_owns_all(db_path: str, clock: FakeClock):
+    worker = make_worker(db_path, "a", clock)
+    assert worker.refresh() == set(range(8))
+
+
+def test_workers_split_shards(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    b = make_worker(db_path, "b", clock)
+    a.refresh()
+    # b видит, что всё занято, но регистрируется
+    b.refresh()
+    # a отпускает лишнее, b забирает
+    a.refresh()
+    b.refresh()
+    assert len(a.shards) == 4
+    assert len(b.shards) == 4
+    assert a.shards.isdisjoint(b.shards)
+    # повторные продления ничего не меняют
+    assert a.refresh() | b.refresh() == set(range(8))
+
+
+def test_crashed_worker_shards_taken_over(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    b = make_worker(db_path, "b", clock)
+    for worker in (a, b, a, b):
+        worker.refresh()
+    # a упал и не продлевает аренду
+    clock.now += 30
+    assert len(b.refresh()) == 4
+    clock.now += 31
+    assert b.refresh() == set(range(8))
+
+
+def test_release(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    b = make_worker(db_path, "b", clock)
+    for worker in (a, b, a, b):
+        worker.refresh()
+    a.release()
+    assert b.refresh() == set(range(8))
+
+
+def test_filter_doctors(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    a.shards = {ShardLeases.get_shard(lpuId=1, shards_count=8)}
+    doctors = {
+        f"{lpuId}": DbDoctorWithUsers(
+            id=f"{lpuId}",
+            districtId="1",
+            lpuId=lpuId,
+            specialtyId="1",
+            doctorId="1",
+            pinging_users=[],
+        )
+        for lpuId in range(1, 50)
+    }
+    own = a.filter_doctors(doctors)
+    assert "1" in own
+    assert all(
+        ShardLeases.get_shard(doctor.lpuId, 8) in a.shards for doctor in own.values()
+    )
+
+
+def test_owns_renews_lease_during_long_cycle(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    b = make_worker(db_path, "b", clock)
+    shard = ShardLeases.get_shard(lpuId=1, shards_count=8)
+    # цикл a идёт дольше аренды, a продлевает её перед каждым медучреждением,
+    # медучреждение никогда не проверяют оба воркера
+    for _ in range(10):
+        clock.now += 25
+        a_owns = a.owns(lpuId=1)
+        b.refresh()
+        assert not (a_owns and shard in b.shards)
+    assert len(a.shards) == 4
+    assert a.shards.isdisjoint(b.shards)
+
+
+def test_owns_drops_taken_shards(db_path: str, clock: FakeClock):
+    a = make_worker(db_path, "a", clock)
+    b = make_worker(db_path, "b", clock)
+    assert a.owns(lpuId=1)
+    # a завис дольше аренды, его шарды забрал b
+    clock.now += 61
+    assert b.refresh() == set(range(8))
+    assert not a.owns(lpuId=1)
+    assert a.shards == set()
+
+
+def test_owns_until_lease_expires_when_renew_fails(
+    db_path: str, clock: FakeClock, monkeypatch
+):
+    a = make_worker(db_path, "a", clock)
+    assert a.owns(lpuId=1)
+
+    def fail(**kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(a.db, "acquire_checker_shards", fail)
+    clock.now += 30
+    assert a.owns(lpuId=1)
+    clock.now += 30
+    assert not a.owns(lpuId=1)
+
+
+def test_renew_secs_validation(db_path: str):
+    with pytest.raises(ValueError):
+        ShardLeases(db=SqliteDb(db_path), shards_count=8, lease_secs=60, renew_secs=60)
+
+
+def test_restarted_worker_takes_back_its_shards(db_path: str, clock: FakeClock):
+    def start(worker_index: int) -> ShardLeases:
+        return ShardLeases(
+            db=SqliteDb(db_path),
+            shards_count=8,
+            lease_secs=60,
+            clock=clock,
+            worker_index=worker_index,
+        )
+
+    a, b = start(0), start(1)
+    for worker in (a, b, a, b):
+        worker.refresh()
+    # процесс воркера 0 убит без release и сразу запущен заново
+    clock.now += 1
+    restarted = start(0)
+    assert restarted.worker_id == a.worker_id
+    assert restarted.refresh() == a.shards
+    assert len(restarted.shards) == 4
+    assert b.refresh().isdisjoint(restarted.shards)
+
+
+def test_owns_renews_once_from_many_threads(
+    db_path: str, clock: FakeClock, monkeypatch
+):
+    a = make_worker(db_path, "a", clock)
+    a.refresh()
+    calls: list[float] = []
+    acquire = a.db.acquire_checker_shards
+
+    def slow_acquire(**kwargs):
+        calls.append(kwargs["now"])
+        time.sleep(0.05)
+        return acquire(**kwargs)
+
+    monkeypatch.setattr(a.db, "acquire_checker_shards", slow_acquire)
+    clock.now += 30
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        owned = list(executor.map(lambda lpuId: a.owns(lpuId), range(16)))
+    # аренду продлил один поток, остальные дождались его результата
+    assert len(calls) == 1
+    assert owned == [a.is_own(lpuId) for lpuId in range(16)]
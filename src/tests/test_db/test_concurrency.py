@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from db.sqlite_db import SqliteDb
+from gorzdrav.models import ApiDoctor
+from models import pydantic_models
+
+THREADS = 8
+ITERATIONS = 100
+
+
+def bot_worker(db: SqliteDb, thread_index: int, errors: list[Exception]) -> None:
+    """Действия обработчиков бота: профиль, выбор врача, включение проверки"""
+    try:
+        for i in range(ITERATIONS):
+            user_id = thread_index * ITERATIONS + i
+            db.add_user(pydantic_models.DbUser(id=user_id))
+            doctor_id = db.add_doctor(
+                pydantic_models.DbDoctorToCreate(
+                    districtId="1",
+                    lpuId=i % 10,
+                    specialtyId=str(thread_index),
+                    doctorId=str(i),
+                )
+            )
+            db.add_user_doctor(user_id=user_id, doctor_id=doctor_id)
+            db.set_user_ping_status(user_id=user_id, ping_status=True)
+            assert db.get_user_doctor(user_id=user_id) is not None
+            db.update_user_time(user_id=user_id)
+            db.save_catalog_doctors(
+                lpuId=i % 10,
+                specialtyId=str(thread_index),
+                doctors=[
+                    ApiDoctor(id=str(i), name="Врач", lastDate=None, nearestDate=None)
+                ],
+                now=float(i),
+            )
+    except Exception as e:
+        errors.append(e)
+
+
+def checker_worker(db: SqliteDb) -> None:
+    """Цикл чекера в отдельном процессе с унаследованным после fork SqliteDb"""
+    try:
+        for i in range(ITERATIONS):
+            db.acquire_checker_shards(
+                worker_id="checker", shards_count=4, lease_secs=60, now=float(i)
+            )
+            doctors = db.get_active_doctors_joined_users()
+            user_ids = [
+                user.id
+                for doctor in doctors.values()
+                for user in doctor.pinging_users[:1]
+            ]
+            db.set_users_ping_status(user_ids=user_ids, ping_status=False)
+    except sqlite3.Error:
+        os._exit(1)
+    os._exit(0)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+@pytest.mark.filterwarnings("ignore:The default datetime adapter")
+def test_bot_threads_and_checker_process_write_together(tmp_path):
+    db = SqliteDb(str(tmp_path / "stress.db"))
+    assert db.connection.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+
+    checker = multiprocessing.get_context("fork").Process(
+        target=checker_worker, args=(db,)
+    )
+    checker.start()
+    errors: list[Exception] = []
+    threads = [
+        threading.Thread(target=bot_worker, args=(db, thread_index, errors))
+        for thread_index in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    checker.join(timeout=60)
+
+    assert errors == []
+    assert checker.exitcode == 0
+    assert db.get_user(THREADS * ITERATIONS - 1) is not None
+    count = db.cursor.execute("SELECT COUNT(*) FROM users;").fetchone()[0]
+    assert count == THREADS * ITERATIONS
+    db.close()
+
+
+def test_connection_per_thread(tmp_path):
+    db = SqliteDb(str(tmp_path / "threads.db"))
+    connections = []
+
+    def get_connection():
+        connections.append((db.connection, db.cursor))
+
+    thread = threading.Thread(target=get_connection)
+    thread.start()
+    thread.join()
+    assert connections[0][0] is not db.connection
+    assert connections[0][1] is not db.cursor
+    assert db.connection is db.connection
+    db.close()
@@ -1,6 +1,7 @@
 import datetime
 import os
 import random
+import threading
 
 import pytest
 from faker import Faker
@@ -8,6 +9,7 @@ from faker import Faker
 from db.sqlite_db import SqliteDb
 from models import pydantic_models
 from models.pydantic_models import DbUser
+from models.records import DbUserRecord
 
 # generate random name for db
 random_name = str(random.randint(10_000_000, 99_999_999))
@@ -18,6 +20,7 @@ TEST_DB = f"{random_name}.db"
 def test_db(request):
     db = SqliteDb(TEST_DB)
     yield db
+    db.close()
     os.remove(TEST_DB)
 
 
@@ -331,3 +334,81 @@ def test_inactivate_ping_for_old_users(test_db: SqliteDb):
     db_old_user = test_db.get_user(user_id=old_user.id)
     assert db_old_user is not None
     assert db_old_user.ping_status is False
+
+
+def test_set_users_ping_status(test_db: SqliteDb):
+    for user_id in range(1, 6):
+        test_db.add_user(user=DbUser(id=user_id, ping_status=True))
+    updated = test_db.set_users_ping_status(user_ids=[1, 2, 3, 42], ping_status=False)
+    assert updated == 3
+    statuses = {
+        user_id: test_db.get_user(user_id=user_id).ping_status
+        for user_id in range(1, 6)
+    }
+    assert statuses == {1: False, 2: False, 3: False, 4: True, 5: True}
+    assert test_db.set_users_ping_status(user_ids=[], ping_status=True) == 0
+
+
+def test_get_active_doctors_joined_users(test_db: SqliteDb):
+    doctors = [
+        pydantic_models.DbDoctorToCreate(
+            districtId="1", lpuId=lpuId, specialtyId="7", doctorId=str(lpuId * 10)
+        )
+        for lpuId in (1, 2)
+    ]
+    doctor_ids = [test_db.add_doctor(doctor=doctor) for doctor in doctors]
+    test_db.add_user(DbUser(id=1, ping_status=True, doctor_id=doctor_ids[0]))
+    test_db.add_user(
+        DbUser(id=2, ping_status=True, doctor_id=doctor_ids[0], limit_days=3)
+    )
+    test_db.add_user(DbUser(id=3, ping_status=False, doctor_id=doctor_ids[1]))
+
+    active = test_db.get_active_doctors_joined_users()
+    assert list(active) == [doctor_ids[0]]
+    doctor = active[doctor_ids[0]]
+    assert (doctor.lpuId, doctor.specialtyId, doctor.doctorId) == (1, "7", "10")
+    assert sorted(doctor.pinging_users) == [
+        DbUserRecord(id=1, limit_days=None),
+        DbUserRecord(id=2, limit_days=3),
+    ]
+
+
+def test_iter_active_doctors_joined_users(test_db: SqliteDb):
+    params = [(2, "1", "a"), (1, "2", "b"), (1, "1", "c"), (1, "1", "d"), (2, "1", "e")]
+    doctor_ids = [
+        test_db.add_doctor(
+            doctor=pydantic_models.DbDoctorToCreate(
+                districtId="1", lpuId=lpuId, specialtyId=specialtyId, doctorId=doctorId
+            )
+        )
+        for lpuId, specialtyId, doctorId in params
+    ]
+    # пользователи добавляются вперемешку, у каждого врача по два
+    for user_id in range(10):
+        test_db.add_user(
+            DbUser(id=user_id, ping_status=True, doctor_id=doctor_ids[user_id % 5])
+        )
+
+    doctors = test_db.iter_active_doctors_joined_users()
+    first = next(doctors)
+    # пока чекер оповещает пользователей врача, бот в другом потоке
+    # отключает проверку пользователю ещё не прочитанного врача "a"
+    bot = threading.Thread(target=test_db.set_users_ping_status, args=([5], False))
+    bot.start()
+    bot.join()
+    # запись чекера после чужого коммита не упирается в снимок чтения
+    updated = test_db.set_users_ping_status(
+        user_ids=[user.id for user in first.pinging_users], ping_status=False
+    )
+    assert updated == 2
+    rest = list(doctors)
+
+    keys = [(d.lpuId, d.specialtyId, d.id) for d in [first, *rest]]
+    assert keys == sorted(keys)
+    assert {d.doctorId: len(d.pinging_users) for d in [first, *rest]} == {
+        "a": 1,
+        "b": 2,
+        "c": 2,
+        "d": 2,
+        "e": 2,
+    }
@@ -14,6 +14,7 @@ TEST_DB = f"test_{random_name}.db"
 def test_db(request):
     db = SqliteDb(db_path=TEST_DB)
     yield db
+    db.close()
     os.remove(TEST_DB)
 
 
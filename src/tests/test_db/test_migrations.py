@@ -0,0 +1,143 @@
+import sqlite3
+from collections.abc import Callable
+
+import pytest
+
+from db.migrations import MIGRATIONS, Migration, SchemaMigrator
+from db.sqlite_db import SqliteDb
+from gorzdrav.models import ApiDoctor, ApiLPU, ApiSpecialty
+from models import pydantic_models
+
+LATEST = MIGRATIONS[-1].version
+
+
+@pytest.fixture
+def db(tmp_path) -> SqliteDb:
+    db = SqliteDb(str(tmp_path / "migrations.db"))
+    yield db
+    db.close()
+
+
+def get_query_plan(db: SqliteDb, call: Callable[[], object]) -> list[str]:
+    """План первого запроса, который выполнил метод БД: по строке на шаг плана"""
+    queries: list[str] = []
+    db.connection.set_trace_callback(queries.append)
+    try:
+        call()
+    finally:
+        db.connection.set_trace_callback(None)
+    query = next(
+        q for q in queries if q.lstrip().upper().startswith(("SELECT", "UPDATE"))
+    )
+    return [row[3] for row in db.connection.execute(f"EXPLAIN QUERY PLAN {query}")]
+
+
+def test_new_db_has_latest_version(db: SqliteDb):
+    assert SchemaMigrator.get_version(db.connection) == LATEST
+    # повторный запуск не меняет схему
+    other = SqliteDb(db.db_path)
+    assert other.create_db() == LATEST
+    other.close()
+
+
+def test_legacy_db_is_migrated(tmp_path):
+    """База без версии, созданная до миграций, обновляется без потери данных"""
+    path = str(tmp_path / "legacy.db")
+    connection = sqlite3.connect(path)
+    for q in MIGRATIONS[0].queries:
+        connection.execute(q)
+    connection.execute(
+        "INSERT INTO users (id, ping_status, doctor_id) VALUES (1, 1, 'doc');"
+    )
+    connection.execute(
+        "INSERT INTO catalog_doctors VALUES (1, '1', '7', 'Врач', 0, 0, NULL, NULL, NULL);"
+    )
+    connection.commit()
+    assert SchemaMigrator.get_version(connection) == 0
+    connection.close()
+
+    db = SqliteDb(path)
+    assert SchemaMigrator.get_version(db.connection) == LATEST
+    assert db.get_user_ping_status(1)
+    count = db.cursor.execute("SELECT COUNT(*) FROM catalog_search;").fetchone()[0]
+    assert count == 1
+    db.close()
+
+
+def test_failed_migration_is_rolled_back(db: SqliteDb):
+    broken = Migration(
+        version=LATEST + 1,
+        description="broken",
+        queries=("CREATE TABLE broken (id INTEGER);", "SELECT * FROM missing;"),
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        SchemaMigrator.migrate(db.connection, migrations=MIGRATIONS + (broken,))
+    assert SchemaMigrator.get_version(db.connection) == LATEST
+    exists = db.connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'broken';"
+    ).fetchone()
+    assert exists is None
+
+
+def test_migration_does_not_block_readers(db: SqliteDb):
+    """Пока миграция держит блокировку записи, другое соединение читает базу"""
+    db.add_user(pydantic_models.DbUser(id=1))
+    reader = db.connect()
+
+    def read_during_migration(q: str) -> None:
+        if "user_version = " in q:
+            assert reader.execute("SELECT COUNT(*) FROM users;").fetchone()[0] == 1
+
+    slow = Migration(
+        version=LATEST + 1,
+        description="add column",
+        queries=("ALTER TABLE users ADD COLUMN note TEXT;",),
+    )
+    db.connection.set_trace_callback(read_during_migration)
+    assert SchemaMigrator.migrate(db.connection, MIGRATIONS + (slow,)) == LATEST + 1
+    db.connection.set_trace_callback(None)
+    reader.close()
+
+
+@pytest.mark.filterwarnings("ignore:The default datetime adapter")
+def test_checker_queries_use_indexes(db: SqliteDb):
+    doctor_id = db.add_doctor(
+        pydantic_models.DbDoctorToCreate(
+            districtId="1", lpuId=1, specialtyId="1", doctorId="1"
+        )
+    )
+    db.add_user(pydantic_models.DbUser(id=1, doctor_id=doctor_id, ping_status=True))
+
+    # врачи медучреждения идут по индексу без сортировки,
+    # пользователи из покрывающего индекса
+    plan = get_query_plan(db, db.get_active_doctors_joined_users)
+    assert plan == [
+        "SEARCH doctors USING INDEX doctors_specialty (lpuId=?)",
+        "SCALAR SUBQUERY 1",
+        "SEARCH doctors USING COVERING INDEX doctors_specialty (lpuId>?)",
+        "SEARCH users USING COVERING INDEX users_pinging_doctor (doctor_id=?)",
+        "SEARCH users USING COVERING INDEX users_pinging_doctor (doctor_id=?)",
+    ]
+
+    plan = get_query_plan(db, db.get_active_doctors)
+    assert "SCAN users USING COVERING INDEX users_pinging_doctor" in plan
+
+    plan = get_query_plan(db, lambda: db.get_users_by_doctor(doctor_id))
+    assert plan[0].startswith("SEARCH users USING INDEX users_doctor")
+
+    plan = get_query_plan(db, lambda: db.inactivate_ping_for_old_users(2))
+    assert plan == ["SEARCH users USING INDEX users_pinging_last_seen (last_seen<?)"]
+
+
+def test_catalog_queries_use_indexes(db: SqliteDb):
+    db.save_catalog_lpus("1", [ApiLPU(id=1)], now=1.0)
+    db.save_catalog_specialties(1, [ApiSpecialty(id="1")], now=1.0)
+    db.save_catalog_doctors(
+        1, "1", [ApiDoctor(id="1", name="Врач", lastDate=None, nearestDate=None)], 1.0
+    )
+
+    plan = get_query_plan(db, lambda: db.get_catalog_lpus("1"))
+    assert plan[0].startswith("SEARCH catalog_lpus USING INDEX catalog_lpus_district")
+
+    plan = get_query_plan(db, lambda: db.get_catalog_doctors(1, "1"))
+    assert plan[0].startswith("SEARCH catalog_doctors USING INDEX")
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+import telebot
+from telebot.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+)
+
+from benchmarks.bench_bot import BotReplayHarness, FakeTelegramApi, get_percentile
+
+
+@pytest.fixture()
+def api():
+    api = FakeTelegramApi()
+    api.install()
+    yield api
+    api.uninstall()
+
+
+@pytest.fixture()
+def bot() -> telebot.TeleBot:
+    bot = telebot.TeleBot(token="123456:test", threaded=False)
+
+    @bot.message_handler(commands=["start"])
+    def start_message(message: Message):
+        kb = InlineKeyboardMarkup()
+        kb.add(InlineKeyboardButton(text="1", callback_data="district/1"))
+        kb.add(InlineKeyboardButton(text="Назад", callback_data="district/back"))
+        bot.send_message(
+            chat_id=message.chat.id, text="Выберите район", reply_markup=kb
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("district/"))
+    def set_district(call: CallbackQuery):
+        bot.edit_message_text(
+            text=f"Выбран {call.data}",
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+        )
+
+    @bot.message_handler(commands=["fail"])
+    def fail(message: Message):
+        raise RuntimeError("handler failed")
+
+    return bot
+
+
+def test_harness_records_handlers(bot: telebot.TeleBot, api: FakeTelegramApi):
+    harness = BotReplayHarness(bot=bot, api=api)
+    harness.process(harness.make_message_update(user_id=10, text="/start"))
+    message = api.get_last_message(chat_id=10)
+    assert message is not None
+    assert message["text"] == "Выберите район"
+
+    assert harness.click(user_id=10, pattern="district/", rnd=random.Random(0))
+    edited = api.get_last_message(chat_id=10)
+    assert edited is not None
+    assert edited["text"] == "Выбран district/1"
+    assert edited["message_id"] == message["message_id"]
+    # кнопок больше нет, нажимать нечего
+    assert not harness.click(user_id=10, pattern="district/", rnd=random.Random(0))
+
+    assert len(harness.timings.durations["start_message"]) == 1
+    assert len(harness.timings.durations["set_district"]) == 1
+    assert len(harness.timings.durations["update"]) == 2
+    assert api.calls == {"sendMessage": 1, "editMessageText": 1}
+
+
+def test_harness_counts_errors(bot: telebot.TeleBot, api: FakeTelegramApi):
+    harness = BotReplayHarness(bot=bot, api=api)
+    harness.replay(
+        [harness.make_message_update(user_id=1, text="/fail") for _ in range(3)],
+        concurrency=2,
+    )
+    assert harness.timings.errors == {"fail": 3, "update": 3}
+
+
+def test_get_percentile():
+    values = [0.1 * i for i in range(1, 11)]
+    assert get_percentile(values, 50) == pytest.approx(0.5)
+    assert get_percentile(values, 100) == pytest.approx(1.0)
+    assert get_percentile([], 99) == 0.0
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+import requests
+
+from telegram.dispatcher import DeliveryReport, DeliveryStatus, TgDispatcher
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, json_data: dict | None = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = str(json_data)
+        self.__json_data = json_data
+
+    def json(self) -> dict:
+        if self.__json_data is None:
+            raise ValueError("no json")
+        return self.__json_data
+
+
+class FakeSession:
+    """Отвечает по очереди заданными ответами для каждого чата"""
+
+    def __init__(self, responses: dict[int, list[FakeResponse]] | None = None):
+        self.responses = responses or {}
+        self.calls: list[dict] = []
+        self.lock = threading.Lock()
+
+    def post(self, url: str, data: dict) -> FakeResponse:
+        with self.lock:
+            self.calls.append(data)
+            queue = self.responses.get(data["chat_id"])
+            if queue:
+                response = queue.pop(0)
+                if isinstance(response, Exception):
+                    raise response
+                return response
+        return FakeResponse(200, {"ok": True})
+
+
+def make_dispatcher(session: FakeSession, sleeps: list[float]) -> TgDispatcher:
+    return TgDispatcher(
+        api_token="token",
+        max_workers=4,
+        global_rate=1000,
+        chat_rate=1000,
+        max_retries=2,
+        session_factory=lambda: session,
+        sleep=sleeps.append,
+    )
+
+
+def test_send_many_delivers_all():
+    session = FakeSession()
+    sleeps: list[float] = []
+    report = make_dispatcher(session, sleeps).send_many(
+        chat_ids=list(range(20)), message="hi"
+    )
+    assert sorted(report.delivered) == list(range(20))
+    assert report.failed == []
+    assert len(report.latencies) == 20
+    assert len(session.calls) == 20
+
+
+def test_retry_after_is_honoured():
+    flood = FakeResponse(429, {"ok": False, "parameters": {"retry_after": 7}})
+    session = FakeSession({1: [flood]})
+    sleeps: list[float] = []
+    report = make_dispatcher(session, sleeps).send_many(chat_ids=[1], message="hi")
+    assert report.delivered == [1]
+    assert len(session.calls) == 2
+    assert max(sleeps) == pytest.approx(7, abs=0.1)
+
+
+def test_give_up_after_retries():
+    session = FakeSession({1: [requests.ConnectionError("down")] * 3})
+    sleeps: list[float] = []
+    report = make_dispatcher(session, sleeps).send_many(chat_ids=[1, 2], message="hi")
+    assert report.delivered == [2]
+    assert report.failed == [1]
+
+
+@pytest.mark.parametrize(
+    "status_code, description",
+    [
+        (403, "Forbidden: bot was blocked by the user"),
+        (400, "Bad Request: chat not found"),
+    ],
+)
+def test_rejected_chat_is_not_retried(status_code: int, description: str):
+    rejected = FakeResponse(
+        status_code,
+        {"ok": False, "error_code": status_code, "description": description},
+    )
+    session = FakeSession({1: [rejected]})
+    sleeps: list[float] = []
+    dispatcher = make_dispatcher(session, sleeps)
+    assert dispatcher.send_message(chat_id=1, message="hi") == DeliveryStatus.REJECTED
+    assert len(session.calls) == 1
+
+    session.responses = {1: [rejected]}
+    report = dispatcher.send_many(chat_ids=[1, 2], message="hi")
+    assert report.rejected == [1]
+    assert report.failed == []
+    assert report.delivered == [2]
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 401])
+def test_temporary_error_is_retried(status_code: int):
+    error = FakeResponse(status_code, {"ok": False})
+    session = FakeSession({1: [error], 2: [error] * 3})
+    sleeps: list[float] = []
+    report = make_dispatcher(session, sleeps).send_many(chat_ids=[1, 2], message="hi")
+    assert report.delivered == [1]
+    assert report.failed == [2]
+    assert report.rejected == []
+
+
+def test_chat_rate_limit():
+    session = FakeSession()
+    sleeps: list[float] = []
+    dispatcher = TgDispatcher(
+        api_token="token",
+        max_workers=1,
+        global_rate=1000,
+        chat_rate=1,
+        max_retries=0,
+        session_factory=lambda: session,
+        sleep=sleeps.append,
+    )
+    dispatcher.send_message(chat_id=1, message="a")
+    dispatcher.send_message(chat_id=2, message="a")
+    assert sleeps == []
+    dispatcher.send_message(chat_id=1, message="b")
+    assert sleeps and sleeps[-1] == pytest.approx(1, abs=0.1)
+
+
+def test_percentiles():
+    report = DeliveryReport()
+    report.latencies = [float(i) for i in range(1, 101)]
+    assert report.get_percentile(50) == 50
+    assert report.get_percentile(99) == 99
+    assert report.get_percentile(100) == 100
+    assert DeliveryReport().get_percentile(50) == 0.0